@@ -0,0 +1,127 @@
+from langchain_core.messages import SystemMessage, HumanMessage
+from agents.summarizer import SUMMARY_FORMAT, RETRY_INSTRUCTION, fallback_summary
+from agents.summary_schema import validate_summary, record_parse, is_failed_summary
+from agents.versions import version_accepted, adopt_versions, tag_fields, version_fields
+from data.doc_cache_utils import doc_cache_key, get_cached_docs, update_docs, claim_pending, release_claims
+from utils.concurrency import bounded_map
+from utils.usage import record_cache_lookup
+from utils.budget import plan_llm_work, failure_degradation
+from utils.json_repair import loads_lenient
+from utils.metrics import REGISTRY
+from providers import get_json_llm
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WINDOW = 3000
+
+ANALYZER_SYSTEM = "You are a medical research classifier and summarizer."
+ANALYSIS_PROMPT = """
+Classify the following document as clinical trial, meta-analysis, review, case study or another short label,
+then summarize it. Respond with a JSON object with exactly two keys:
+
+- "document_type": the classification label
+- "summary": the summary, in the following example JSON format ONLY:
+
+{summary_format}
+Document:
+\"\"\"{content}\"\"\"
+"""
+
+
+def analyze_document(doc: dict, window: int = ANALYSIS_WINDOW) -> dict:
+    """Classify and summarize a document with a single LLM call."""
+    content = doc["content"][:window]
+
+    prompt = [
+        SystemMessage(content=ANALYZER_SYSTEM),
+        HumanMessage(content=ANALYSIS_PROMPT.format(summary_format=SUMMARY_FORMAT, content=content))
+    ]
+
+    for attempt in range(config.SUMMARY_MAX_ATTEMPTS):
+        response = get_json_llm()(prompt).content.strip()
+        parsed, status = loads_lenient(response)
+        if not isinstance(parsed, dict):
+            parsed = {}
+        doc["type"] = str(parsed.get("document_type") or "").lower().strip() or "research paper"
+        doc["type_source"] = "llm"
+        summary = parsed.get("summary")
+        # Some replies put the summary fields at the top level instead of under "summary"
+        summary = validate_summary(summary if isinstance(summary, dict) else parsed)
+        if summary is None:
+            status = "invalid"
+        record_parse("analysis", status, response)
+        if summary is not None:
+            doc["summary_json"] = summary
+            doc.pop("summary_failed", None)
+            return doc
+        if attempt + 1 < config.SUMMARY_MAX_ATTEMPTS:
+            REGISTRY.inc("llm_json_retries_total", stage="analysis")
+            prompt = prompt[:-1] + [HumanMessage(content=prompt[-1].content + RETRY_INSTRUCTION)]
+
+    logger.warning("❌ Failed to parse analysis JSON. Showing raw text; not cached.")
+    doc["summary_json"] = fallback_summary(response, doc["type"])
+    doc["summary_failed"] = True
+    return doc
+
+
+def analyzer_node(state: dict):
+    """Fused replacement for classifier_node followed by summarizer_node."""
+    docs = state["docs"]
+    hashes = [doc_cache_key(doc) for doc in docs]
+    cached = get_cached_docs(hashes)
+    pending = {}
+
+    for doc, doc_hash in zip(docs, hashes):
+        entry = cached.get(doc_hash)
+        if (entry and "type" in entry and "summary_json" in entry and not is_failed_summary(entry["summary_json"])
+                and version_accepted(entry, "type") and version_accepted(entry, "summary_json")):
+            logger.info(f"[Analyzer] Cache hit: SHA={doc_hash}")
+            doc["type"] = entry["type"]
+            doc["summary_json"] = entry["summary_json"]
+            adopt_versions(doc, entry)
+        elif doc_hash not in pending:
+            logger.info(f"[Analyzer] Classifying and summarizing: SHA={doc_hash}")
+            pending[doc_hash] = doc
+
+    record_cache_lookup(hits=len(docs) - len(pending), misses=len(pending))
+    budget = state.get("budget")
+    selected, window = plan_llm_work(budget, list(pending.values()), ANALYSIS_WINDOW, len(SUMMARY_FORMAT) + 400)
+    chosen = {id(doc) for doc in selected}
+    pending = {doc_hash: doc for doc_hash, doc in pending.items() if id(doc) in chosen}
+    pending, done = claim_pending(pending, "summary_json")
+    try:
+        timeout = config.LLM_TIMEOUT if budget is None else budget.call_timeout()
+        results = bounded_map(lambda doc: analyze_document(doc, window), pending.values(),
+                              timeout=timeout, return_exceptions=True)
+        for doc_hash, result in zip(list(pending), results):
+            if isinstance(result, Exception):
+                logger.warning(f"[Analyzer] Failed for SHA={doc_hash}: {result!r}")
+                if budget is not None:
+                    budget.degrade(*failure_degradation(result))
+                pending[doc_hash].pop("summary_json", None)
+        new_entries = {}
+        for doc_hash, doc in pending.items():
+            if "summary_json" in doc:
+                tag_fields(doc, "type", "summary_json", producer="analyzer")
+                new_entries[doc_hash] = {"type": doc["type"], "type_source": doc["type_source"],
+                                         "summary_json": doc["summary_json"], **version_fields(doc)}
+        if window == ANALYSIS_WINDOW:
+            # Results of shortened prompts, and failed ones, are served once but never cached
+            update_docs({doc_hash: entry for doc_hash, entry in new_entries.items()
+                         if not pending[doc_hash].get("summary_failed")})
+    finally:
+        release_claims(pending, "summary_json")
+    new_entries.update(done)
+
+    for doc, doc_hash in zip(docs, hashes):
+        if doc_hash in new_entries:
+            doc["type"] = new_entries[doc_hash].get("type", "")
+            doc["summary_json"] = new_entries[doc_hash]["summary_json"]
+            adopt_versions(doc, new_entries[doc_hash])
+
+    # Papers left unanalyzed, to stay within a budget or because the call failed, are dropped
+    state["docs"] = [doc for doc in docs if "summary_json" in doc]
+    logger.info("[SUCCESS] Stored all classifications and summaries in state['docs']")
+    return state
@@ -1,22 +1,19 @@
 import logging
 logger = logging.getLogger(__name__)
 
-
-import logging
-logger = logging.getLogger(__name__)
+def assemble_paper(doc: dict) -> dict:
+    return {
+        "title": doc["title"],
+        "link": doc["link"],
+        "type": doc.get("type", ""),
+        "summary": doc.get("summary_json", {}),
+        "citation": doc.get("citation", "")
+    }
 
 def assemble_json(docs: list, query: str) -> dict:
     return {
         "query": query,
-        "papers": [
-            {
-                "title": doc["title"],
-                "link": doc["link"],
-                "type": doc.get("type", ""),
-                "summary": doc.get("summary_json", {}),
-                "citation": doc.get("citation", "")
-            } for doc in docs
-        ]
+        "papers": [assemble_paper(doc) for doc in docs]
     }
 
 
@@ -27,4 +24,3 @@ def assembler_node(state: dict) -> dict:
     final = assemble_json(docs, query)
     state["final_output"] = final
     return state
-
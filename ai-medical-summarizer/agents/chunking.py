@@ -0,0 +1,84 @@
+import re
+import hashlib
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+class _ApproximateEncoding:
+    """Whitespace-piece tokenizer used only when the tiktoken vocabulary cannot be loaded."""
+
+    name = "approximate"
+
+    def encode(self, text: str) -> list:
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def decode(self, tokens: list) -> str:
+        return "".join(tokens)
+
+
+def get_encoding():
+    """Return the model's tiktoken encoding (loaded once), or an approximation when offline."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+                except Exception as e:
+                    logger.warning(f"[Chunking] tiktoken unavailable ({e}); using approximate token counts")
+                    _encoding = _ApproximateEncoding()
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def hash_chunk(chunk: str) -> str:
+    normalized = " ".join(chunk.split()).lower()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list:
+    """
+    Split text into chunks of at most `max_tokens` tokens.
+
+    Paragraphs are packed whole wherever they fit, so chunk boundaries follow
+    the document's structure and an unchanged section of a re-fetched page
+    usually yields the same chunk (and chunk hash) as before. Paragraphs
+    longer than the budget are cut into token windows.
+    """
+    encoding = get_encoding()
+    chunks, current, current_tokens = [], [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = encoding.encode(paragraph)
+        if len(tokens) > max_tokens:
+            flush()
+            for start in range(0, len(tokens), max_tokens):
+                chunks.append(encoding.decode(tokens[start:start + max_tokens]).strip())
+            continue
+        if current_tokens + len(tokens) > max_tokens:
+            flush()
+        current.append(paragraph)
+        current_tokens += len(tokens)
+
+    flush()
+    return chunks
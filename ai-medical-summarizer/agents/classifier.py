@@ -1,12 +1,21 @@
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
-from data.doc_cache_utils import hash_doc_content, get_cached_doc, store_doc
+from langchain_core.messages import SystemMessage, HumanMessage
+from data.doc_cache_utils import doc_cache_key, get_cached_docs, update_docs, claim_pending, release_claims
+from utils.concurrency import bounded_map
+from utils.usage import record_cache_lookup
+from utils.metrics import REGISTRY
+from agents.local_classifier import normalize_label, get_local_classifier, classifier_text
+from agents.versions import version_accepted, adopt_versions, tag_fields, version_fields
+from agents.summarizer import SUMMARY_FORMAT, SUMMARY_WINDOW
+from utils.budget import estimate_call_tokens
+from providers import get_llm
+import config
 
 import logging
 logger = logging.getLogger(__name__)
 
+CLASSIFY_SYSTEM = "You are a medical research classifier."
+CLASSIFY_PROMPT = "Classify this document:\n{content}"
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
 def classify_document(doc: dict) -> dict:
     content = doc["content"][:2000]
@@ -14,36 +23,148 @@ def classify_document(doc: dict) -> dict:
         SystemMessage(content="You are a medical paper classifier. You give the top 3 to top 5 research papers which are most recent. These papers are closely related to the question."),
         HumanMessage(content=f"Classify the following as clinical trial, meta-analysis, review, or case study:\n\n{content}")
     ]
-    result = llm(prompt).content.lower().strip()
+    result = get_llm()(prompt).content.lower().strip()
     doc["type"] = result
     return doc
 
 
 
+def classify_content(doc: dict) -> str:
+    # Classify using LLM
+    content = doc["content"][:2000]
+    prompt = [
+        SystemMessage(content=CLASSIFY_SYSTEM),
+        HumanMessage(content=CLASSIFY_PROMPT.format(content=content))
+    ]
+    return get_llm()(prompt).content.lower().strip()
+
+
+def classify_locally(pending: dict) -> tuple:
+    """
+    Run the local model over the pending docs.
+
+    Returns ({hash: label} for predictions at or above the confidence
+    threshold, {hash: label} of the low-confidence guesses for the rest).
+    """
+    model = get_local_classifier()
+    if model is None or not pending:
+        return {}, {}
+    predictions = model.predict([classifier_text(doc) for doc in pending.values()])
+    confident, guesses = {}, {}
+    for doc_hash, (label, probability) in zip(pending, predictions):
+        if probability >= config.LOCAL_CLASSIFIER_THRESHOLD:
+            confident[doc_hash] = label
+        else:
+            guesses[doc_hash] = label
+    REGISTRY.inc("classifier_local_total", len(confident), result="confident")
+    REGISTRY.inc("classifier_local_total", len(guesses), result="fallback")
+    return confident, guesses
+
+
 def classifier_node(state: dict):
     docs = state["docs"]
-    classified = []
-
-    for doc in docs:
-        doc_hash = hash_doc_content(doc)
-        cached = get_cached_doc(doc_hash)
+    hashes = [doc_cache_key(doc) for doc in docs]
+    cached = get_cached_docs(hashes)
+    pending = {}
 
-        if cached and "type" in cached:
-            doc["type"] = cached["type"]
+    for doc, doc_hash in zip(docs, hashes):
+        entry = cached.get(doc_hash)
+        if entry and "type" in entry and version_accepted(entry, "type"):
+            doc["type"] = entry["type"]
+            adopt_type_source(doc, entry)
+            adopt_versions(doc, entry)
         else:
-            # Classify using LLM
-            content = doc["content"][:2000]
-            prompt = [
-                SystemMessage(content="You are a medical research classifier."),
-                HumanMessage(content=f"Classify this document:\n{content}")
-            ]
-            result = llm(prompt).content.lower().strip()
-            doc["type"] = result
+            pending.setdefault(doc_hash, doc)
 
-            store_doc(doc_hash, {"type": result})
+    record_cache_lookup(hits=len(docs) - len(pending), misses=len(pending))
+    budget = state.get("budget")
+    if budget is not None and pending and not classification_fits(budget, pending):
+        budget.degrade("skip_classification", f"{len(pending)} documents labelled without the LLM")
+        labels = guess_labels(pending)
+        for doc, doc_hash in zip(docs, hashes):
+            if doc_hash in labels:
+                doc["type"] = labels[doc_hash]
+                # Keeps the guess out of the doc store, so an unbudgeted run still classifies it
+                doc["type_guessed"] = True
+        state["docs"] = docs
+        return state
 
-        classified.append(doc)
+    pending, done = claim_pending(pending, "type")
+    try:
+        new_entries = classify_pending(pending)
+        for doc_hash, entry in new_entries.items():
+            tag_fields(pending[doc_hash], "type", producer="classifier")
+            entry.update(version_fields(pending[doc_hash]))
+        update_docs(new_entries)
+    finally:
+        release_claims(pending, "type")
+    new_entries.update(done)
 
-    state["docs"] = classified
+    for doc, doc_hash in zip(docs, hashes):
+        if doc_hash in new_entries:
+            doc["type"] = new_entries[doc_hash]["type"]
+            adopt_type_source(doc, new_entries[doc_hash])
+            adopt_versions(doc, new_entries[doc_hash])
+
+    # Docs whose classification failed are dropped rather than failing the run
+    state["docs"] = [doc for doc, doc_hash in zip(docs, hashes) if doc_hash not in pending or doc_hash in new_entries]
     return state
 
+
+def adopt_type_source(doc: dict, entry: dict):
+    # Carried with the doc so the summarizer stores it next to the type it writes back
+    if "type_source" in entry:
+        doc["type_source"] = entry["type_source"]
+
+
+def classification_fits(budget, pending: dict) -> bool:
+    """Whether classifying and then summarizing the pending docs fits in the remaining budget."""
+    time_left, tokens_left = budget.remaining_time(), budget.remaining_tokens()
+    if time_left is not None and time_left < 2 * config.BUDGET_LLM_SECONDS:
+        return False
+    if tokens_left is not None:
+        needed = sum(estimate_call_tokens(doc, 2000, 200) + estimate_call_tokens(doc, SUMMARY_WINDOW, len(SUMMARY_FORMAT))
+                     for doc in pending.values())
+        return needed <= tokens_left
+    return True
+
+
+def guess_labels(pending: dict) -> dict:
+    """{doc key: label} without an LLM call: the local model if enabled, else title/abstract keywords."""
+    labels = {}
+    if config.LOCAL_CLASSIFIER_ENABLED:
+        confident, guesses = classify_locally(pending)
+        labels.update(guesses)
+        labels.update(confident)
+    for doc_hash, doc in pending.items():
+        labels.setdefault(doc_hash, normalize_label(f"{doc.get('title', '')} {classifier_text(doc)}"))
+    return labels
+
+
+def classify_pending(pending: dict) -> dict:
+    """
+    {doc key: {"type": label, "type_source": "local" or "llm"}} for the pending
+    docs, from the local model or the LLM. The source keeps the local model's
+    own predictions out of its training data. Docs whose LLM call failed or
+    timed out are left out.
+    """
+    local, guesses = {}, {}
+    if config.LOCAL_CLASSIFIER_ENABLED:
+        local, guesses = classify_locally(pending)
+        logger.info(f"[Classifier] Local model answered {len(local)} of {len(pending)} documents")
+    remaining = {doc_hash: doc for doc_hash, doc in pending.items() if doc_hash not in local}
+
+    # One LLM call per distinct document still unlabelled, run concurrently
+    results = bounded_map(classify_content, remaining.values(), timeout=config.LLM_TIMEOUT, return_exceptions=True)
+    new_entries = {doc_hash: {"type": label, "type_source": "local"} for doc_hash, label in local.items()}
+    for doc_hash, result in zip(remaining, results):
+        if isinstance(result, Exception):
+            logger.warning(f"[Classifier] Failed for SHA={doc_hash}: {result!r}")
+            continue
+        if config.LOCAL_CLASSIFIER_ENABLED:
+            # Keep the LLM's labels in the local model's label set
+            result = normalize_label(result)
+            if doc_hash in guesses:
+                REGISTRY.inc("classifier_local_agreement_total", agree=str(guesses[doc_hash] == result).lower())
+        new_entries[doc_hash] = {"type": result, "type_source": "llm"}
+    return new_entries
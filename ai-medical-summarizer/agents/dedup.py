@@ -0,0 +1,32 @@
+from data.doc_cache_utils import hash_doc_content, near_dup_text, get_near_dup_index
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def dedup_node(state: dict) -> dict:
+    """
+    Point near-duplicate documents at one shared doc cache entry.
+
+    Each doc's MinHash signature is looked up in the LSH index of documents
+    seen before, including earlier docs of this result set. A match sets
+    doc["cache_key"] to that document's key, so the classifier and summarizer
+    reuse (or share) its type and summary_json instead of calling the LLM.
+    """
+    if not config.NEAR_DUP_ENABLED:
+        return state
+
+    index = get_near_dup_index()
+    for doc in state["docs"]:
+        own_key = hash_doc_content(doc)
+        signature = index.hasher.signature(near_dup_text(doc))
+        if signature is None:
+            continue
+        match, score = index.query(signature, config.NEAR_DUP_THRESHOLD)
+        if match is not None and match != own_key:
+            logger.info(f"[Dedup] {doc.get('title', '')!r} matches SHA={match} (similarity {score:.2f})")
+            doc["cache_key"] = match
+        elif match is None:
+            index.add(own_key, signature)
+    return state
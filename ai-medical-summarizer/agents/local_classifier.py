@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Local TF-IDF + logistic regression document classifier.
+
+Trained from documents the LLM has already labelled (doc records with
+content and a `type`), it lets classifier_node answer
+confident cases without an LLM call. Labels are normalized to LABELS.
+
+Usage:
+    python -m agents.local_classifier train      # fit on cached labels and save
+    python -m agents.local_classifier evaluate   # held-out agreement with the LLM and throughput
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = "data/local_classifier.joblib"
+
+LABELS = ("clinical trial", "meta-analysis", "review", "case study", "other")
+
+# First matching pattern wins, so the more specific labels are checked first
+_LABEL_PATTERNS = (
+    ("meta-analysis", re.compile(r"meta[- ]?analys|systematic review")),
+    ("clinical trial", re.compile(r"clinical trial|randomi[sz]ed|\btrial\b")),
+    ("case study", re.compile(r"case (study|report|series)")),
+    ("review", re.compile(r"\breview\b|overview")),
+)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def normalize_label(text: str) -> str:
+    """Map a free-text LLM answer such as 'This document is a randomized trial...' onto LABELS."""
+    text = (text or "").lower()
+    for label, pattern in _LABEL_PATTERNS:
+        if pattern.search(text):
+            return label
+    return "other"
+
+
+class LocalClassifier:
+    def __init__(self, pipeline=None):
+        self.pipeline = pipeline
+
+    @classmethod
+    def fit(cls, texts: list, labels: list) -> "LocalClassifier":
+        from sklearn.pipeline import make_pipeline
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1, max_features=50000,
+                            stop_words="english"),
+            LogisticRegression(max_iter=1000, class_weight="balanced")
+        )
+        pipeline.fit(texts, labels)
+        return cls(pipeline)
+
+    def predict(self, texts: list) -> list:
+        """Return [(label, probability)] for each text."""
+        if not texts:
+            return []
+        probabilities = self.pipeline.predict_proba(texts)
+        classes = self.pipeline.classes_
+        best = probabilities.argmax(axis=1)
+        return [(str(classes[i]), float(probabilities[row, i])) for row, i in enumerate(best)]
+
+    def save(self, path: str = MODEL_PATH):
+        import joblib
+        tmp_path = f"{path}.tmp"
+        joblib.dump(self.pipeline, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "LocalClassifier":
+        import joblib
+        return cls(joblib.load(path))
+
+
+def get_local_classifier():
+    """Return the saved classifier (loaded once), or None if none has been trained."""
+    global _model
+    if _model is None and os.path.exists(MODEL_PATH):
+        with _model_lock:
+            if _model is None:
+                _model = LocalClassifier.load(MODEL_PATH)
+                logger.info(f"[LocalClassifier] Loaded {MODEL_PATH}")
+    return _model
+
+def set_local_classifier(model):
+    global _model
+    _model = model
+
+
+def classifier_text(doc: dict) -> str:
+    # The same text the LLM classifier sees
+    return doc.get("content", "")[:2000]
+
+
+def training_data() -> tuple:
+    """
+    (texts, labels) for every cached document record with content and an
+    LLM-assigned type. Types the local model assigned itself, and older
+    records that do not say where their type came from, are left out.
+    """
+    from data.doc_cache_utils import get_doc_store
+
+    texts, labels = [], []
+    for _, record in get_doc_store().items():
+        if record.get("content") and record.get("type") and record.get("type_source") == "llm":
+            texts.append(classifier_text(record))
+            labels.append(normalize_label(record["type"]))
+    return texts, labels
+
+
+def train(texts: list = None, labels: list = None, path: str = MODEL_PATH) -> dict:
+    if texts is None:
+        texts, labels = training_data()
+    if len(set(labels)) < 2:
+        raise ValueError(f"Need labelled examples of at least two classes, got {len(texts)} examples "
+                         f"of {sorted(set(labels))}")
+    model = LocalClassifier.fit(texts, labels)
+    model.save(path)
+    set_local_classifier(model)
+    return {"examples": len(texts), "labels": {label: labels.count(label) for label in sorted(set(labels))},
+            "path": path}
+
+
+def evaluate(texts: list = None, labels: list = None, threshold: float = None,
+             test_size: float = 0.25, seed: int = 0) -> dict:
+    """
+    Hold out part of the LLM-labelled data and report how often the local model
+    agrees with the LLM, overall and on the cases it would answer at
+    `threshold`, plus its prediction throughput.
+    """
+    from sklearn.model_selection import train_test_split
+
+    if texts is None:
+        texts, labels = training_data()
+    threshold = config.LOCAL_CLASSIFIER_THRESHOLD if threshold is None else threshold
+    stratify = labels if min(labels.count(label) for label in set(labels)) >= 2 else None
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=test_size, random_state=seed, stratify=stratify)
+
+    model = LocalClassifier.fit(train_texts, train_labels)
+    start = time.perf_counter()
+    predictions = model.predict(test_texts)
+    elapsed = time.perf_counter() - start
+
+    agree = [label == expected for (label, _), expected in zip(predictions, test_labels)]
+    confident = [ok for ok, (_, p) in zip(agree, predictions) if p >= threshold]
+    return {
+        "train_examples": len(train_texts),
+        "test_examples": len(test_texts),
+        "threshold": threshold,
+        "agreement_with_llm": round(sum(agree) / len(agree), 4),
+        "coverage_at_threshold": round(len(confident) / len(agree), 4),
+        "agreement_at_threshold": round(sum(confident) / len(confident), 4) if confident else None,
+        "throughput_docs_per_s": round(len(test_texts) / elapsed, 1) if elapsed else None,
+        "latency_us_per_doc": round(elapsed / len(test_texts) * 1e6, 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or evaluate the local document classifier")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--threshold", type=float, help="Confidence threshold for evaluate")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    report = train() if args.command == "train" else evaluate(threshold=args.threshold)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""
+The pipeline nodes, each wrapped by utils.metrics.instrument_node.
+
+Everything that runs nodes (the graph, streaming, batch and refresh)
+imports them from here, so every call records the same per-node timing,
+token and cache metrics whichever path served the request.
+"""
+
+from agents.retriever import retriever_node as _retriever_node
+from agents.reranker import reranker_node as _reranker_node
+from agents.dedup import dedup_node as _dedup_node
+from agents.classifier import classifier_node as _classifier_node
+from agents.summarizer import summarizer_node as _summarizer_node
+from agents.analyzer import analyzer_node as _analyzer_node
+from agents.citation import citation_node as _citation_node
+from agents.assembler import assembler_node as _assembler_node
+from utils.metrics import instrument_node
+
+retriever_node = instrument_node("retriever", _retriever_node)
+reranker_node = instrument_node("reranker", _reranker_node)
+dedup_node = instrument_node("dedup", _dedup_node)
+classifier_node = instrument_node("classifier", _classifier_node)
+summarizer_node = instrument_node("summarizer", _summarizer_node)
+analyzer_node = instrument_node("analyzer", _analyzer_node)
+citation_node = instrument_node("citation", _citation_node)
+assembler_node = instrument_node("assembler", _assembler_node)
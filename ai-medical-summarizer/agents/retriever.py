@@ -1,19 +1,38 @@
-from tavily import TavilyClient
-import os
-from dotenv import load_dotenv
-load_dotenv()
+from data.search_cache import search_cache_key, get_cached_search, store_search
+from utils.metrics import REGISTRY
+from providers import get_search_client
+import config
 
 import logging
 logger = logging.getLogger(__name__)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+SEARCH_PARAMS = {"include_raw_content": True, "max_results": 3}
 
-client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+def search_params() -> dict:
+    if config.RERANK_ENABLED:
+        # Wide recall; reranker_node narrows the candidates down before any LLM call
+        return {**SEARCH_PARAMS, "max_results": config.RERANK_CANDIDATES}
+    return SEARCH_PARAMS
 
 def retriever_node(state: dict) -> dict:
     query = state["query"]
-    results = client.search(query=query, include_raw_content=True, max_results=3)
+    params = search_params()
+    # Fused results depend on which sources were asked
+    key_params = {**params, "sources": config.SEARCH_SOURCES} if len(config.SEARCH_SOURCES) > 1 else params
+    key = search_cache_key(query, **key_params)
+    # A refresh must see what the search backend returns now, not the cached results
+    results = None if state.get("refresh") else get_cached_search(key)
+    # Own counter: the usage meters' cache hit rate is about the doc store
+    REGISTRY.inc("search_cache_lookups_total", result="miss" if results is None else "hit")
+    if results is None:
+        results = get_search_client().search(query=query, **params)
+        if results.get("partial"):
+            # Not cached, so the next run asks the sources that missed out again
+            logger.warning(f"[Retriever] Partial results from {results['sources']}")
+        else:
+            store_search(key, results)
+    else:
+        logger.info(f"[SearchCache] Hit: {query}")
     
     documents = []
     for item in results["results"]:
@@ -21,7 +40,9 @@ def retriever_node(state: dict) -> dict:
             "title": item["title"],
             "link": item["url"],
             "content": item.get("content", ""),
-            "source": item["url"]
+            "raw_content": item.get("raw_content") or "",
+            "source": item["url"],
+            "published_date": item.get("published_date") or ""
         })
     
     state["docs"] = documents
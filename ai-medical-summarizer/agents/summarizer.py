@@ -1,35 +1,34 @@
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
-from data.doc_cache_utils import hash_doc_content, get_cached_doc, store_doc
+from langchain_core.messages import SystemMessage, HumanMessage
+from data.doc_cache_utils import (doc_cache_key, get_cached_docs, update_docs, get_cached_chunks, store_chunks,
+                                  claim_pending, release_claims)
+from agents.chunking import count_tokens, split_into_chunks, hash_chunk
+from utils.concurrency import bounded_map
+from utils.usage import record_cache_lookup
+from utils.budget import plan_llm_work, failure_degradation
+from utils.json_repair import loads_lenient
+from utils.metrics import REGISTRY
+from agents.summary_schema import validate_summary, record_parse, is_failed_summary
+from agents.versions import version_accepted, adopt_versions, tag_fields, version_fields
+from providers import get_llm
+import config
 
 import json
 import logging
 logger = logging.getLogger(__name__)
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+SUMMARIZER_SYSTEM = "You are a medical research summarizer."
 
-def summarize_document(doc: dict) -> dict:
-    content = doc["content"][:3000]
-    doc_type = doc.get("type", "research paper")
-
-    prompt = [
-        SystemMessage(content="You are a medical research summarizer."),
-        HumanMessage(content=f"""
-Summarize the following {doc_type} in the following example JSON format ONLY:
-
-{{
+SUMMARY_FORMAT = """{
   "type": "<restate the document type>",
-  "causes": ["cause 1", "cause 2"]
+  "causes": ["cause 1", "cause 2"],
   "key_findings": ["point 1", "point 2", "point 3"],
-  "common treatment methods": [["method 1":"approach of the method"], ["method 2":"approach of the method"]],
-  "limitations of certain treatments": ["limitation 1":"what is the alternate treatment", "limitation 2":"what is the alternate treatment"],
-  "latest treatments": ["treatment 1":["proposed institution":"Mayo Clinic", "year of proposal":2019, approved_for_use:"Approved/ Under Trials", "treatment approach":"the treatment uses abc method..."], "treatment 2":["proposed institution":"Mayo Clinic", "year of proposal":2019, approved_for_use:"Approved/ Under Trials", "treatment approach":"the treatment uses abc method..."]]
-  
-}}
+  "common treatment methods": [{"method 1": "approach of the method"}, {"method 2": "approach of the method"}],
+  "limitations of certain treatments": [{"limitation 1": "what is the alternate treatment"}, {"limitation 2": "what is the alternate treatment"}],
+  "latest treatments": [{"treatment 1": {"proposed institution": "Mayo Clinic", "year of proposal": 2019, "approved_for_use": "Approved/ Under Trials", "treatment approach": "the treatment uses abc method..."}}, {"treatment 2": {"proposed institution": "Mayo Clinic", "year of proposal": 2019, "approved_for_use": "Approved/ Under Trials", "treatment approach": "the treatment uses abc method..."}}]
+}
 
 - Return **only valid JSON** (no markdown or commentary).
 - Give a 250 words explanation for each key finding.
-- 
 - Each list should contain a max of 5 concise points.
 - No field should be blank.
 - Do NOT repeat content or headers.
@@ -39,52 +38,221 @@ Summarize the following {doc_type} in the following example JSON format ONLY:
 - do not hallucinate.
 - every method, treatment type or whatever it is, must appear only once.
 - generate answers only if there is a source available. do not make up treatments or any other methods
+"""
 
-Document:
-\"\"\"{content}\"\"\"
+# Appended to the prompt when a reply could not be parsed or repaired
+RETRY_INSTRUCTION = "\nYour previous reply was not valid JSON in this format. Reply with the JSON object only."
+
+
+def parse_summary(response: str):
+    """Validated summary_json from an LLM reply, repaired locally if needed; None if unusable."""
+    data, status = loads_lenient(response)
+    summary = validate_summary(data)
+    if summary is None:
+        status = "invalid"
+    record_parse("summary", status, response)
+    return summary
+
+
+def fallback_summary(response: str, doc_type: str) -> dict:
+    """What a paper shows when no usable summary came back; never cached."""
+    return {
+        "type": doc_type,
+        "key_findings": [],
+        "methods": [],
+        "limitations": [],
+        "raw": response
+    }
+
+
+def request_summary(prompt: list, doc: dict, doc_type: str) -> dict:
+    """
+    Ask for a summary, re-asking (up to SUMMARY_MAX_ATTEMPTS calls) only when
+    the reply cannot be repaired locally. On failure the doc gets the
+    fallback and doc["summary_failed"], which keeps it out of the caches.
+    """
+    for attempt in range(config.SUMMARY_MAX_ATTEMPTS):
+        response = get_llm()(prompt).content.strip()
+        summary = parse_summary(response)
+        if summary is not None:
+            doc["summary_json"] = summary
+            doc.pop("summary_failed", None)
+            return doc
+        if attempt + 1 < config.SUMMARY_MAX_ATTEMPTS:
+            logger.warning("❌ Unusable summary JSON; asking again.")
+            REGISTRY.inc("llm_json_retries_total", stage="summary")
+            prompt = prompt[:-1] + [HumanMessage(content=prompt[-1].content + RETRY_INSTRUCTION)]
+
+    logger.warning("❌ Failed to parse JSON. Showing raw text; not cached.")
+    doc["summary_json"] = fallback_summary(response, doc_type)
+    doc["summary_failed"] = True
+    return doc
+
+
+CHUNK_NOTES_FORMAT = """{
+  "causes": ["cause 1"],
+  "key_findings": ["finding 1", "finding 2"],
+  "treatments": ["treatment: approach"],
+  "limitations": ["limitation: alternate treatment"],
+  "latest_treatments": ["treatment: institution, year, approval status, approach"]
+}"""
+
+
+def extract_chunk_notes(chunk: str, doc_type: str):
+    """Map step: pull the facts out of one chunk. Returns None if the reply is not valid JSON."""
+    prompt = [
+        SystemMessage(content=SUMMARIZER_SYSTEM),
+        HumanMessage(content=f"""
+The text below is one section of a longer {doc_type}.
+Extract what this section says, as JSON in this format ONLY:
+
+{CHUNK_NOTES_FORMAT}
+- Return **only valid JSON** (no markdown or commentary).
+- Use empty lists for anything this section does not mention.
+- do not hallucinate.
+Section:
+\"\"\"{chunk}\"\"\"
 """)
     ]
+    response = get_llm()(prompt).content.strip()
+    notes, status = loads_lenient(response)
+    if not isinstance(notes, dict):
+        notes, status = None, "invalid"
+        logger.warning("❌ Failed to parse chunk notes; section skipped and not cached.")
+    record_parse("chunk_notes", status, response)
+    return notes
 
-    response = llm(prompt).content.strip()
 
-    try:
-        parsed = json.loads(response)
-        doc["summary_json"] = parsed
-    except json.JSONDecodeError:
-        logger.warning("❌ Failed to parse JSON. Storing fallback raw text.")
-        doc["summary_json"] = {
-            "type": doc_type,
-            "key_findings": [],
-            "methods": [],
-            "limitations": [],
-            
-            "raw": response
-        }
+def summarize_long_document(doc: dict, text: str) -> dict:
+    """
+    Map-reduce summary of a document too long for one prompt.
 
-    return doc
+    Chunks are extracted in parallel and their notes cached by chunk hash, so
+    a re-fetched or overlapping document only pays for chunks not seen
+    before. One reduce call merges the notes into the SUMMARY_FORMAT schema.
+    """
+    doc_type = doc.get("type", "research paper")
+    chunks = split_into_chunks(text, config.CHUNK_TOKENS)
+    if len(chunks) > config.MAX_CHUNKS:
+        logger.info(f"[Summarizer] Using first {config.MAX_CHUNKS} of {len(chunks)} chunks")
+        chunks = chunks[:config.MAX_CHUNKS]
+
+    hashes = [hash_chunk(chunk) for chunk in chunks]
+    cached = get_cached_chunks(hashes)
+    pending = {h: chunk for h, chunk in zip(hashes, chunks) if h not in cached}
+    logger.info(f"[Summarizer] {len(chunks)} chunks, {len(pending)} to extract")
+
+    extracted = bounded_map(lambda chunk: extract_chunk_notes(chunk, doc_type),
+                            pending.values(), timeout=config.LLM_TIMEOUT)
+    new_notes = {h: notes for h, notes in zip(pending, extracted) if notes is not None}
+    store_chunks(new_notes)
+    notes = {**cached, **new_notes}
+
+    sections = [notes[h] for h in hashes if h in notes]
+    prompt = [
+        SystemMessage(content=SUMMARIZER_SYSTEM),
+        HumanMessage(content=f"""
+Below are notes extracted, section by section, from one {doc_type}.
+Merge them into a single summary in the following example JSON format ONLY:
+
+{SUMMARY_FORMAT}
+Section notes:
+{json.dumps(sections, indent=1)}
+""")
+    ]
+    return request_summary(prompt, doc, doc_type)
+
+
+# Characters of a document sent in a regular (not map-reduce) summary prompt
+SUMMARY_WINDOW = 3000
+
+SUMMARY_PROMPT = """
+Summarize the following {doc_type} in the following example JSON format ONLY:
+
+{summary_format}
+Document:
+\"\"\"{content}\"\"\"
+"""
+
+
+def summarize_document(doc: dict, window: int = None) -> dict:
+    """Summarize one doc into doc["summary_json"]; `window` caps the content sent and disables map-reduce."""
+    if window is not None:
+        content = doc["content"][:window]
+    elif config.LONG_DOC_MODE and doc.get("raw_content"):
+        text = doc["raw_content"]
+        if count_tokens(text) > config.CHUNK_TOKENS:
+            return summarize_long_document(doc, text)
+        content = text
+    else:
+        content = doc["content"][:SUMMARY_WINDOW]
+    doc_type = doc.get("type", "research paper")
+
+    prompt = [
+        SystemMessage(content=SUMMARIZER_SYSTEM),
+        HumanMessage(content=SUMMARY_PROMPT.format(doc_type=doc_type, summary_format=SUMMARY_FORMAT, content=content))
+    ]
+
+    return request_summary(prompt, doc, doc_type)
 
 def summarizer_node(state: dict):
     docs = state["docs"]
-    summarized = []
-
-    for doc in docs:
-        doc_hash = hash_doc_content(doc)
-        cached = get_cached_doc(doc_hash)
+    hashes = [doc_cache_key(doc) for doc in docs]
+    cached = get_cached_docs(hashes)
+    pending = {}
 
-        if cached and "summary_json" in cached:
+    for doc, doc_hash in zip(docs, hashes):
+        entry = cached.get(doc_hash)
+        if (entry and "summary_json" in entry and not is_failed_summary(entry["summary_json"])
+                and version_accepted(entry, "summary_json")):
             logger.info(f"[Summarizer] Cache hit: SHA={doc_hash}")
-            doc["summary_json"] = cached["summary_json"]
-        else:
+            doc["summary_json"] = entry["summary_json"]
+            adopt_versions(doc, entry)
+        elif doc_hash not in pending:
             logger.info(f"[Summarizer] Generating summary: SHA={doc_hash}")
-            doc = summarize_document(doc)
+            pending[doc_hash] = doc
 
-            store_doc(doc_hash, {
-                "type": doc.get("type", ""),
-                "summary_json": doc["summary_json"]
-            })
+    record_cache_lookup(hits=len(docs) - len(pending), misses=len(pending))
+    budget = state.get("budget")
+    selected, window = plan_llm_work(budget, list(pending.values()), SUMMARY_WINDOW, len(SUMMARY_FORMAT) + 200)
+    shortened = window < SUMMARY_WINDOW
+    chosen = {id(doc) for doc in selected}
+    pending = {doc_hash: doc for doc_hash, doc in pending.items() if id(doc) in chosen}
+    pending, done = claim_pending(pending, "summary_json")
+    try:
+        # One LLM call per distinct uncached document, run concurrently
+        timeout = config.LLM_TIMEOUT if budget is None else budget.call_timeout()
+        results = bounded_map(lambda doc: summarize_document(doc, window if shortened else None),
+                              pending.values(), timeout=timeout, return_exceptions=True)
+        for doc_hash, result in zip(list(pending), results):
+            if isinstance(result, Exception):
+                logger.warning(f"[Summarizer] Failed for SHA={doc_hash}: {result!r}")
+                if budget is not None:
+                    budget.degrade(*failure_degradation(result))
+                pending[doc_hash].pop("summary_json", None)
+        new_entries = {}
+        for doc_hash, doc in pending.items():
+            if "summary_json" in doc:
+                tag_fields(doc, "summary_json", producer="summarizer")
+                new_entries[doc_hash] = {"summary_json": doc["summary_json"], **version_fields(doc)}
+                if not doc.get("type_guessed"):
+                    new_entries[doc_hash]["type"] = doc.get("type", "")
+                    if "type_source" in doc:
+                        new_entries[doc_hash]["type_source"] = doc["type_source"]
+        if not shortened:
+            # Summaries of shortened prompts, and failed ones, are served once but never cached
+            update_docs({doc_hash: entry for doc_hash, entry in new_entries.items()
+                         if not pending[doc_hash].get("summary_failed")})
+    finally:
+        release_claims(pending, "summary_json")
+    new_entries.update(done)
 
-        summarized.append(doc)
+    for doc, doc_hash in zip(docs, hashes):
+        if doc_hash in new_entries:
+            doc["summary_json"] = new_entries[doc_hash]["summary_json"]
+            adopt_versions(doc, new_entries[doc_hash])
 
-    state["docs"] = summarized
+    # Papers left unsummarized, to stay within a budget or because the call failed, are dropped
+    state["docs"] = [doc for doc in docs if "summary_json" in doc]
     logger.info("[SUCCESS] Stored all summaries in state['docs']")
     return state
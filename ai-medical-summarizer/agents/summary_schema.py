@@ -0,0 +1,65 @@
+from typing import Any, List, Union
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from utils.metrics import REGISTRY
+
+import logging
+logger = logging.getLogger(__name__)
+
+# A list entry: a plain string, or a {name: detail} object as in SUMMARY_FORMAT
+SummaryItem = Union[str, dict, list]
+
+LIST_FIELDS = ("causes", "key_findings", "common treatment methods",
+               "limitations of certain treatments", "latest treatments")
+
+
+class Summary(BaseModel):
+    """Schema of doc["summary_json"]; keys keep the spaced names the PDF report and API expose."""
+
+    model_config = ConfigDict(populate_by_name=True, extra="allow")
+
+    type: str = ""
+    causes: List[SummaryItem] = Field(default_factory=list)
+    key_findings: List[SummaryItem] = Field(min_length=1)
+    common_treatment_methods: List[SummaryItem] = Field(default_factory=list, alias="common treatment methods")
+    limitations: List[SummaryItem] = Field(default_factory=list, alias="limitations of certain treatments")
+    latest_treatments: List[SummaryItem] = Field(default_factory=list, alias="latest treatments")
+
+    @field_validator("causes", "key_findings", "common_treatment_methods", "limitations", "latest_treatments",
+                     mode="before")
+    @classmethod
+    def as_list(cls, value: Any):
+        # Models sometimes answer a list field with one string or one {name: detail} object
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        if isinstance(value, dict):
+            return [{key: detail} for key, detail in value.items()]
+        return value
+
+
+def validate_summary(data: Any):
+    """
+    summary_json as a plain dict if `data` fits the Summary schema, else None.
+    Fields the reply left out stay out, so the stored shape matches the reply.
+    """
+    if not isinstance(data, dict):
+        return None
+    try:
+        summary = Summary.model_validate(data)
+    except ValidationError as e:
+        logger.info(f"[Summary] Reply does not match the schema: {e.error_count()} errors")
+        return None
+    return summary.model_dump(by_alias=True, exclude_unset=True)
+
+
+def record_parse(stage: str, status: str, response: str):
+    """Count a reply's parse outcome ("valid", "repaired", "invalid") and the estimated tokens of unusable ones."""
+    REGISTRY.inc("llm_json_parse_total", stage=stage, result=status)
+    if status == "invalid":
+        REGISTRY.inc("llm_json_wasted_tokens_total", len(response or "") // 4, stage=stage)
+
+
+def is_failed_summary(summary: Any) -> bool:
+    """True for the fallback stored for an unparseable reply (older caches may hold some)."""
+    return not isinstance(summary, dict) or "raw" in summary
@@ -0,0 +1,107 @@
+"""
+Version fingerprints of cached doc fields.
+
+A doc record's "type" and "summary_json" depend on the chat model, the
+prompt that produced them and the summary schema, none of which are part
+of the doc key. Each record therefore carries {"versions": {field:
+fingerprint}} and "computed_at", the fingerprint being that of the node
+(classifier, summarizer or fused analyzer) that produced the field. A
+field is current when its fingerprint matches any of its producers under
+today's prompts and model, so switching FUSED_ANALYSIS does not outdate
+anything. Lookups serve current fields and, per CACHE_ACCEPT_VERSIONS,
+older ones, so a prompt or model change does not empty the cache;
+recompute.py upgrades the outdated records later.
+"""
+
+import json
+import time
+import hashlib
+from functools import lru_cache
+
+import config
+from utils.metrics import REGISTRY
+
+import logging
+logger = logging.getLogger(__name__)
+
+VERSIONED_FIELDS = ("type", "summary_json")
+# The nodes that can produce each versioned field
+PRODUCERS = {"type": ("classifier", "analyzer"), "summary_json": ("summarizer", "analyzer")}
+# Version of records written before fingerprints existed
+LEGACY_VERSION = "legacy"
+
+
+def fingerprint(*parts) -> str:
+    """Short stable hash of the model, prompt and schema parts that produced a field."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
+@lru_cache(maxsize=None)
+def _producer_fingerprint(producer: str, model: str) -> str:
+    from agents.summary_schema import Summary
+
+    if producer == "classifier":
+        from agents.classifier import CLASSIFY_SYSTEM, CLASSIFY_PROMPT
+        return fingerprint(producer, model, CLASSIFY_SYSTEM, CLASSIFY_PROMPT)
+
+    schema = Summary.model_json_schema()
+    if producer == "analyzer":
+        from agents.analyzer import ANALYZER_SYSTEM, ANALYSIS_PROMPT
+        from agents.summarizer import SUMMARY_FORMAT
+        return fingerprint(producer, model, ANALYZER_SYSTEM, ANALYSIS_PROMPT, SUMMARY_FORMAT, schema)
+
+    from agents.summarizer import SUMMARIZER_SYSTEM, SUMMARY_PROMPT, SUMMARY_FORMAT, CHUNK_NOTES_FORMAT
+    return fingerprint(producer, model, SUMMARIZER_SYSTEM, SUMMARY_PROMPT, SUMMARY_FORMAT, CHUNK_NOTES_FORMAT, schema)
+
+
+def current_version(producer: str) -> str:
+    """Fingerprint of the fields `producer` computes under the current model and prompts."""
+    return _producer_fingerprint(producer, config.LLM_MODEL)
+
+
+def record_version(record: dict, field: str) -> str:
+    return (record.get("versions") or {}).get(field, LEGACY_VERSION)
+
+
+def is_current(record: dict, field: str) -> bool:
+    return record_version(record, field) in {current_version(producer) for producer in PRODUCERS[field]}
+
+
+def version_accepted(record: dict, field: str) -> bool:
+    """Whether a cached record's `field` may be served: current, or an accepted older version."""
+    version = record_version(record, field)
+    if is_current(record, field):
+        result = "current"
+    elif "*" in config.CACHE_ACCEPT_VERSIONS or version in config.CACHE_ACCEPT_VERSIONS:
+        result = "compatible"
+    else:
+        result = "rejected"
+    REGISTRY.inc("cache_version_total", field=field, result=result)
+    return result != "rejected"
+
+
+def adopt_versions(doc: dict, record: dict):
+    """Carry a cache hit's versions onto the doc, so records rebuilt from it keep them."""
+    versions = record.get("versions")
+    if versions:
+        doc["versions"] = {**doc.get("versions", {}), **versions}
+    if "computed_at" in record:
+        doc.setdefault("computed_at", record["computed_at"])
+
+
+def tag_fields(doc: dict, *fields, producer: str) -> dict:
+    """Mark `fields` of the doc as computed now by `producer`; returns the doc's versions."""
+    doc["versions"] = {**doc.get("versions", {}), **{field: current_version(producer) for field in fields}}
+    doc["computed_at"] = time.time()
+    return doc["versions"]
+
+
+def version_fields(doc: dict) -> dict:
+    """The {"versions", "computed_at"} part of a doc record written from `doc`."""
+    return {key: doc[key] for key in ("versions", "computed_at") if key in doc}
+
+
+def outdated_fields(record: dict) -> list:
+    """Versioned fields of a record not computed under the current version."""
+    return [field for field in VERSIONED_FIELDS if field in record and not is_current(record, field)]
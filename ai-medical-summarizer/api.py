@@ -0,0 +1,233 @@
+import json
+import asyncio
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+import config
+from graph_config import get_compiled, run_with_budget
+from utils.budget import Budget
+from data.cache_utils import hash_query, get_cached_result, store_result_in_cache, cache_stats
+from streaming import stream_pipeline
+from utils.pdf_worker import submit_pdf, get_job
+from utils.metrics import REGISTRY
+
+from logging_config import setup_logging
+import logging
+import warnings
+warnings.filterwarnings("ignore")
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class PipelineRunner:
+    """
+    Runs the compiled graph for the HTTP service.
+
+    Identical queries (same hash_query) that arrive while a run is in flight
+    share that run instead of starting another one. At most `max_workers`
+    graph runs execute at once and at most `max_queue` more may wait; beyond
+    that new queries are rejected so callers back off.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._inflight = {}
+        self._streams = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._inflight) + self._streams
+
+    async def acquire_stream(self):
+        """
+        Take a worker slot for a streamed run, waiting in the queue like
+        `run`; raises QueueFullError when full. Streams are not coalesced.
+        Pair with `release_stream` once the stream ends.
+        """
+        if self.depth >= self.max_workers + self.max_queue:
+            raise QueueFullError(f"{self.depth} queries already in flight")
+        self._streams += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self._streams -= 1
+            raise
+
+    def release_stream(self):
+        self._semaphore.release()
+        self._streams -= 1
+
+    async def run(self, query: str, budget: Budget = None) -> dict:
+        """Run (or join the in-flight run of) `query`; a joined run keeps its own budget."""
+        qhash = hash_query(query)
+        task = self._inflight.get(qhash)
+
+        if task is None:
+            if self.depth >= self.max_workers + self.max_queue:
+                raise QueueFullError(f"{self.depth} queries already in flight")
+            task = asyncio.ensure_future(self._execute(query, budget))
+            self._inflight[qhash] = task
+            task.add_done_callback(lambda _: self._inflight.pop(qhash, None))
+        else:
+            logger.info(f"[API] Coalesced with in-flight run: {query}")
+
+        # Shield so one client disconnecting does not cancel the shared run
+        return await asyncio.shield(task)
+
+    async def _execute(self, query: str, budget: Budget = None) -> dict:
+        async with self._semaphore:
+            if budget is not None:
+                # Time spent queued counts against the deadline
+                logger.info(f"[GRAPH] Running budgeted pipeline for query: {query}")
+                return await run_in_threadpool(run_with_budget, query, budget)
+            logger.info(f"[GRAPH] Running full pipeline for query: {query}")
+            result = await get_compiled().ainvoke({"query": query})
+        await run_in_threadpool(store_result_in_cache, query, result)
+        return result["final_output"]
+
+
+class PipelineStream(StreamingResponse):
+    """
+    Streams the events of a `stream_pipeline` run that holds a runner slot.
+
+    However the response ends (finished, failed, or the client gone before or
+    during the body) the run is closed, which shuts its executor down, and
+    the slot is released.
+    """
+
+    def __init__(self, events, format: str = "ndjson"):
+        self.events = events
+        self.format = format
+        media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+        super().__init__(self.encode(), media_type=media_type)
+
+    async def encode(self):
+        async for event in iterate_in_threadpool(self.events):
+            line = json.dumps(event)
+            yield f"data: {line}\n\n" if self.format == "sse" else f"{line}\n"
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # A cancelled body waits for the pipeline step it was running, so the run is idle here
+            await self.body_iterator.aclose()
+            self.events.close()
+            runner.release_stream()
+
+
+class SummarizeRequest(BaseModel):
+    query: str
+    # Seconds and LLM tokens the request may use; 0 or omitted means the API defaults
+    deadline_seconds: float = 0
+    token_budget: int = 0
+
+
+app = FastAPI(title="Medical Research Summarizer")
+runner = PipelineRunner(config.API_MAX_WORKERS, config.API_MAX_QUEUE)
+
+
+@app.on_event("startup")
+def start_refresh_scheduler():
+    if config.REFRESH_SCHEDULER_ENABLED:
+        # Imported here so the API starts cheaply when background refresh is off
+        from refresh import RefreshScheduler
+        app.state.refresh_scheduler = RefreshScheduler()
+        app.state.refresh_scheduler.start()
+
+
+@app.on_event("shutdown")
+def stop_refresh_scheduler():
+    scheduler = getattr(app.state, "refresh_scheduler", None)
+    if scheduler is not None:
+        scheduler.stop()
+
+
+@app.post("/summarize")
+async def summarize(request: SummarizeRequest):
+    query = request.query.strip()
+    if not query:
+        raise HTTPException(status_code=422, detail="Query must not be empty")
+
+    cached = await run_in_threadpool(get_cached_result, query)
+    if cached:
+        logger.info(f"[CACHE] Query hit: {query}")
+        return {"query": query, "cached": True, "result": cached["final_output"],
+                "report": report_handle(cached["final_output"])}
+
+    deadline = request.deadline_seconds or config.API_DEADLINE_SECONDS
+    token_budget = request.token_budget or config.API_TOKEN_BUDGET
+    budget = Budget(deadline, token_budget) if deadline or token_budget else None
+    try:
+        output = await runner.run(query, budget)
+    except QueueFullError as e:
+        logger.warning(f"[API] Rejecting query, queue full: {e}")
+        raise HTTPException(status_code=429, detail="Too many queries in progress", headers={"Retry-After": "5"})
+
+    return {"query": query, "cached": False, "result": output, "report": report_handle(output)}
+
+
+def report_handle(final_output: dict) -> dict:
+    job = submit_pdf(final_output)
+    return {"id": job.id, "status": job.status, "url": f"/reports/{job.id}"}
+
+
+@app.get("/reports/{job_id}")
+def report(job_id: str):
+    """Download a rendered PDF report, or get its status while it renders."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown report")
+    if job.status == "done":
+        return FileResponse(job.path, media_type="application/pdf")
+    return {"id": job.id, "status": job.status}
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(request: SummarizeRequest, format: str = "ndjson"):
+    """Stream pipeline events, one paper at a time, as NDJSON or server-sent events."""
+    query = request.query.strip()
+    if not query:
+        raise HTTPException(status_code=422, detail="Query must not be empty")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=422, detail="format must be 'ndjson' or 'sse'")
+
+    # Streams share the runner's worker slots, so they cannot bypass its limits
+    try:
+        await runner.acquire_stream()
+    except QueueFullError as e:
+        logger.warning(f"[API] Rejecting stream, queue full: {e}")
+        raise HTTPException(status_code=429, detail="Too many queries in progress", headers={"Retry-After": "5"})
+    return PipelineStream(stream_pipeline(query), format)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "in_flight": runner.depth,
+        "max_workers": runner.max_workers,
+        "max_queue": runner.max_queue,
+        "query_cache": cache_stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-node latency, token and cache metrics in Prometheus text format."""
+    return REGISTRY.to_prometheus()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Batch mode: run many research queries from a JSONL or CSV file.
+
+Usage:
+    python batch.py queries.jsonl --output results.jsonl --concurrency 8
+
+Each input line is either {"query": "..."} or a bare JSON string (JSONL), or
+a row with a "query" column (CSV). Results are appended to the output JSONL
+as each query finishes, so an interrupted run resumes where it stopped.
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from agents.nodes import retriever_node, reranker_node, dedup_node, assembler_node
+from agents.citation import build_citation
+from data.cache_utils import hash_query, get_cached_result, store_result_in_cache
+from data.doc_cache_utils import doc_cache_key
+from streaming import process_document
+from utils.concurrency import bounded_map
+from utils.usage import UsageMeter, track_usage
+
+from logging_config import setup_logging
+import logging
+import warnings
+warnings.filterwarnings("ignore")
+
+logger = logging.getLogger(__name__)
+
+
+def read_queries(path: str) -> list:
+    """Read queries from a .jsonl or .csv file, dropping blanks and duplicates (by hash_query)."""
+    queries = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+            column = "query" if "query" in (rows.fieldnames or []) else rows.fieldnames[0]
+            queries = [row[column] for row in rows]
+        else:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    queries.append(item["query"] if isinstance(item, dict) else item)
+
+    unique = {}
+    for query in queries:
+        query = (query or "").strip()
+        if query:
+            unique.setdefault(hash_query(query), query)
+    return list(unique.values())
+
+
+def read_checkpoint(path: str) -> set:
+    """Return hashes of queries already completed in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial line left by a crash; the query is simply re-run
+                continue
+            if "error" not in record:
+                done.add(record["query_hash"])
+    return done
+
+
+class DocDeduper:
+    """
+    Shares per-document work across all queries in a batch.
+
+    The first query to reach a document (by doc_cache_key) classifies and
+    summarizes it; concurrent queries with the same document wait for that
+    result instead of making their own LLM calls.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def process(self, doc: dict) -> dict:
+        key = doc_cache_key(doc)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.shared += 1
+
+        if owner:
+            try:
+                result = process_document(doc)
+            except Exception as e:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                future.set_exception(e)
+                raise
+            if result is None:
+                # Dropped after a failed LLM call: waiters drop it too, later queries retry
+                with self._lock:
+                    self._inflight.pop(key, None)
+                future.set_result(None)
+                return None
+            shared = {"type": result.get("type", ""), "summary_json": result["summary_json"]}
+            if result.get("summary_failed"):
+                # Waiters get the fallback marked as failed, so it is never cached;
+                # queries that reach the doc later try again instead of reusing it
+                shared["summary_failed"] = True
+                with self._lock:
+                    self._inflight.pop(key, None)
+            future.set_result(shared)
+            return result
+
+        shared = future.result()
+        if shared is None:
+            return None
+        doc.update(shared)
+        return build_citation(doc)
+
+
+class BatchRunner:
+    def __init__(self, output_path: str, concurrency: int = 4):
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.deduper = DocDeduper()
+        self.meter = UsageMeter()
+        self._write_lock = threading.Lock()
+        self.counts = {"completed": 0, "cached": 0, "failed": 0, "skipped": 0, "docs": 0}
+
+    def _write(self, record: dict):
+        with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            key = "failed" if "error" in record else "completed"
+            self.counts[key] += 1
+            if record.get("cached"):
+                self.counts["cached"] += 1
+
+    def run_query(self, query: str):
+        record = {"query": query, "query_hash": hash_query(query)}
+        try:
+            cached = get_cached_result(query)
+            if cached:
+                record.update(cached=True, result=cached["final_output"])
+            else:
+                state = dedup_node(reranker_node(retriever_node({"query": query})))
+                state["docs"] = [doc for doc in bounded_map(self.deduper.process, state["docs"]) if doc is not None]
+                state = assembler_node(state)
+                store_result_in_cache(query, state)
+                with self._write_lock:
+                    self.counts["docs"] += len(state["docs"])
+                record.update(cached=False, result=state["final_output"])
+        except Exception as e:
+            logger.error(f"[BATCH] Query failed: {query}: {str(e)}")
+            record["error"] = str(e)
+        self._write(record)
+
+    def run(self, queries: list) -> dict:
+        done = read_checkpoint(self.output_path)
+        todo = [query for query in queries if hash_query(query) not in done]
+        self.counts["skipped"] = len(queries) - len(todo)
+        logger.info(f"[BATCH] {len(todo)} queries to run, {self.counts['skipped']} already done")
+
+        # Terminate a partial last line so appended records stay one per line
+        if os.path.exists(self.output_path) and os.path.getsize(self.output_path):
+            with open(self.output_path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+        start = time.monotonic()
+        with track_usage(self.meter):
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for query in todo:
+                    pool.submit(contextvars.copy_context().run, self.run_query, query)
+        return self.summary(len(todo), time.monotonic() - start)
+
+    def summary(self, attempted: int, elapsed: float) -> dict:
+        usage = self.meter.snapshot()
+        lookups = usage["cache_hits"] + usage["cache_misses"]
+        return {
+            "queries_attempted": attempted,
+            **self.counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "queries_per_second": round(attempted / elapsed, 3) if elapsed else 0.0,
+            "query_cache_hit_rate": round(self.counts["cached"] / attempted, 3) if attempted else 0.0,
+            "doc_cache_hit_rate": round(usage["cache_hits"] / lookups, 3) if lookups else 0.0,
+            "docs_shared_across_queries": self.deduper.shared,
+            "llm_calls": usage["llm_calls"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+            "estimated_cost_usd": round(self.meter.estimated_cost, 4)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run research queries in batch")
+    parser.add_argument("input", help="JSONL or CSV file of queries")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Output JSONL (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries processed at once")
+    args = parser.parse_args()
+
+    setup_logging()
+    queries = read_queries(args.input)
+    summary = BatchRunner(args.output, args.concurrency).run(queries)
+
+    with open(f"{args.output}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
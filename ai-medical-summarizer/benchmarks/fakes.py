@@ -0,0 +1,120 @@
+"""
+Deterministic local stand-ins for ChatOpenAI and TavilyClient.
+
+Latency, jitter and error rate are configurable; every random draw is seeded
+from the request itself, so a given prompt or query always behaves the same.
+"""
+
+import json
+import time
+import random
+import hashlib
+
+from langchain.schema import AIMessage
+
+from utils.usage import record_llm_call
+
+WORDS = (
+    "tumor therapy patients trial cohort survival immunotherapy biomarker dose placebo "
+    "randomized outcome hepatitis cirrhosis insulin glucose mutation screening diagnosis "
+    "chemotherapy radiation surgery inhibitor receptor antibody vaccine incidence risk"
+).split()
+
+
+class FakeServiceError(RuntimeError):
+    pass
+
+
+def _rng(seed: int, text: str) -> random.Random:
+    digest = hashlib.sha256(f"{seed}:{text}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _delay(rng: random.Random, latency: float, jitter: float):
+    delay = latency + rng.uniform(0, jitter)
+    if delay > 0:
+        time.sleep(delay)
+
+
+class FakeChatModel:
+    """Answers classifier, summarizer and fused-analyzer prompts with canned output."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def reply_for(self, prompt: str, rng: random.Random) -> str:
+        label = rng.choice(["clinical trial", "meta-analysis", "review", "case study"])
+        summary = {
+            "type": label,
+            "causes": [f"cause {rng.choice(WORDS)}"],
+            "key_findings": [" ".join(rng.choices(WORDS, k=12)) for _ in range(3)],
+            "common treatment methods": [{rng.choice(WORDS): "standard approach"}],
+            "limitations of certain treatments": [{rng.choice(WORDS): "alternative"}],
+            "latest treatments": [{rng.choice(WORDS): {"approved_for_use": "Under Trials"}}]
+        }
+        if "document_type" in prompt:
+            return json.dumps({"document_type": label, "summary": summary})
+        if "JSON" in prompt:
+            return json.dumps(summary)
+        return label
+
+    def __call__(self, messages, **kwargs):
+        prompt = "\n".join(message.content for message in messages)
+        rng = _rng(self.seed, prompt)
+        _delay(rng, self.latency, self.jitter)
+        if rng.random() < self.error_rate:
+            raise FakeServiceError("Injected chat model failure")
+        reply = self.reply_for(prompt, rng)
+        record_llm_call(prompt_tokens=len(prompt) // 4, completion_tokens=len(reply) // 4)
+        return AIMessage(content=reply)
+
+    invoke = __call__
+
+
+class FakeSearchClient:
+    """Returns papers from a fixed synthetic corpus, so queries overlap like real searches do."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, corpus_size: int = 200):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.corpus_size = corpus_size
+
+    def paper(self, index: int) -> dict:
+        rng = _rng(self.seed, f"paper-{index}")
+        text = " ".join(rng.choices(WORDS, k=400))
+        return {
+            "title": f"Synthetic paper {index}: {' '.join(rng.choices(WORDS, k=4))}",
+            "url": f"https://papers.example.org/{index}",
+            "content": text[:800],
+            "raw_content": text,
+            "score": round(rng.random(), 3),
+            "published_date": f"{rng.randint(2005, 2025)}-01-01"
+        }
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> dict:
+        rng = _rng(self.seed, query.strip().lower())
+        _delay(rng, self.latency, self.jitter)
+        if rng.random() < self.error_rate:
+            raise FakeServiceError("Injected search failure")
+        picks = rng.sample(range(self.corpus_size), k=min(max_results, self.corpus_size))
+        return {"query": query, "results": [self.paper(index) for index in picks]}
+
+
+def install_fakes(chat: FakeChatModel = None, search: FakeSearchClient = None):
+    """Point every agent at the fakes in place of the live OpenAI and Tavily clients."""
+    import providers
+    from utils.search_client import RetryingSearchClient
+
+    chat = chat or FakeChatModel()
+    search = search or FakeSearchClient()
+    providers.override("chat", chat)
+    providers.override("json_chat", chat)
+    # Keep the production retry policy around the fake search backend
+    providers.override("search", RetryingSearchClient(search))
+    return chat, search
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Startup-time budgets for the entry-point modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`.
+Its cumulative import time is checked against a budget, and the interpreter
+also confirms that none of the heavy dependencies were loaded eagerly; those
+belong behind providers.py or inside the functions that need them.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 5 --budget api=500 --output startup.json
+
+Exits non-zero when a module is over budget or imports a deferred dependency.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets (ms) for a cold interpreter
+BUDGETS_MS = {
+    "graph_config": 100,
+    "main_graph": 400,
+    "batch": 400,
+    "api": 800,
+}
+
+# Must not be imported until first use
+DEFERRED = ("langgraph", "langchain_openai", "openai", "tavily", "reportlab", "tiktoken", "numpy")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """{module: (self_us, cumulative_us)} from `-X importtime` output."""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def profile_import(module: str) -> dict:
+    """Import `module` in a fresh interpreter; return its import timings and any deferred modules it loaded."""
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {DEFERRED!r} if m in sys.modules]))")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    timings = parse_importtime(proc.stderr)
+    return {
+        "total_ms": timings[module][1] / 1000,
+        "heaviest": sorted(((name, us / 1000) for name, (us, _) in timings.items()),
+                           key=lambda item: item[1], reverse=True)[:10],
+        "eager_deferred": json.loads(proc.stdout.strip().splitlines()[-1])
+    }
+
+
+def run(budgets: dict, runs: int = 3) -> dict:
+    results = {}
+    for module, budget in budgets.items():
+        samples = [profile_import(module) for _ in range(runs)]
+        total = statistics.median(sample["total_ms"] for sample in samples)
+        eager = sorted({name for sample in samples for name in sample["eager_deferred"]})
+        results[module] = {
+            "median_ms": round(total, 1),
+            "budget_ms": budget,
+            "eager_deferred": eager,
+            "ok": total <= budget and not eager,
+            "heaviest_self_ms": [[name, round(ms, 2)] for name, ms in samples[-1]["heaviest"]]
+        }
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time budgets for entry-point modules")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module; the median is checked")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="Override or add a budget")
+    parser.add_argument("--output", help="Write JSON results here as well")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    budgets = dict(BUDGETS_MS)
+    for item in args.budget:
+        module, ms = item.split("=")
+        budgets[module] = float(ms)
+
+    results = run(budgets, args.runs)
+    for module, result in results.items():
+        status = "ok" if result["ok"] else "OVER"
+        extra = f"  eager: {', '.join(result['eager_deferred'])}" if result["eager_deferred"] else ""
+        print(f"{status:4}  {module:14} {result['median_ms']:8.1f} ms  (budget {result['budget_ms']} ms){extra}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(result["ok"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmarks for the pipeline and its cache layers.
+
+Runs entirely against benchmarks.fakes, in a scratch working directory, so
+no network access or API keys are needed and the real caches are untouched.
+
+Usage:
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --quick
+
+Scenarios:
+    cold_graph / warm_graph   compiled.invoke with an empty vs. populated doc cache
+    cold_pipeline / warm_pipeline   run_pipeline misses vs. query cache hits
+    cache_size_<n>            query/doc cache lookups with n synthetic entries; the
+                              _legacy_disk_hit variant reports both layouts' bytes on disk
+    concurrency_<c>           c concurrent cold queries through run_pipeline
+
+Results are JSON: per scenario, throughput and latency percentiles (ms).
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+import logging
+import warnings
+warnings.filterwarnings("ignore")
+
+
+def summarize_latencies(name: str, latencies: list, elapsed: float, errors: int, **params) -> dict:
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "scenario": name,
+        "params": params,
+        "count": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(float(values.mean()), 3),
+            "p50": round(float(np.percentile(values, 50)), 3),
+            "p95": round(float(np.percentile(values, 95)), 3),
+            "p99": round(float(np.percentile(values, 99)), 3),
+            "max": round(float(values.max()), 3)
+        }
+    }
+
+
+def measure(fn, items, concurrency: int = 1):
+    """Call fn on every item with `concurrency` threads; return (latencies, elapsed, errors)."""
+    latencies, errors = [], 0
+
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            fn(item)
+            return time.perf_counter() - start, False
+        except Exception:
+            return time.perf_counter() - start, True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, failed in pool.map(timed, items):
+            latencies.append(latency)
+            errors += failed
+    return latencies, time.perf_counter() - start, errors
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.origin = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix="summarizer-bench-")
+        os.chdir(self.workdir)
+        os.makedirs("data", exist_ok=True)
+
+        # Imported only now so every relative cache/log path lands in the scratch dir
+        import config
+        config.REPORT_DIR = os.path.join(self.workdir, "reports")
+        import main_graph
+        import data.cache_utils as cache_utils
+        import data.doc_cache_utils as doc_cache_utils
+        import data.search_cache as search_cache
+        from graph_config import get_compiled
+        from benchmarks.fakes import FakeChatModel, FakeSearchClient, install_fakes
+
+        logging.getLogger().setLevel(logging.WARNING)
+        self.main_graph = main_graph
+        self.cache_utils = cache_utils
+        self.doc_cache_utils = doc_cache_utils
+        self.search_cache = search_cache
+        self.compiled = get_compiled()
+        install_fakes(
+            FakeChatModel(args.llm_latency, args.llm_jitter, args.llm_error_rate, args.seed),
+            FakeSearchClient(args.search_latency, args.search_jitter, args.search_error_rate, args.seed)
+        )
+
+    def reset_caches(self):
+        """Start from empty query, doc and search caches."""
+        from data.memory_cache import TTLCache
+        from data.popularity import set_popularity
+        self.doc_cache_utils.set_doc_store(None)
+        self.doc_cache_utils.set_chunk_store(None)
+        self.doc_cache_utils.set_near_dup_index(None)
+        self.search_cache.set_search_store(None)
+        self.cache_utils.set_query_store(None)
+        self.cache_utils._hot_cache = TTLCache(
+            max_entries=self.cache_utils.config.QUERY_CACHE_HOT_ENTRIES,
+            ttl=self.cache_utils.config.QUERY_CACHE_HOT_TTL
+        )
+        self.cache_utils._semantic_index = None
+        set_popularity(None)
+        shutil.rmtree("data", ignore_errors=True)
+        os.makedirs("data")
+
+    def run_pipeline(self, query: str):
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            return self.main_graph.run_pipeline(query)
+
+    def queries(self, count: int, prefix: str = "condition"):
+        return [f"latest research on {prefix} {i}" for i in range(count)]
+
+    def graph_scenarios(self):
+        queries = self.queries(self.args.queries, "graph")
+        self.reset_caches()
+        invoke = lambda q: self.compiled.invoke({"query": q})
+        results = [summarize_latencies("cold_graph", *measure(invoke, queries), queries=len(queries))]
+        results.append(summarize_latencies("warm_graph", *measure(invoke, queries), queries=len(queries)))
+        return results
+
+    def pipeline_scenarios(self):
+        queries = self.queries(self.args.queries, "pipeline")
+        self.reset_caches()
+        results = [summarize_latencies("cold_pipeline", *measure(self.run_pipeline, queries), queries=len(queries))]
+        results.append(summarize_latencies("warm_pipeline", *measure(self.run_pipeline, queries), queries=len(queries)))
+        return results
+
+    def synthetic_doc(self, i: int) -> dict:
+        words = f"finding {i} tumor response survival cohort " * 20
+        title = f"paper {i}"
+        link = f"https://papers.example.org/{i}"
+        return {
+            "title": title, "link": link, "source": link, "content": words[:800], "type": "review",
+            "summary_json": {"type": "review", "key_findings": [words[:120]] * 3, "causes": [f"cause {i}"]},
+            "citation": f"[{title}]({link})"
+        }
+
+    def synthetic_result(self, i: int, size: int) -> dict:
+        """A cached result for query i over docs i, i+1, i+2 (mod size), as the pipeline stores it."""
+        from agents.assembler import assemble_json
+        query = f"synthetic query {i}"
+        docs = [self.synthetic_doc((i + k) % size) for k in range(3)]
+        return {"query": query, "docs": docs, "final_output": assemble_json(docs, query), "cached_at": time.time()}
+
+    def populate(self, size: int) -> list:
+        """Fill the query store and doc store with `size` synthetic queries and docs; return the doc keys."""
+        self.reset_caches()
+        entries, records = {}, {}
+        for i in range(size):
+            result = self.synthetic_result(i, size)
+            entry, doc_records = self.cache_utils.normalize_entry(result["query"], result)
+            entries[self.cache_utils.hash_query(result["query"])] = entry
+            records.update(doc_records)
+        self.doc_cache_utils.store_docs(records)
+        self.cache_utils.get_query_store().put_many(entries)
+        return list(records)
+
+    def write_legacy_cache(self, size: int, path: str) -> int:
+        """Write the pre-normalization layout (full doc copies per query) and return its size in bytes."""
+        legacy = {}
+        for i in range(size):
+            result = self.synthetic_result(i, size)
+            legacy[self.cache_utils.hash_query(result["query"])] = result
+        with open(path, "w") as f:
+            json.dump(legacy, f, indent=2)
+        return os.path.getsize(path)
+
+    def cache_size_scenarios(self):
+        results = []
+        lookups = self.args.lookups
+        for size in self.args.cache_sizes:
+            stored_keys = self.populate(size)
+            hits = [f"synthetic query {i % size}" for i in range(lookups)]
+            misses = [f"uncached query {i}" for i in range(lookups)]
+            # Keys the records were actually stored under (content hashes), so every lookup hits
+            doc_keys = [[stored_keys[(i * 7 + k) % len(stored_keys)] for k in range(3)] for i in range(lookups)]
+
+            def disk_lookup(query):
+                self.cache_utils._hot_cache.clear()
+                return self.cache_utils.get_cached_result(query)
+
+            results.append(summarize_latencies(f"cache_size_{size}_disk_hit", *measure(disk_lookup, hits), entries=size))
+            for query in hits:
+                self.cache_utils.get_cached_result(query)
+            results.append(summarize_latencies(f"cache_size_{size}_hot_hit",
+                                               *measure(self.cache_utils.get_cached_result, hits), entries=size))
+            results.append(summarize_latencies(f"cache_size_{size}_miss",
+                                               *measure(self.cache_utils.get_cached_result, misses), entries=size))
+            found = sum(len(self.doc_cache_utils.get_cached_docs(keys)) for keys in doc_keys)
+            results.append(summarize_latencies(f"cache_size_{size}_doc_lookup",
+                                               *measure(self.doc_cache_utils.get_cached_docs, doc_keys), entries=size,
+                                               hit_rate=round(found / sum(len(keys) for keys in doc_keys), 3)))
+
+            if size <= self.args.legacy_max_size:
+                # Same data in the old layout: every lookup re-parses the whole file
+                db_bytes = sum(os.path.getsize(path) for path in glob.glob(f"{self.cache_utils.config.CACHE_DB_PATH}*"))
+                legacy_path = os.path.join("data", "legacy_cached_docs.json")
+                legacy_bytes = self.write_legacy_cache(size, legacy_path)
+
+                def legacy_lookup(query):
+                    with open(legacy_path) as f:
+                        return json.load(f).get(self.cache_utils.hash_query(query))
+
+                results.append(summarize_latencies(f"cache_size_{size}_legacy_disk_hit",
+                                                   *measure(legacy_lookup, hits[:max(1, lookups // 5)]),
+                                                   entries=size, legacy_bytes=legacy_bytes, normalized_bytes=db_bytes))
+        return results
+
+    def concurrency_scenarios(self):
+        results = []
+        for concurrency in self.args.concurrency:
+            self.reset_caches()
+            queries = self.queries(max(self.args.queries, concurrency * 2), f"concurrent-{concurrency}")
+            results.append(summarize_latencies(f"concurrency_{concurrency}",
+                                               *measure(self.run_pipeline, queries, concurrency=concurrency),
+                                               concurrency=concurrency, queries=len(queries)))
+        return results
+
+    def rerank_scenarios(self):
+        """Latency of one local reranking pass over N candidate papers, for each N in --rerank-sizes."""
+        from agents.reranker import rerank
+        from benchmarks.fakes import FakeSearchClient
+
+        corpus = FakeSearchClient(seed=self.args.seed)
+        queries = self.queries(max(1, self.args.lookups // 5), "tumor therapy")
+        # Pay the one-off scikit-learn import outside the measurements
+        rerank(queries[0], [corpus.paper(0), corpus.paper(1)])
+        results = []
+        for size in self.args.rerank_sizes:
+            candidates = [corpus.paper(i) for i in range(size)]
+            for candidate in candidates:
+                candidate["link"] = candidate["url"]
+            results.append(summarize_latencies(f"rerank_{size}",
+                                               *measure(lambda q: rerank(q, candidates, top_k=3), queries),
+                                               candidates=size))
+        return results
+
+    def run(self) -> dict:
+        scenarios = []
+        try:
+            for group in (self.graph_scenarios, self.pipeline_scenarios,
+                          self.cache_size_scenarios, self.concurrency_scenarios, self.rerank_scenarios):
+                scenarios.extend(group())
+                print(f"[bench] {group.__name__} done", file=sys.stderr)
+        finally:
+            # Let queued PDF renders finish before their directory goes away
+            from utils import pdf_worker
+            pdf_worker.shutdown(wait=True)
+            from data.popularity import set_popularity
+            set_popularity(None)
+            os.chdir(self.origin)
+            shutil.rmtree(self.workdir, ignore_errors=True)
+        return {
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "settings": {key: value for key, value in vars(self.args).items() if key != "output"},
+            "scenarios": scenarios
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    int_list = lambda text: [int(part) for part in text.split(",") if part]
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="Small sizes, for smoke runs and CI")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--cache-sizes", type=int_list, default=[10, 1000, 10000, 100000])
+    parser.add_argument("--legacy-max-size", type=int, default=10000,
+                        help="Largest cache size also measured in the legacy single-file layout")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16, 64])
+    parser.add_argument("--rerank-sizes", type=int_list, default=[20, 1000, 5000],
+                        help="Candidate counts for the reranker latency scenarios")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--search-jitter", type=float, default=0.1)
+    parser.add_argument("--search-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    if "--quick" in (sys.argv[1:] if argv is None else argv):
+        # Smaller defaults; options given explicitly still win
+        parser.set_defaults(queries=4, lookups=10, cache_sizes=[10, 1000], concurrency=[1, 4], rerank_sizes=[20, 1000],
+                            llm_latency=0.005, llm_jitter=0.005, search_latency=0.005, search_jitter=0.005)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    report = Bench(args).run()
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
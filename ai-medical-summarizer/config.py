@@ -5,3 +5,144 @@ load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+
+# Cache storage: "sqlite" (default), "mongo" to share caches across replicas, or "json" for the legacy whole-file caches
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "data/cache.db")
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "medical_summarizer")
+# Mongo backend: a worker's lease on a doc it is computing, and how long others wait for it before computing it themselves (seconds)
+CLAIM_LEASE = float(os.getenv("CLAIM_LEASE", "180"))
+CLAIM_WAIT = float(os.getenv("CLAIM_WAIT", "90"))
+
+# Chat model behind every LLM call; part of the version fingerprint of cached types and summaries
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+# Doc records computed under another model/prompt/schema fingerprint that lookups still serve:
+# "*" (default) any older version, a comma-separated list of fingerprints ("legacy" = untagged
+# records), or empty for the current version only. `python recompute.py` upgrades them in the background
+CACHE_ACCEPT_VERSIONS = [v.strip() for v in os.getenv("CACHE_ACCEPT_VERSIONS", "*").split(",") if v.strip()]
+# Background recompute: LLM tokens one run may spend, and "oldest" or "popular" records first
+RECOMPUTE_TOKEN_BUDGET = int(os.getenv("RECOMPUTE_TOKEN_BUDGET", "200000"))
+RECOMPUTE_ORDER = os.getenv("RECOMPUTE_ORDER", "popular")
+
+# Per-document LLM calls: max requests in flight per node and per-call timeout (seconds)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Classify and summarize each document with one fused LLM call instead of two
+FUSED_ANALYSIS = os.getenv("FUSED_ANALYSIS", "false").lower() in ("1", "true", "yes")
+
+# In-memory hot layer in front of the on-disk query cache
+QUERY_CACHE_HOT_ENTRIES = int(os.getenv("QUERY_CACHE_HOT_ENTRIES", "256"))
+QUERY_CACHE_HOT_BYTES = int(os.getenv("QUERY_CACHE_HOT_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_HOT_TTL = float(os.getenv("QUERY_CACHE_HOT_TTL", "300"))
+# Max age in seconds of a cached research summary before it is re-fetched (0 = never stale)
+QUERY_CACHE_MAX_AGE = float(os.getenv("QUERY_CACHE_MAX_AGE", "0"))
+# Seconds after its last write that the mongo backend deletes a query entry (0 = kept).
+# Stale entries stay readable until then for refresh and the stale fallback.
+QUERY_CACHE_RETENTION = float(os.getenv("QUERY_CACHE_RETENTION", "0"))
+
+# Semantic query cache: reuse results of a previous query whose embedding is close enough
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing")
+
+# HTTP service: concurrent pipeline runs and how many more may wait before returning 429
+API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "4"))
+API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "16"))
+
+# Background PDF rendering: worker processes and output directory
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+REPORT_DIR = os.getenv("REPORT_DIR", ".")
+
+# Log files: the free-text pipeline log and the JSON-lines metrics sink
+PIPELINE_LOG_PATH = os.getenv("PIPELINE_LOG_PATH", "pipeline.log")
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "metrics.log")
+
+# LLM prices (USD per million tokens) used for cost estimates in batch reports
+LLM_PRICE_PER_1M_INPUT = float(os.getenv("LLM_PRICE_PER_1M_INPUT", "0.15"))
+LLM_PRICE_PER_1M_OUTPUT = float(os.getenv("LLM_PRICE_PER_1M_OUTPUT", "0.60"))
+
+# Long-document mode: summarize the retriever's full page text by map-reduce over
+# token-budgeted chunks instead of the first 3000 characters of the snippet
+LONG_DOC_MODE = os.getenv("LONG_DOC_MODE", "false").lower() in ("1", "true", "yes")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "1500"))
+MAX_CHUNKS = int(os.getenv("MAX_CHUNKS", "12"))
+
+# Web search: cached responses expire after SEARCH_CACHE_TTL seconds (0 = never)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "86400"))
+# Search client: keep-alive pool size, retries with jittered backoff, per-attempt timeout and per-call deadline (seconds)
+SEARCH_POOL_SIZE = int(os.getenv("SEARCH_POOL_SIZE", "10"))
+SEARCH_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "3"))
+SEARCH_BACKOFF_BASE = float(os.getenv("SEARCH_BACKOFF_BASE", "0.5"))
+SEARCH_BACKOFF_MAX = float(os.getenv("SEARCH_BACKOFF_MAX", "8"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "20"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "45"))
+
+# Near-duplicate documents: MinHash/LSH match against known docs; a match reuses that doc's cached type and summary
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "false").lower() in ("1", "true", "yes")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", "64"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+
+# Local classifier fast path (train with `python -m agents.local_classifier train`): answers at or
+# above this confidence skip the LLM; below it, or with no trained model, the LLM classifies
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "false").lower() in ("1", "true", "yes")
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+
+# Shared rate limits per external service (requests and tokens per minute, max calls in flight);
+# the in-flight limit adapts (AIMD) to 429s and to latency above the target (seconds)
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_LATENCY_TARGET = float(os.getenv("OPENAI_LATENCY_TARGET", "30"))
+TAVILY_RPM = float(os.getenv("TAVILY_RPM", "100"))
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", "8"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "500"))
+
+# Incremental refresh: the scheduler wakes every REFRESH_INTERVAL seconds and re-retrieves up to
+# REFRESH_BUDGET of the most requested queries older than REFRESH_MIN_AGE, stopping early once
+# REFRESH_MAX_NEW_DOCS new or changed documents have been analyzed in that cycle
+REFRESH_SCHEDULER_ENABLED = os.getenv("REFRESH_SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "3600"))
+REFRESH_BUDGET = int(os.getenv("REFRESH_BUDGET", "5"))
+REFRESH_MAX_NEW_DOCS = int(os.getenv("REFRESH_MAX_NEW_DOCS", "20"))
+REFRESH_MIN_AGE = float(os.getenv("REFRESH_MIN_AGE", "86400"))
+
+# Query popularity: decayed request counts (half-life in seconds), written every N requests
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE", "604800"))
+POPULARITY_FLUSH_EVERY = int(os.getenv("POPULARITY_FLUSH_EVERY", "20"))
+
+# Wide-recall retrieval with local reranking: fetch RERANK_CANDIDATES results (Tavily returns at
+# most 20) and send only the RERANK_TOP_K best by BM25 relevance, recency and document type to the LLM
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+RERANK_RECENCY_WEIGHT = float(os.getenv("RERANK_RECENCY_WEIGHT", "0.2"))
+RERANK_TYPE_WEIGHT = float(os.getenv("RERANK_TYPE_WEIGHT", "0.1"))
+RERANK_HALF_LIFE_YEARS = float(os.getenv("RERANK_HALF_LIFE_YEARS", "5"))
+
+# Search sources queried in parallel and fused by reciprocal rank (tavily, europepmc, pubmed);
+# with more than one, each gets SEARCH_SOURCE_DEADLINE seconds and a hedged duplicate request
+# once it is slower than SEARCH_HEDGE_AFTER seconds
+SEARCH_SOURCES = [name.strip() for name in os.getenv("SEARCH_SOURCES", "tavily").split(",") if name.strip()]
+SEARCH_SOURCE_DEADLINE = float(os.getenv("SEARCH_SOURCE_DEADLINE", "10"))
+SEARCH_HEDGE_AFTER = float(os.getenv("SEARCH_HEDGE_AFTER", "3"))
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+EUROPE_PMC_URL = os.getenv("EUROPE_PMC_URL", "https://www.ebi.ac.uk/europepmc/webservices/rest")
+EUROPE_PMC_RPM = float(os.getenv("EUROPE_PMC_RPM", "300"))
+PUBMED_URL = os.getenv("PUBMED_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+NCBI_API_KEY = os.getenv("NCBI_API_KEY")
+# NCBI allows 3 requests/second without an API key (10 with one); each search makes two
+PUBMED_RPM = float(os.getenv("PUBMED_RPM", "180"))
+
+# Request budgets: expected seconds per LLM call (to plan under a deadline) and the document window,
+# in characters, used when prompts must be shortened; API defaults apply when a request sets none
+BUDGET_LLM_SECONDS = float(os.getenv("BUDGET_LLM_SECONDS", "8"))
+BUDGET_SHORT_WINDOW = int(os.getenv("BUDGET_SHORT_WINDOW", "1000"))
+API_DEADLINE_SECONDS = float(os.getenv("API_DEADLINE_SECONDS", "0"))
+API_TOKEN_BUDGET = int(os.getenv("API_TOKEN_BUDGET", "0"))
+
+# LLM calls per summary: a reply that local JSON repair cannot fix is asked for again, up to this many times
+SUMMARY_MAX_ATTEMPTS = int(os.getenv("SUMMARY_MAX_ATTEMPTS", "2"))
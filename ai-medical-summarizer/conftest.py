@@ -0,0 +1,76 @@
+"""
+Shared test fixtures
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+# Before config is imported: modules that set up logging or open stores at
+# import time must not touch the real data dir or logs
+_SCRATCH = tempfile.mkdtemp(prefix="summarizer-tests-")
+os.environ["CACHE_DB_PATH"] = os.path.join(_SCRATCH, "cache.db")
+os.environ["PIPELINE_LOG_PATH"] = os.path.join(_SCRATCH, "pipeline.log")
+os.environ["METRICS_LOG_PATH"] = os.path.join(_SCRATCH, "metrics.log")
+os.environ["REPORT_DIR"] = _SCRATCH
+
+import pytest
+from langchain.schema import AIMessage
+
+import config
+from utils.usage import record_llm_call
+
+
+class FakeLLM:
+    """
+    Stand-in for the chat model returned by providers.get_llm/get_json_llm.
+
+    Replies with `replies` in order, repeating the last one; dict replies
+    are sent as JSON. `delay` is seconds per call, or {marker: seconds} to
+    slow only prompts containing a marker. Token counts, when given, are
+    reported like the real model's usage callback.
+    """
+
+    def __init__(self, *replies, delay=0, prompt_tokens=0, completion_tokens=0):
+        self.replies = [json.dumps(r) if isinstance(r, dict) else r for r in replies]
+        self.delay = delay
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return len(self.prompts)
+
+    def __call__(self, messages, **kwargs):
+        prompt = messages[-1].content
+        with self._lock:
+            self.prompts.append(prompt)
+            reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(self.delay, dict):
+            time.sleep(next((d for marker, d in self.delay.items() if marker in prompt), 0))
+        elif self.delay:
+            time.sleep(self.delay)
+        if self.prompt_tokens or self.completion_tokens:
+            record_llm_call(prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens)
+        return AIMessage(content=reply)
+
+
+@pytest.fixture
+def fake_llm():
+    """The FakeLLM class, to build fake chat models inside tests."""
+    return FakeLLM
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_db(tmp_path, monkeypatch):
+    """Stores opened during a test use a database in its tmp_path."""
+    monkeypatch.setattr(config, "CACHE_DB_PATH", str(tmp_path / "cache.db"))
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_SCRATCH, ignore_errors=True)
@@ -1,39 +1,197 @@
 import os
 import json
+import time
 import hashlib
+import threading
 
+import config
+from data.memory_cache import TTLCache
+from data.stores import open_store
+from data.popularity import get_popularity
+from data.doc_cache_utils import doc_cache_key, get_cached_docs, store_docs, update_docs, get_doc_store
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Legacy layout: one JSON file holding every query with full copies of its docs
 CACHE_PATH = "data/cached_docs.json"
+# Normalized layout (JSON backend only): query entries that reference doc records by key
+QUERY_STORE_PATH = "data/query_cache.json"
+# Query embeddings, one row per query (JSON backend only); the .npz is the older single-file index
+SEMANTIC_STORE_PATH = "data/query_vectors.json"
+SEMANTIC_INDEX_PATH = "data/query_vectors.npz"
 
-def load_cache():
-    if not os.path.exists(CACHE_PATH):
-        return {}
-    try:
-        with open(CACHE_PATH, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        # File is empty or corrupt
-        return {}
+# Per-query doc fields; type, summary_json and content live once in the doc record
+DOC_META_FIELDS = ("title", "link", "source", "citation")
+# Fields of the shared doc record, including the version tags of type and summary_json
+DOC_RECORD_FIELDS = ("type", "type_source", "summary_json", "content", "versions", "computed_at")
 
+# Write-through hot layer: reads check memory first, writes go to memory and disk
+_hot_cache = TTLCache(
+    max_entries=config.QUERY_CACHE_HOT_ENTRIES,
+    max_bytes=config.QUERY_CACHE_HOT_BYTES,
+    ttl=config.QUERY_CACHE_HOT_TTL
+)
 
-def save_cache(cache: dict):
-    with open(CACHE_PATH, "w") as f:
-        json.dump(cache, f, indent=2)
+_query_store = None
+_store_lock = threading.Lock()
+_semantic_index = None
+_semantic_lock = threading.Lock()
+
+def get_query_store():
+    """Return the normalized query store, migrating the legacy cache file on first use."""
+    global _query_store
+    if _query_store is None:
+        with _store_lock:
+            if _query_store is None:
+                store = open_store("queries", json_path=QUERY_STORE_PATH, ttl=config.QUERY_CACHE_RETENTION or None)
+                if len(store) == 0 and os.path.exists(CACHE_PATH):
+                    migrate_legacy_query_cache(store)
+                _query_store = store
+    return _query_store
+
+def set_query_store(store):
+    """Swap the query store, e.g. for tests or benchmarks."""
+    global _query_store
+    _query_store = store
 
 def hash_query(query: str) -> str:
     return hashlib.sha256(query.strip().lower().encode()).hexdigest()
 
-def get_cached_result(query: str):
-    cache = load_cache()
+def is_stale(entry: dict, max_age: float = None) -> bool:
+    """True when the entry is older than QUERY_CACHE_MAX_AGE (entries without a timestamp count as old)."""
+    max_age = config.QUERY_CACHE_MAX_AGE if max_age is None else max_age
+    if not max_age:
+        return False
+    cached_at = entry.get("cached_at")
+    return cached_at is None or time.time() - cached_at > max_age
+
+def normalize_entry(query: str, state: dict, cached_at: float = None) -> tuple:
+    """
+    Split a pipeline result into a compact query entry and the doc records it references.
+
+    Returns (entry, {doc key: record}). The entry keeps the query, the ordered
+    doc keys with their per-query metadata, and any final_output fields
+    besides the papers, which are rebuilt from the docs on read.
+    """
+    refs, records = [], {}
+    for doc in state.get("docs") or []:
+        key = doc_cache_key(doc)
+        refs.append({"key": key, **{field: doc[field] for field in DOC_META_FIELDS if field in doc}})
+        if doc.get("summary_failed"):
+            # No record: the entry reads as a miss until the summary succeeds
+            continue
+        records[key] = {field: doc[field] for field in DOC_RECORD_FIELDS if field in doc}
+        if doc.get("type_guessed"):
+            records[key].pop("type", None)
+            records[key].pop("type_source", None)
+    final_output = state.get("final_output") or {}
+    extra = {k: v for k, v in final_output.items() if k not in ("query", "papers")} if isinstance(final_output, dict) else {}
+    entry = {"query": query, "docs": refs, "cached_at": time.time() if cached_at is None else cached_at}
+    if extra:
+        entry["extra"] = extra
+    return entry, records
+
+def assemble_entry(entry: dict, records: dict):
+    """Rebuild {query, docs, final_output, cached_at} from a query entry; None if a doc record is gone, failed or of a rejected version."""
+    from agents.assembler import assemble_json
+    from agents.summary_schema import is_failed_summary
+    from agents.versions import version_accepted
+
+    docs = []
+    for ref in entry["docs"]:
+        record = records.get(ref["key"])
+        if record is None or is_failed_summary(record.get("summary_json")) or not version_accepted(record, "summary_json"):
+            return None
+        docs.append({**{k: v for k, v in ref.items() if k != "key"}, **record, "cache_key": ref["key"]})
+    final_output = assemble_json(docs, entry["query"])
+    final_output.update(entry.get("extra", {}))
+    return {"query": entry["query"], "docs": docs, "final_output": final_output, "cached_at": entry.get("cached_at")}
+
+def get_semantic_index():
+    """Return the query embedding index, indexing any cached query it is missing."""
+    global _semantic_index
+    if _semantic_index is None:
+        with _semantic_lock:
+            if _semantic_index is None:
+                from data.semantic_cache import SemanticIndex, get_embedder
+                store = open_store("query_vectors", json_path=SEMANTIC_STORE_PATH)
+                index = SemanticIndex(get_embedder(config.SEMANTIC_CACHE_EMBEDDER), store=store,
+                                      legacy_path=SEMANTIC_INDEX_PATH)
+                index.add_many({qhash: entry["query"] for qhash, entry in get_query_store().items()})
+                _semantic_index = index
+    return _semantic_index
+
+def _lookup(qhash: str):
+    entry = _hot_cache.get(qhash)
+    if entry is None:
+        stored = get_query_store().get(qhash)
+        if stored is not None:
+            entry = assemble_entry(stored, get_cached_docs([ref["key"] for ref in stored["docs"]]))
+            if entry is None:
+                logger.info(f"[CACHE] Doc records missing for query entry {qhash}; treating as a miss")
+        if entry is not None:
+            _hot_cache.put(qhash, entry)
+    return entry
+
+def get_cached_result(query: str, allow_stale: bool = False):
+    """Cached {query, docs, final_output, cached_at} for the query, or None; stale entries only with allow_stale."""
     qhash = hash_query(query)
-    return cache.get(qhash, None)
+    entry = _lookup(qhash)
+
+    if entry is None and config.SEMANTIC_CACHE_ENABLED:
+        match, score = get_semantic_index().nearest(query)
+        if match is not None and score >= config.SEMANTIC_CACHE_THRESHOLD:
+            entry = _lookup(match)
+            if entry is not None:
+                logger.info(f"[CACHE] Semantic hit ({score:.2f}): '{query}' -> '{entry['query']}'")
+                qhash = match
+
+    # Misses count too: the query is about to be cached under this hash
+    get_popularity().record(qhash)
+    if entry is None or (is_stale(entry) and not allow_stale):
+        return None
+    return entry
 
 def store_result_in_cache(query: str, state: dict):
-    cache = load_cache()
     qhash = hash_query(query)
-    # Save only relevant parts
-    cache[qhash] = {
-        "query": query,
-        "docs": state.get("docs", []),
-        "final_output": state.get("final_output", "")
-    }
-    save_cache(cache)
+    entry, records = normalize_entry(query, state)
+    update_docs(records)
+    get_query_store().put(qhash, entry)
+    assembled = assemble_entry(entry, records)
+    if assembled is not None:
+        _hot_cache.put(qhash, assembled)
+    if config.SEMANTIC_CACHE_ENABLED:
+        get_semantic_index().add(qhash, query)
+
+def migrate_legacy_query_cache(store, legacy_path: str = None) -> int:
+    """Normalize the legacy cached_docs.json into `store` plus doc records; return the number of queries."""
+    legacy_path = legacy_path or CACHE_PATH
+    try:
+        with open(legacy_path, "r") as f:
+            legacy = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return 0
+
+    entries, records = {}, {}
+    for qhash, item in legacy.items():
+        entry, doc_records = normalize_entry(item["query"], item, cached_at=item.get("cached_at", 0))
+        entries[qhash] = entry
+        records.update(doc_records)
+
+    # Keep whatever the doc store already has for a key; only fill in missing fields
+    existing = get_doc_store().get_many(list(records))
+    store_docs({key: {**record, **existing.get(key, {})} for key, record in records.items()})
+    store.put_many(entries)
+    logger.info(f"[CACHE] Migrated {len(entries)} queries and {len(records)} doc records from {legacy_path}")
+    return len(entries)
+
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters of the in-memory hot layer."""
+    return _hot_cache.stats()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    count = migrate_legacy_query_cache(open_store("queries", json_path=QUERY_STORE_PATH))
+    print(f"Migrated {count} cached queries from {CACHE_PATH}")
@@ -1,32 +1,197 @@
 import os
-import json
+import time
+import uuid
+import socket
 import hashlib
+import threading
+
+import config
+from data.stores import JSONFileStore, open_store
+
+import logging
+logger = logging.getLogger(__name__)
 
 DOC_CACHE_PATH = "data/doc_cache.json"
+QUERY_CACHE_PATH = "data/cached_docs.json"
+CHUNK_CACHE_PATH = "data/chunk_cache.json"
+NEAR_DUP_STORE_PATH = "data/doc_minhash.json"
+
+# Identifies this process in claim records shared with other workers
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+CLAIM_POLL = 0.5
+
+_store = None
+_store_lock = threading.Lock()
+_chunk_store = None
+_near_dup_index = None
 
-def load_doc_cache():
-    if not os.path.exists(DOC_CACHE_PATH):
-        return {}
-    try:
-        with open(DOC_CACHE_PATH, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        # File is empty or corrupt
-        return {}
 
-def save_doc_cache(cache: dict):
-    with open(DOC_CACHE_PATH, "w") as f:
-        json.dump(cache, f, indent=2)
+def get_doc_store():
+    """Return the shared doc store, migrating the legacy JSON cache on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = open_store("docs", json_path=DOC_CACHE_PATH)
+                if config.CACHE_BACKEND != "json" and len(store) == 0:
+                    migrate_json_doc_cache(store)
+                _store = store
+    return _store
+
+def set_doc_store(store):
+    """Swap the doc store, e.g. for tests or benchmarks."""
+    global _store
+    _store = store
 
 def hash_doc_content(doc: dict) -> str:
     content = doc.get("content", "").strip().lower()
     return hashlib.sha256(content.encode()).hexdigest()
 
+def doc_cache_key(doc: dict) -> str:
+    """Doc store key: the near-duplicate the doc was matched to, else its own content hash."""
+    return doc.get("cache_key") or hash_doc_content(doc)
+
+def near_dup_text(doc: dict) -> str:
+    return doc.get("raw_content") or doc.get("content", "")
+
+def get_near_dup_index():
+    """Return the MinHash/LSH index of known documents, seeded from the doc store on first use."""
+    global _near_dup_index
+    if _near_dup_index is None:
+        store = get_doc_store()
+        with _store_lock:
+            if _near_dup_index is None:
+                from data.near_dup import MinHasher, NearDupIndex
+                index = NearDupIndex(MinHasher(num_perm=config.NEAR_DUP_PERMUTATIONS), bands=config.NEAR_DUP_BANDS,
+                                     store=open_store("doc_signatures", json_path=NEAR_DUP_STORE_PATH))
+                if len(index) == 0:
+                    signatures = {key: index.hasher.signature(record.get("content", "")) for key, record in store.items()}
+                    index.add_many({key: signature for key, signature in signatures.items() if signature is not None})
+                _near_dup_index = index
+    return _near_dup_index
+
+def set_near_dup_index(index):
+    global _near_dup_index
+    _near_dup_index = index
+
 def get_cached_doc(doc_hash: str):
-    cache = load_doc_cache()
-    return cache.get(doc_hash, None)
+    return get_doc_store().get(doc_hash)
+
+def get_cached_docs(doc_hashes) -> dict:
+    return get_doc_store().get_many(doc_hashes)
 
 def store_doc(doc_hash: str, result: dict):
-    cache = load_doc_cache()
-    cache[doc_hash] = result
-    save_doc_cache(cache)
+    get_doc_store().put(doc_hash, result)
+
+def store_docs(results: dict):
+    get_doc_store().put_many(results)
+
+def update_docs(updates: dict):
+    """Write {key: fields} into the doc records, keeping fields (and versions) the update does not set."""
+    if not updates:
+        return
+    existing = get_cached_docs(list(updates))
+    records = {}
+    for key, fields in updates.items():
+        record = {**existing.get(key, {}), **fields}
+        if "versions" in fields:
+            record["versions"] = {**existing.get(key, {}).get("versions", {}), **fields["versions"]}
+        records[key] = record
+    store_docs(records)
+
+def get_chunk_store():
+    """Return the shared store of per-chunk extraction notes, keyed by chunk hash."""
+    global _chunk_store
+    if _chunk_store is None:
+        with _store_lock:
+            if _chunk_store is None:
+                _chunk_store = open_store("chunks", json_path=CHUNK_CACHE_PATH)
+    return _chunk_store
+
+def set_chunk_store(store):
+    global _chunk_store
+    _chunk_store = store
+
+def get_cached_chunks(chunk_hashes) -> dict:
+    return get_chunk_store().get_many(chunk_hashes)
+
+def store_chunks(results: dict):
+    get_chunk_store().put_many(results)
+
+def _claim_owner() -> str:
+    # Per thread, so concurrent runs inside one process coordinate too
+    return f"{WORKER_ID}:{threading.get_ident()}"
+
+def claim_pending(pending: dict, field: str) -> tuple:
+    """
+    Coordinate uncached docs with other workers sharing the doc store.
+
+    Args:
+        pending: {doc key: doc} this node would compute
+        field: The record field being computed ("type" or "summary_json")
+
+    Returns:
+        (ours, done): the {key: doc} this worker claimed and must compute and
+        then `release_claims`, and {key: record} that the worker holding the
+        claim finished while we waited. On stores without claim support
+        every pending doc is ours. Docs whose claim holder does not finish
+        within CLAIM_WAIT are computed here as well.
+    """
+    store = get_doc_store()
+    if not pending or not hasattr(store, "claim"):
+        return pending, {}
+
+    ours, waiting = {}, {}
+    for key, doc in pending.items():
+        if store.claim(f"{field}:{key}", _claim_owner(), config.CLAIM_LEASE):
+            ours[key] = doc
+        else:
+            waiting[key] = doc
+
+    done = {}
+    give_up_at = time.monotonic() + config.CLAIM_WAIT
+    while waiting and time.monotonic() < give_up_at:
+        time.sleep(CLAIM_POLL)
+        for key, record in store.get_many(list(waiting)).items():
+            if field in record:
+                done[key] = record
+                del waiting[key]
+    if waiting:
+        logger.warning(f"[DocCache] {len(waiting)} claimed docs not ready after {config.CLAIM_WAIT}s; computing them here")
+    ours.update(waiting)
+    return ours, done
+
+def release_claims(keys, field: str):
+    store = get_doc_store()
+    if hasattr(store, "release"):
+        for key in keys:
+            store.release(f"{field}:{key}", _claim_owner())
+
+def migrate_json_doc_cache(store, doc_cache_path=DOC_CACHE_PATH, query_cache_path=QUERY_CACHE_PATH) -> int:
+    """Copy the legacy JSON caches into `store` and return the number of records written.
+
+    Docs embedded in the query cache carry their type and summary too, so they
+    back-fill any hash missing from the doc cache file.
+    """
+    records = {}
+    if os.path.exists(query_cache_path):
+        for _, entry in JSONFileStore(query_cache_path).items():
+            for doc in entry.get("docs", []):
+                if "summary_json" in doc:
+                    records[hash_doc_content(doc)] = {
+                        "type": doc.get("type", ""),
+                        "summary_json": doc["summary_json"]
+                    }
+    if os.path.exists(doc_cache_path):
+        records.update(JSONFileStore(doc_cache_path).items())
+
+    store.put_many(records)
+    if records:
+        logger.info(f"[DocCache] Migrated {len(records)} records from {doc_cache_path}")
+    return len(records)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    count = migrate_json_doc_cache(open_store("docs", json_path=DOC_CACHE_PATH))
+    print(f"Migrated {count} doc cache records into {config.CACHE_DB_PATH}")
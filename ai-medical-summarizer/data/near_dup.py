@@ -0,0 +1,116 @@
+import re
+import zlib
+import base64
+import threading
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Mersenne prime 2^61 - 1 keeps (a * x + b) mod p inside uint64 for 32-bit shingle hashes
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64((1 << 32) - 1)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles; matching slots estimate Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.name = f"minhash-{num_perm}-{shingle_size}-{seed}"
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def shingles(self, text: str) -> set:
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str):
+        """Return the signature of `text`, or None if it has no words."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # One row per permutation; a * x + b < 2^63, so nothing overflows before the mod
+        permuted = (np.outer(self._a, hashes & _MASK) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint64)
+
+
+class NearDupIndex:
+    """
+    LSH index over MinHash signatures of cached documents.
+
+    Signatures are split into `bands` bands; documents sharing any band land
+    in the same bucket and become candidates, whose estimated Jaccard
+    similarity is then checked against the threshold. With a `store`, each
+    signature is also written as its own row, so matches work across runs and
+    workers only ever write the rows they add; the bands are rebuilt from the
+    rows on load.
+    """
+
+    def __init__(self, hasher: MinHasher = None, bands: int = 16, store=None):
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.store = store
+        self.keys = []
+        self._signatures = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        if store is not None:
+            self._load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def _band_keys(self, signature) -> list:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _insert(self, key: str, signature):
+        self.keys.append(key)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def _row(self, signature) -> dict:
+        return {"hasher": self.hasher.name, "signature": base64.b64encode(signature.astype(np.uint64).tobytes()).decode()}
+
+    def _load(self):
+        # Rows of another hasher are skipped; their docs are signed again when seen
+        for key, row in self.store.items():
+            if row.get("hasher") == self.hasher.name:
+                self._insert(key, np.frombuffer(base64.b64decode(row["signature"]), dtype=np.uint64))
+
+    def add_many(self, signatures: dict):
+        """Index {key: signature}; keys already present are skipped."""
+        with self._lock:
+            signatures = {key: signature for key, signature in signatures.items() if key not in self._signatures}
+            for key, signature in signatures.items():
+                self._insert(key, signature)
+        if self.store is not None and signatures:
+            self.store.put_many({key: self._row(signature) for key, signature in signatures.items()})
+
+    def add(self, key: str, signature):
+        self.add_many({key: signature})
+
+    def query(self, signature, threshold: float):
+        """Return (key, estimated Jaccard) of the most similar indexed document at or above threshold, or (None, 0.0)."""
+        with self._lock:
+            candidates = {key for band_key in self._band_keys(signature) for key in self._buckets.get(band_key, ())}
+            best, best_score = None, 0.0
+            for key in candidates:
+                score = float(np.mean(self._signatures[key] == signature))
+                if score >= threshold and score > best_score:
+                    best, best_score = key, score
+        return best, best_score
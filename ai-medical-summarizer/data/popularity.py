@@ -0,0 +1,87 @@
+import math
+import time
+import atexit
+import threading
+from collections import Counter
+
+import config
+from data.stores import open_store
+
+import logging
+logger = logging.getLogger(__name__)
+
+POPULARITY_PATH = "data/query_popularity.json"
+
+
+class PopularityTracker:
+    """
+    Exponentially decayed request counts per cached query.
+
+    Hits are counted in memory and folded into the store every
+    `flush_every` hits (and on exit), so a cache hit never waits on a write.
+    A score halves every `half_life` seconds without requests.
+    """
+
+    def __init__(self, store, half_life: float = None, flush_every: int = None):
+        self.store = store
+        self.half_life = half_life or config.POPULARITY_HALF_LIFE
+        self.flush_every = flush_every or config.POPULARITY_FLUSH_EVERY
+        self._pending = Counter()
+        self._lock = threading.Lock()
+
+    def decayed(self, record: dict, now: float) -> float:
+        age = max(0.0, now - record["updated_at"])
+        return record["score"] * math.pow(0.5, age / self.half_life)
+
+    def record(self, qhash: str):
+        with self._lock:
+            self._pending[qhash] += 1
+            due = sum(self._pending.values()) >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        now = time.time()
+        current = self.store.get_many(list(pending))
+        self.store.put_many({
+            qhash: {"score": (self.decayed(current[qhash], now) if qhash in current else 0.0) + hits,
+                    "updated_at": now}
+            for qhash, hits in pending.items()
+        })
+
+    def top(self, n: int = None) -> list:
+        """[(qhash, score)] from most to least popular, counting unflushed hits."""
+        self.flush()
+        now = time.time()
+        ranked = sorted(((qhash, self.decayed(record, now)) for qhash, record in self.store.items()),
+                        key=lambda item: item[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def get_popularity() -> PopularityTracker:
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = PopularityTracker(open_store("query_popularity", json_path=POPULARITY_PATH))
+    return _tracker
+
+def set_popularity(tracker: PopularityTracker):
+    """Swap the tracker, e.g. for tests or benchmarks."""
+    global _tracker
+    _tracker = tracker
+
+@atexit.register
+def _flush_at_exit():
+    if _tracker is not None:
+        try:
+            _tracker.flush()
+        except Exception as e:
+            logger.warning(f"[Popularity] Could not save request counts at exit: {e!r}")
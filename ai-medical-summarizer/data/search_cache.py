@@ -0,0 +1,49 @@
+import json
+import time
+import hashlib
+import threading
+
+import config
+from data.stores import open_store
+
+import logging
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_PATH = "data/search_cache.json"
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_search_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_store("searches", json_path=SEARCH_CACHE_PATH, ttl=config.SEARCH_CACHE_TTL or None)
+    return _store
+
+def set_search_store(store):
+    """Swap the search result store, e.g. for tests or benchmarks."""
+    global _store
+    _store = store
+
+def search_cache_key(query: str, **params) -> str:
+    """Key on the normalized query plus every search parameter that changes the results."""
+    normalized = " ".join(query.lower().split())
+    payload = json.dumps({"query": normalized, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_cached_search(key: str, ttl: float = None):
+    """Return the cached search response for `key`, or None if missing or older than `ttl` seconds."""
+    ttl = config.SEARCH_CACHE_TTL if ttl is None else ttl
+    entry = get_search_store().get(key)
+    if entry is None:
+        return None
+    if ttl and time.time() - entry.get("cached_at", 0) > ttl:
+        logger.info(f"[SearchCache] Expired entry: {key}")
+        return None
+    return entry["response"]
+
+def store_search(key: str, response: dict):
+    get_search_store().put(key, {"response": response, "cached_at": time.time()})
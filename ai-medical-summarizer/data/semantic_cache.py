@@ -0,0 +1,142 @@
+import os
+import base64
+import threading
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class HashingEmbedder:
+    """Offline embedder: hashed word unigrams/bigrams, L2-normalised."""
+
+    def __init__(self, n_features: int = 1024):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.name = f"hashing-{n_features}"
+        self._vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            stop_words="english",
+            alternate_sign=False,
+            norm="l2"
+        )
+
+    def embed(self, texts) -> np.ndarray:
+        return self._vectorizer.transform(texts).toarray().astype(np.float32)
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API; better paraphrase matching, needs network access."""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        from langchain_openai import OpenAIEmbeddings
+        self.name = f"openai-{model}"
+        self._client = OpenAIEmbeddings(model=model)
+
+    def embed(self, texts) -> np.ndarray:
+        vectors = np.asarray(self._client.embed_documents(list(texts)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "openai": OpenAIEmbedder
+}
+
+def get_embedder(name: str):
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name!r} (choose from {', '.join(EMBEDDERS)})")
+    return EMBEDDERS[name]()
+
+
+class SemanticIndex:
+    """
+    Cosine nearest-neighbour index over query embeddings.
+
+    Vectors are unit length, so one matrix-vector product scores every
+    stored query at once. With a `store`, each vector is also written as its
+    own row, so remote embeddings are not recomputed on restart and adding a
+    query writes only that query's row. `legacy_path` is an .npz file from
+    older versions, imported into an empty store.
+    """
+
+    def __init__(self, embedder, store=None, legacy_path: str = None):
+        self.embedder = embedder
+        self.store = store
+        self.keys = []
+        self._positions = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+        if store is not None:
+            if legacy_path and os.path.exists(legacy_path) and len(store) == 0:
+                self._import_npz(legacy_path)
+            self._load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def _row(self, vector: np.ndarray) -> dict:
+        return {"embedder": self.embedder.name, "vector": base64.b64encode(vector.astype(np.float32).tobytes()).decode()}
+
+    def _load(self):
+        rows = {key: row for key, row in self.store.items() if row.get("embedder") == self.embedder.name}
+        if rows:
+            # Rows of another embedder are re-embedded (and overwritten) as their queries are added
+            self._append({key: np.frombuffer(base64.b64decode(row["vector"]), dtype=np.float32)
+                          for key, row in rows.items()})
+
+    def _import_npz(self, path: str):
+        saved = np.load(path, allow_pickle=False)
+        if str(saved["embedder"]) != self.embedder.name:
+            logger.info(f"[SemanticCache] Ignoring index built with {saved['embedder']}")
+            return
+        self.store.put_many({str(key): self._row(vector) for key, vector in zip(saved["keys"], saved["matrix"])})
+        logger.info(f"[SemanticCache] Imported {len(saved['keys'])} vectors from {path}")
+
+    def _append(self, vectors: dict):
+        count = len(self.keys)
+        width = len(next(iter(vectors.values())))
+        if self._matrix is None:
+            self._matrix = np.zeros((max(len(vectors), 64), width), dtype=np.float32)
+        if count + len(vectors) > self._matrix.shape[0]:
+            # Grow geometrically so appends stay amortised O(1)
+            capacity = max(count + len(vectors), self._matrix.shape[0] * 2)
+            grown = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+            grown[:count] = self._matrix[:count]
+            self._matrix = grown
+        for key, vector in vectors.items():
+            self._matrix[len(self.keys)] = vector
+            self._positions[key] = len(self.keys)
+            self.keys.append(key)
+
+    def add_many(self, items: dict):
+        """Index {key: query text}; keys already present are skipped."""
+        items = {key: text for key, text in items.items() if key not in self}
+        if not items:
+            return
+        vectors = dict(zip(items, self.embedder.embed([text.strip().lower() for text in items.values()])))
+        with self._lock:
+            vectors = {key: vector for key, vector in vectors.items() if key not in self._positions}
+            if not vectors:
+                return
+            self._append(vectors)
+        if self.store is not None:
+            self.store.put_many({key: self._row(vector) for key, vector in vectors.items()})
+
+    def add(self, key: str, text: str):
+        self.add_many({key: text})
+
+    def nearest(self, text: str):
+        """Return (key, cosine similarity) of the closest stored query, or (None, 0.0)."""
+        if not self.keys:
+            return None, 0.0
+        vector = self.embedder.embed([text.strip().lower()])[0]
+        with self._lock:
+            scores = self._matrix[:len(self.keys)] @ vector
+        best = int(np.argmax(scores))
+        return self.keys[best], float(scores[best])
@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+_SQLITE_BATCH = 500
+
+
+class JSONFileStore:
+    """Legacy whole-file JSON store: every read parses the file, every write rewrites it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            # File is empty or corrupt
+            return {}
+
+    def _save(self, data: dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str):
+        return self._load().get(key)
+
+    def get_many(self, keys) -> dict:
+        data = self._load()
+        return {key: data[key] for key in keys if key in data}
+
+    def put(self, key: str, value: dict):
+        self.put_many({key: value})
+
+    def put_many(self, items: dict):
+        with self._lock:
+            data = self._load()
+            data.update(items)
+            self._save(data)
+
+    def delete(self, key: str):
+        with self._lock:
+            data = self._load()
+            if data.pop(key, None) is not None:
+                self._save(data)
+
+    def items(self):
+        return list(self._load().items())
+
+    def __len__(self):
+        return len(self._load())
+
+
+class SQLiteStore:
+    """Key/value store on a SQLite table in WAL mode.
+
+    Reads and writes are keyed lookups on the primary key, and WAL lets many
+    readers run alongside one writer, so several threads or processes can
+    share the same database file.
+    """
+
+    def __init__(self, path: str, table: str = "docs", timeout: float = 30.0):
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", table):
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connect().execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, and never reuse one inherited across fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str):
+        row = self._connect().execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, keys) -> dict:
+        keys = list(dict.fromkeys(keys))
+        conn = self._connect()
+        found = {}
+        for i in range(0, len(keys), _SQLITE_BATCH):
+            batch = keys[i:i + _SQLITE_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", batch
+            )
+            for key, value in rows:
+                found[key] = json.loads(value)
+        return found
+
+    def put(self, key: str, value: dict):
+        self.put_many({key: value})
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(value), now) for key, value in items.items()]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"INSERT INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str):
+        self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def items(self):
+        rows = self._connect().execute(f"SELECT key, value FROM {self.table}")
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def __len__(self):
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class MongoStore:
+    """Key/value store on a MongoDB collection, shared by every worker that points at it.
+
+    Keys are the indexed `_id`, writes are bulk upserts, and with `ttl` a TTL
+    index expires records that long after their last write. A companion
+    `<collection>_claims` collection holds short leases so only one worker
+    computes a given key at a time (see `claim`).
+    """
+
+    def __init__(self, collection, ttl: float = None):
+        self.collection = collection
+        self.claims = collection.database[f"{collection.name}_claims"]
+        self.ttl = ttl
+        self._sync_ttl_index()
+        self.claims.create_index("expires_at", expireAfterSeconds=0)
+
+    def _sync_ttl_index(self):
+        # An index left by a different ttl (or none) would conflict or keep deleting records
+        expire = int(self.ttl) if self.ttl else None
+        for name, index in self.collection.index_information().items():
+            if index["key"] == [("updated_at", 1)] and index.get("expireAfterSeconds") != expire:
+                self.collection.drop_index(name)
+        if expire:
+            self.collection.create_index("updated_at", expireAfterSeconds=expire)
+
+    def get(self, key: str):
+        record = self.collection.find_one({"_id": key}, {"value": 1})
+        return json.loads(record["value"]) if record else None
+
+    def get_many(self, keys) -> dict:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        return {record["_id"]: json.loads(record["value"])
+                for record in self.collection.find({"_id": {"$in": keys}}, {"value": 1})}
+
+    def put(self, key: str, value: dict):
+        self.put_many({key: value})
+
+    def put_many(self, items: dict):
+        from pymongo import UpdateOne
+
+        if not items:
+            return
+        now = datetime.now(timezone.utc)
+        # Values are stored as JSON text: LLM output may hold keys MongoDB field names cannot
+        self.collection.bulk_write([
+            UpdateOne({"_id": key}, {"$set": {"value": json.dumps(value), "updated_at": now}}, upsert=True)
+            for key, value in items.items()
+        ], ordered=False)
+
+    def delete(self, key: str):
+        self.collection.delete_one({"_id": key})
+
+    def items(self):
+        return [(record["_id"], json.loads(record["value"])) for record in self.collection.find({}, {"value": 1})]
+
+    def __len__(self):
+        return self.collection.count_documents({})
+
+    def claim(self, key: str, owner: str, lease: float) -> bool:
+        """
+        Atomically take the lease on `key` for `owner`.
+
+        Succeeds when nobody holds it, the holder's lease has expired, or
+        `owner` already holds it; a crashed worker's claim lapses after `lease`
+        seconds.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.now(timezone.utc)
+        try:
+            self.claims.find_one_and_update(
+                {"_id": key, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Someone else holds a live lease, so the upsert collided with their record
+            return False
+
+    def release(self, key: str, owner: str):
+        self.claims.delete_one({"_id": key, "owner": owner})
+
+
+_mongo_client = None
+_mongo_lock = threading.Lock()
+
+def get_mongo_database():
+    """Shared MongoClient (one connection pool per process) for MONGO_URI / MONGO_DB."""
+    global _mongo_client
+    if _mongo_client is None:
+        with _mongo_lock:
+            if _mongo_client is None:
+                from pymongo import MongoClient
+                _mongo_client = MongoClient(config.MONGO_URI)
+    return _mongo_client[config.MONGO_DB]
+
+
+def open_store(table: str, json_path: str = None, backend: str = None, ttl: float = None):
+    """Open the cache store for `table` on the configured backend.
+
+    `ttl` only applies to the mongo backend, which expires records server
+    side; the other backends check ages on read where they need to.
+    """
+    backend = backend or config.CACHE_BACKEND
+    if backend == "json":
+        if json_path is None:
+            raise ValueError(f"No JSON file configured for table {table!r}")
+        return JSONFileStore(json_path)
+    if backend == "sqlite":
+        return SQLiteStore(config.CACHE_DB_PATH, table=table)
+    if backend == "mongo":
+        return MongoStore(get_mongo_database()[table], ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend!r}")
@@ -1,30 +1,102 @@
+import threading
 from typing import TypedDict, List
-from langgraph.graph import StateGraph, END
 
-from agents.retriever import retriever_node
-from agents.classifier import classifier_node
-from agents.summarizer import summarizer_node
-from agents.citation import citation_node
-from agents.assembler import assembler_node
+import config
 
 class GraphState(TypedDict):
     query: str
     docs: List[dict]
     final_output: str
+    budget: object
 
-graph = StateGraph(GraphState)
+_compiled = None
+_compile_lock = threading.Lock()
 
-graph.add_node("retriever", retriever_node)
-graph.add_node("classifier", classifier_node)
-graph.add_node("summarizer", summarizer_node)
-graph.add_node("citation", citation_node)
-graph.add_node("assembler", assembler_node)
+def build_graph():
+    # langgraph and the agents are imported here, not at module load, so
+    # importing this module (e.g. for GraphState) stays cheap
+    from langgraph.graph import StateGraph, END
+    # Instrumented nodes: every call records timing, token and cache metrics
+    from agents.nodes import (retriever_node, reranker_node, dedup_node, classifier_node, summarizer_node,
+                              analyzer_node, citation_node, assembler_node)
 
-graph.set_entry_point("retriever")
-graph.add_edge("retriever", "classifier")
-graph.add_edge("classifier", "summarizer")
-graph.add_edge("summarizer", "citation")
-graph.add_edge("citation", "assembler")
-graph.add_edge("assembler", END)
+    graph = StateGraph(GraphState)
 
-compiled = graph.compile()
+    graph.add_node("retriever", retriever_node)
+    graph.add_node("reranker", reranker_node)
+    graph.add_node("dedup", dedup_node)
+    graph.add_node("citation", citation_node)
+    graph.add_node("assembler", assembler_node)
+
+    graph.set_entry_point("retriever")
+    graph.add_edge("retriever", "reranker")
+    graph.add_edge("reranker", "dedup")
+
+    if config.FUSED_ANALYSIS:
+        # One structured LLM call per document fills both type and summary_json
+        graph.add_node("analyzer", analyzer_node)
+        graph.add_edge("dedup", "analyzer")
+        graph.add_edge("analyzer", "citation")
+    else:
+        graph.add_node("classifier", classifier_node)
+        graph.add_node("summarizer", summarizer_node)
+        graph.add_edge("dedup", "classifier")
+        graph.add_edge("classifier", "summarizer")
+        graph.add_edge("summarizer", "citation")
+
+    graph.add_edge("citation", "assembler")
+    graph.add_edge("assembler", END)
+    return graph
+
+def get_compiled():
+    """Build and compile the graph on first use; later calls share it."""
+    global _compiled
+    if _compiled is None:
+        with _compile_lock:
+            if _compiled is None:
+                _compiled = build_graph().compile()
+    return _compiled
+
+def run_with_budget(query: str, budget) -> dict:
+    """
+    Run the graph for `query` within `budget` (utils.budget.Budget) and
+    return its final_output, annotated with the degradations applied.
+
+    Nodes trim their LLM work to fit. When too little time is left to run,
+    or the run fails, a cached result is served even if stale. Degraded
+    results are never cached.
+    """
+    from data.cache_utils import get_cached_result, store_result_in_cache
+    from utils.usage import track_usage
+
+    def cached_fallback(reason: str):
+        stale = get_cached_result(query, allow_stale=True)
+        if stale is None:
+            return None
+        budget.degrade("stale_cache", reason)
+        return budget.annotate(stale["final_output"])
+
+    remaining = budget.remaining_time()
+    if remaining is not None and remaining < config.BUDGET_LLM_SECONDS:
+        fallback = cached_fallback(f"only {max(remaining, 0):.1f}s left")
+        if fallback is not None:
+            return fallback
+
+    try:
+        with track_usage(budget.meter):
+            result = get_compiled().invoke({"query": query, "budget": budget})
+    except Exception as e:
+        fallback = cached_fallback(f"pipeline failed: {e!r}")
+        if fallback is None:
+            raise
+        return fallback
+
+    if not budget.degraded:
+        store_result_in_cache(query, result)
+    return budget.annotate(result["final_output"])
+
+def __getattr__(name):
+    # Keeps `from graph_config import compiled` working, compiling on first access
+    if name == "compiled":
+        return get_compiled()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,6 +2,8 @@
 
 import logging
 
+import config
+
 def setup_logging():
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)  # or logging.DEBUG
@@ -19,6 +21,14 @@ def setup_logging():
     logger.addHandler(console_handler)
 
     # 2️⃣ File Handler with UTF-8 encoding
-    file_handler = logging.FileHandler("pipeline.log", mode="a", encoding='utf-8')
+    file_handler = logging.FileHandler(config.PIPELINE_LOG_PATH, mode="a", encoding='utf-8')
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
+
+    # 3️⃣ Metrics sink: structured JSON lines only, kept out of the free-text logs
+    metrics_logger = logging.getLogger("metrics")
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.propagate = False
+    metrics_handler = logging.FileHandler(config.METRICS_LOG_PATH, mode="a", encoding='utf-8')
+    metrics_handler.setFormatter(logging.Formatter("%(message)s"))
+    metrics_logger.addHandler(metrics_handler)
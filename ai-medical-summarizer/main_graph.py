@@ -1,6 +1,8 @@
-from graph_config import compiled
+from graph_config import get_compiled, run_with_budget
+from utils.budget import Budget
 from data.cache_utils import get_cached_result, store_result_in_cache
-from utils.pdf_generator import generate_medical_research_pdf
+from streaming import stream_pipeline
+from utils.pdf_worker import submit_pdf
 
 from logging_config import setup_logging
 import logging
@@ -12,9 +14,31 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def run_pipeline(query: str):
+def run_pipeline(query: str, refresh: bool = False, deadline: float = None, token_budget: int = None):
+    """
+    Answer `query` from the cache or the graph. With refresh=True a cached
+    query is re-retrieved and only its new or changed papers are analyzed.
+
+    `deadline` (seconds) and `token_budget` bound an uncached run; the
+    pipeline degrades to stay within them and the returned output lists
+    the degradations applied.
+    """
     logger.info(f"Running pipeline for query: {query}")
-    cached = get_cached_result(query)
+    # A refresh patches stale entries too; those are the ones most in need of it
+    cached = get_cached_result(query, allow_stale=refresh)
+
+    if cached and refresh:
+        from refresh import refresh_query
+        logger.info(f"[REFRESH] Refreshing cached query: {query}")
+        report = refresh_query(cached["query"])
+        if report is not None:
+            final_output = report["final_output"]
+            save_json_output(final_output)
+            generate_pdf_report(final_output)
+            return final_output
+        # Served from the hot layer after its stored entry expired: nothing to patch, run it fully
+        logger.info(f"[REFRESH] No stored entry to refresh; running the full pipeline: {query}")
+        cached = None
 
     if cached:
         
@@ -23,21 +47,21 @@ def run_pipeline(query: str):
         logger.info(cached["final_output"])
         
         # Generate PDF for cached result as well
-        try:
-            pdf_success = generate_medical_research_pdf(cached["final_output"])
-            if pdf_success:
-                logger.info("PDF report generated successfully from cache")
-            else:
-                logger.error("Failed to generate PDF report from cache")
-        except Exception as e:
-            logger.error(f"Error generating PDF from cache: {str(e)}")
+        generate_pdf_report(cached["final_output"], from_cache=True)
         
         return cached["final_output"]
 
+    if deadline or token_budget:
+        logger.info(f"[GRAPH] Running budgeted pipeline for query: {query}")
+        final_output = run_with_budget(query, Budget(deadline, token_budget))
+        save_json_output(final_output)
+        generate_pdf_report(final_output)
+        return final_output
+
     logger.info(f"[GRAPH] Running full pipeline for query: {query}")
     logger.info(f"[+] Running graph for new query: {query}")
     initial_state = {"query": query}
-    result = compiled.invoke(initial_state)
+    result = get_compiled().invoke(initial_state)
 
     logger.info("storing result in cache...")
     store_result_in_cache(query, result)
@@ -46,22 +70,61 @@ def run_pipeline(query: str):
     logger.info("stored result in cache")
     
     # Save JSON output
-    with open("output.json", "w") as f:
-        json.dump(result["final_output"], f, indent=2)
+    save_json_output(result["final_output"])
     
     # Generate PDF output
-    try:
-        pdf_success = generate_medical_research_pdf(result["final_output"])
-        if pdf_success:
-            logger.info("PDF report generated successfully")
-        else:
-            logger.error("Failed to generate PDF report")
-    except Exception as e:
-        logger.error(f"Error generating PDF: {str(e)}")
+    generate_pdf_report(result["final_output"])
     
     return result["final_output"]
 
 
+def run_pipeline_streaming(query: str):
+    """Like run_pipeline, but prints each paper as soon as it has been summarized."""
+    logger.info(f"Running streaming pipeline for query: {query}")
+    final_output, cached = None, False
+
+    for event in stream_pipeline(query):
+        if event["event"] == "start":
+            source = "from cache" if event["cached"] else "retrieved"
+            print(f"{event['total']} papers {source}")
+        elif event["event"] == "paper":
+            print_paper(event["paper"])
+        elif event["event"] == "done":
+            final_output, cached = event["result"], event["cached"]
+
+    if not cached:
+        save_json_output(final_output)
+    generate_pdf_report(final_output, from_cache=cached)
+    return final_output
+
+
+def print_paper(paper: dict):
+    print(f"\n* {paper['title']} ({paper.get('type') or 'unclassified'})")
+    for finding in paper.get("summary", {}).get("key_findings", [])[:3]:
+        print(f"    - {finding}")
+    print(f"    {paper.get('citation', '')}")
+
+
+def save_json_output(final_output: dict):
+    with open("output.json", "w") as f:
+        json.dump(final_output, f, indent=2)
+
+
+def generate_pdf_report(final_output: dict, from_cache: bool = False):
+    """Queue the PDF render on the background worker pool and return its job."""
+    suffix = " from cache" if from_cache else ""
+    job = submit_pdf(final_output)
+
+    def log_result(_):
+        if job.result():
+            logger.info(f"PDF report generated successfully{suffix}: {job.path}")
+        else:
+            logger.error(f"Failed to generate PDF report{suffix}")
+
+    job.future.add_done_callback(log_result)
+    return job
+
+
 def main():
     """Main interactive function to get user input and run the pipeline"""
     print("=" * 65)
@@ -107,7 +170,7 @@ def main():
             print("  4. Create PDF report")
             print("-" * 50)
             
-            result = run_pipeline(query)
+            result = run_pipeline_streaming(query)
             
             print("\n" + "=" * 50)
             print("Research summary completed successfully!")
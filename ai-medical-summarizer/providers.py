@@ -0,0 +1,129 @@
+"""
+Lazily created, process-wide clients shared by every agent.
+
+Nothing is constructed (or imported) until a node first asks for it, so
+importing the agents or the graph stays cheap and a process that never
+calls a provider never pays for it. Tests and benchmarks swap in stand-ins
+with `override`.
+"""
+
+import threading
+
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+_factories = {}
+_instances = {}
+_lock = threading.RLock()
+
+
+def register(name: str, factory):
+    """Register a zero-argument factory that builds provider `name` on first use."""
+    _factories[name] = factory
+
+def get(name: str):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            if name not in _instances:
+                logger.info(f"[Providers] Creating {name}")
+                _instances[name] = _factories[name]()
+            instance = _instances[name]
+    return instance
+
+def override(name: str, instance):
+    """Use `instance` for provider `name` instead of building it."""
+    _instances[name] = instance
+
+def reset(name: str = None):
+    """Drop the shared instance(s); the next `get` builds them again."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def _openai_limiter():
+    from utils.rate_limit import RateLimiter
+
+    return RateLimiter("openai", rpm=config.OPENAI_RPM, tpm=config.OPENAI_TPM,
+                       max_concurrency=config.OPENAI_MAX_CONCURRENCY,
+                       latency_target=config.OPENAI_LATENCY_TARGET)
+
+def _tavily_limiter():
+    from utils.rate_limit import RateLimiter
+
+    return RateLimiter("tavily", rpm=config.TAVILY_RPM, max_concurrency=config.TAVILY_MAX_CONCURRENCY)
+
+def _chat_model(**kwargs):
+    from langchain.chat_models import ChatOpenAI
+    from utils.usage import UsageCallbackHandler
+    from utils.rate_limit import RateLimitedChatModel
+
+    # The SDK's own retries would bypass the shared limiter, so 429s are retried there instead
+    llm = ChatOpenAI(model=config.LLM_MODEL, temperature=0, request_timeout=config.LLM_TIMEOUT,
+                     max_retries=0, callbacks=[UsageCallbackHandler()], **kwargs)
+    return RateLimitedChatModel(llm, get("openai_limiter"))
+
+def _json_chat_model():
+    # JSON mode, for prompts whose whole reply must be one object
+    return _chat_model(model_kwargs={"response_format": {"type": "json_object"}})
+
+def _source_limiter(name: str, rpm: float):
+    from utils.rate_limit import RateLimiter
+
+    return lambda: RateLimiter(name, rpm=rpm, max_concurrency=config.SEARCH_POOL_SIZE)
+
+def _tavily_source():
+    from tavily import TavilyClient
+    from utils.search_client import make_session
+    from utils.rate_limit import RateLimitedSearchClient
+
+    if not config.TAVILY_API_KEY:
+        raise RuntimeError("TAVILY_API_KEY is not set")
+    client = TavilyClient(api_key=config.TAVILY_API_KEY, session=make_session())
+    return RateLimitedSearchClient(client, get("tavily_limiter"))
+
+def _europepmc_source():
+    from utils.sources import EuropePMCSource
+    from utils.rate_limit import RateLimitedSearchClient
+
+    return RateLimitedSearchClient(EuropePMCSource(), get("europepmc_limiter"))
+
+def _pubmed_source():
+    from utils.sources import PubMedSource
+    from utils.rate_limit import RateLimitedSearchClient
+
+    return RateLimitedSearchClient(PubMedSource(), get("pubmed_limiter"))
+
+def _search_client():
+    from utils.search_client import RetryingSearchClient, FanOutSearchClient
+
+    if len(config.SEARCH_SOURCES) == 1:
+        return RetryingSearchClient(get(f"source:{config.SEARCH_SOURCES[0]}"))
+    # Hedged requests and partial results take the place of retries across several sources
+    return FanOutSearchClient({name: get(f"source:{name}") for name in config.SEARCH_SOURCES})
+
+register("openai_limiter", _openai_limiter)
+register("tavily_limiter", _tavily_limiter)
+register("europepmc_limiter", _source_limiter("europepmc", config.EUROPE_PMC_RPM))
+register("pubmed_limiter", _source_limiter("pubmed", config.PUBMED_RPM))
+register("source:tavily", _tavily_source)
+register("source:europepmc", _europepmc_source)
+register("source:pubmed", _pubmed_source)
+register("chat", _chat_model)
+register("json_chat", _json_chat_model)
+register("search", _search_client)
+
+
+def get_llm():
+    return get("chat")
+
+def get_json_llm():
+    return get("json_chat")
+
+def get_search_client():
+    return get("search")
@@ -0,0 +1,168 @@
+"""
+Selective recompute of doc records produced by an older model or prompt.
+
+Doc records carry the version fingerprint of their type and summary (see
+agents/versions.py). After a model, prompt or schema change, lookups keep
+serving the older records that CACHE_ACCEPT_VERSIONS allows, and this tool
+upgrades them in place, most requested (or oldest) first, until a token
+budget is spent. Records are rebuilt from the content stored with them, so
+no search calls are made.
+
+Usage:
+    python recompute.py                                 # popular records first, RECOMPUTE_TOKEN_BUDGET tokens
+    python recompute.py --order oldest --token-budget 50000
+    python recompute.py --dry-run                       # count outdated records only
+"""
+
+import argparse
+from collections import Counter
+
+import config
+from agents.classifier import classify_pending
+from agents.summarizer import summarize_document, SUMMARY_FORMAT, SUMMARY_WINDOW
+from agents.analyzer import analyze_document, ANALYSIS_WINDOW
+from agents.summary_schema import is_failed_summary
+from agents.versions import outdated_fields, tag_fields, version_fields
+from data.cache_utils import get_query_store
+from data.doc_cache_utils import get_doc_store, update_docs
+from data.popularity import get_popularity
+from utils.budget import Budget, estimate_call_tokens
+from utils.concurrency import bounded_map
+from utils.usage import track_usage
+from utils.metrics import REGISTRY, emit
+from logging_config import setup_logging
+
+import logging
+logger = logging.getLogger(__name__)
+
+ORDERS = ("popular", "oldest")
+
+
+def outdated_records() -> dict:
+    """{doc key: record} of the records with a field computed under an older version."""
+    return {key: record for key, record in get_doc_store().items()
+            if record.get("content") and outdated_fields(record)
+            and not is_failed_summary(record.get("summary_json"))}
+
+
+def doc_popularity() -> Counter:
+    """Decayed request count per doc key: the sum over the cached queries that reference it."""
+    scores = dict(get_popularity().top())
+    popularity = Counter()
+    for qhash, entry in get_query_store().get_many(list(scores)).items():
+        for ref in entry["docs"]:
+            popularity[ref["key"]] += scores[qhash]
+    return popularity
+
+
+def order_records(records: dict, order: str = "popular") -> list:
+    """Record keys in upgrade order; untagged (legacy) records count as the oldest."""
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order {order!r}; expected one of {ORDERS}")
+    oldest = sorted(records, key=lambda key: records[key].get("computed_at", 0))
+    if order == "oldest":
+        return oldest
+    popularity = doc_popularity()
+    # sorted() is stable, so equally popular records stay oldest first
+    return sorted(oldest, key=lambda key: popularity[key], reverse=True)
+
+
+def estimate_cost(record: dict) -> int:
+    """LLM tokens upgrading a record is expected to take."""
+    if config.FUSED_ANALYSIS:
+        return estimate_call_tokens(record, ANALYSIS_WINDOW, len(SUMMARY_FORMAT) + 400)
+    cost = estimate_call_tokens(record, SUMMARY_WINDOW, len(SUMMARY_FORMAT) + 200)
+    if "type" in outdated_fields(record):
+        cost += estimate_call_tokens(record, 2000, 200)
+    return cost
+
+
+def recompute_record(key: str, record: dict):
+    """The upgraded fields of one record, with their new versions; None if an LLM call failed."""
+    doc = {"content": record["content"], "type": record.get("type", ""), "versions": record.get("versions", {})}
+    fields = outdated_fields(record)
+    if config.FUSED_ANALYSIS:
+        fields = ["type", "summary_json"]
+        analyze_document(doc)
+        tag_fields(doc, *fields, producer="analyzer")
+    else:
+        if "type" in fields:
+            label = classify_pending({key: doc}).get(key)
+            if label is None:
+                return None
+            doc.update(label)
+            tag_fields(doc, "type", producer="classifier")
+        if "summary_json" in fields:
+            summarize_document(doc)
+            tag_fields(doc, "summary_json", producer="summarizer")
+    if doc.get("summary_failed"):
+        return None
+    if "type" in fields:
+        fields.append("type_source")
+    return {**{field: doc[field] for field in fields}, **version_fields(doc)}
+
+
+def recompute(order: str = None, token_budget: int = None, limit: int = None, dry_run: bool = False) -> dict:
+    """
+    Upgrade outdated doc records in `order` until `token_budget` LLM tokens
+    are spent or `limit` records are done. Returns a report of the outdated,
+    recomputed, failed and remaining counts and the tokens used.
+    """
+    order = order or config.RECOMPUTE_ORDER
+    budget = Budget(max_tokens=config.RECOMPUTE_TOKEN_BUDGET if token_budget is None else token_budget)
+    records = outdated_records()
+    keys = order_records(records, order)
+    if limit is not None:
+        keys = keys[:limit]
+    report = {"order": order, "outdated": len(records), "recomputed": 0, "failed": 0}
+
+    with track_usage(budget.meter):
+        while keys and not dry_run:
+            # One wave of LLM_MAX_CONCURRENCY records, taken in order while their estimates fit
+            batch, planned = [], 0
+            for key in keys[:config.LLM_MAX_CONCURRENCY]:
+                remaining = budget.remaining_tokens()
+                if remaining is not None and planned + estimate_cost(records[key]) > remaining:
+                    break
+                batch.append(key)
+                planned += estimate_cost(records[key])
+            if not batch:
+                logger.info(f"[Recompute] Token budget of {budget.max_tokens} spent; stopping")
+                break
+            keys = keys[len(batch):]
+
+            results = bounded_map(lambda key: recompute_record(key, records[key]), batch,
+                                  timeout=config.LLM_TIMEOUT, return_exceptions=True)
+            upgraded = {}
+            for key, result in zip(batch, results):
+                if isinstance(result, Exception) or result is None:
+                    logger.warning(f"[Recompute] Failed for SHA={key}: {result!r}")
+                    report["failed"] += 1
+                else:
+                    upgraded[key] = result
+            update_docs(upgraded)
+            report["recomputed"] += len(upgraded)
+
+    report["remaining"] = report["outdated"] - report["recomputed"]
+    report["tokens"] = budget.meter.total_tokens
+    REGISTRY.inc("recompute_docs_total", report["recomputed"], result="recomputed")
+    REGISTRY.inc("recompute_docs_total", report["failed"], result="failed")
+    logger.info(f"[Recompute] {report['recomputed']} of {report['outdated']} outdated records upgraded, "
+                f"{report['failed']} failed, {report['tokens']} tokens")
+    emit("recompute", **report)
+    return report
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Upgrade cached types and summaries to the current model and prompts")
+    parser.add_argument("--order", choices=ORDERS, help="upgrade the most requested or the oldest records first")
+    parser.add_argument("--token-budget", type=int, help="LLM tokens this run may spend")
+    parser.add_argument("--limit", type=int, help="upgrade at most this many records")
+    parser.add_argument("--dry-run", action="store_true", help="only count the outdated records")
+    args = parser.parse_args()
+    print(recompute(args.order, args.token_budget, args.limit, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
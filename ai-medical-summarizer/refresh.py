@@ -0,0 +1,172 @@
+"""
+Incremental refresh of cached queries.
+
+A refresh re-runs retrieval for a cached query, bypassing the search cache,
+and diffs the results against the cached entry by doc key (content hash).
+Only documents that are new, or whose content changed, go through the
+classifier and summarizer; everything else is reused from the doc store,
+and the query entry is rewritten in place.
+
+Usage:
+    python refresh.py "liver cancer treatments"     # refresh one query
+    python refresh.py --top 5                       # one scheduler cycle over the most popular
+"""
+
+import time
+import argparse
+import threading
+
+import config
+from agents.nodes import (retriever_node, reranker_node, dedup_node, classifier_node, summarizer_node,
+                          analyzer_node, citation_node, assembler_node)
+from agents.versions import version_accepted, adopt_versions
+from data.cache_utils import hash_query, get_query_store, store_result_in_cache
+from data.doc_cache_utils import doc_cache_key, get_cached_docs
+from data.popularity import get_popularity
+from utils.metrics import REGISTRY, emit
+from logging_config import setup_logging
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def analyze_docs(state: dict) -> dict:
+    """Classify and summarize state["docs"] with the same nodes the graph uses."""
+    if config.FUSED_ANALYSIS:
+        return analyzer_node(state)
+    return summarizer_node(classifier_node(state))
+
+
+def refresh_query(query: str):
+    """
+    Re-retrieve a cached query and patch its entry. Returns a report dict with
+    the final_output and the new/changed/unchanged/removed counts, or None if
+    the query is not cached.
+    """
+    return refresh_entry(hash_query(query))
+
+
+def refresh_entry(qhash: str):
+    """refresh_query for the query entry stored under `qhash`."""
+    entry = get_query_store().get(qhash)
+    if entry is None:
+        return None
+    query = entry["query"]
+
+    state = dedup_node(reranker_node(retriever_node({"query": query, "refresh": True})))
+    docs = state["docs"]
+    keys = [doc_cache_key(doc) for doc in docs]
+    cached_keys = {ref["key"] for ref in entry["docs"]}
+    cached_links = {ref.get("link") for ref in entry["docs"]}
+    records = get_cached_docs([key for key in keys if key in cached_keys])
+
+    stale = []
+    for doc, key in zip(docs, keys):
+        record = records.get(key)
+        if record is not None and "summary_json" in record and version_accepted(record, "summary_json"):
+            doc["type"] = record.get("type", "")
+            doc["summary_json"] = record["summary_json"]
+            adopt_versions(doc, record)
+        else:
+            stale.append(doc)
+
+    changed = sum(1 for doc in stale if doc["link"] in cached_links)
+    report = {
+        "query": query,
+        "new": len(stale) - changed,
+        "changed": changed,
+        "unchanged": len(docs) - len(stale),
+        "removed": len(cached_links - {doc["link"] for doc in docs}),
+    }
+    logger.info(f"[Refresh] {query!r}: {report['new']} new, {report['changed']} changed, "
+                f"{report['unchanged']} unchanged, {report['removed']} removed")
+
+    if stale:
+        analyze_docs({"query": query, "docs": stale})
+    state = assembler_node(citation_node({"query": query, "docs": docs}))
+    store_result_in_cache(query, state)
+
+    REGISTRY.inc("refresh_total")
+    REGISTRY.inc("refresh_docs_total", len(stale), result="analyzed")
+    REGISTRY.inc("refresh_docs_total", report["unchanged"], result="reused")
+    emit("refresh", **report)
+    report["final_output"] = state["final_output"]
+    return report
+
+
+class RefreshScheduler:
+    """
+    Background refresh of the most requested queries.
+
+    Each cycle walks queries in popularity order and refreshes those whose
+    entry is older than `min_age`, up to `budget` queries and until
+    `max_new_docs` documents have needed the LLM.
+    """
+
+    def __init__(self, budget: int = None, max_new_docs: int = None, interval: float = None,
+                 min_age: float = None):
+        self.budget = config.REFRESH_BUDGET if budget is None else budget
+        self.max_new_docs = config.REFRESH_MAX_NEW_DOCS if max_new_docs is None else max_new_docs
+        self.interval = interval or config.REFRESH_INTERVAL
+        self.min_age = config.REFRESH_MIN_AGE if min_age is None else min_age
+        self._stop = threading.Event()
+        self._thread = None
+
+    def candidates(self) -> list:
+        """Popular query hashes whose cached entry is due for a refresh."""
+        now = time.time()
+        ranked = [qhash for qhash, _ in get_popularity().top()]
+        entries = get_query_store().get_many(ranked)
+        return [qhash for qhash in ranked
+                if qhash in entries and now - entries[qhash].get("cached_at", 0) >= self.min_age]
+
+    def run_once(self) -> list:
+        reports, analyzed = [], 0
+        for qhash in self.candidates()[:self.budget]:
+            if analyzed >= self.max_new_docs:
+                logger.info(f"[Refresh] Document budget of {self.max_new_docs} spent; stopping this cycle")
+                break
+            try:
+                report = refresh_entry(qhash)
+            except Exception as e:
+                logger.error(f"[Refresh] Failed for SHA={qhash}: {e!r}")
+                REGISTRY.inc("refresh_errors_total")
+                continue
+            if report is not None:
+                analyzed += report["new"] + report["changed"]
+                reports.append(report)
+        return reports
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Refresh cached queries incrementally")
+    parser.add_argument("query", nargs="?", help="query to refresh")
+    parser.add_argument("--top", type=int, help="refresh up to this many of the most popular due queries")
+    args = parser.parse_args()
+
+    if args.query:
+        report = refresh_query(args.query)
+        print(report and {k: v for k, v in report.items() if k != "final_output"} or "Query is not cached")
+    else:
+        for report in RefreshScheduler(budget=args.top).run_once():
+            print({k: v for k, v in report.items() if k != "final_output"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+from agents.nodes import (retriever_node, reranker_node, dedup_node, classifier_node, summarizer_node,
+                          analyzer_node, citation_node, assembler_node)
+from agents.assembler import assemble_paper
+from data.cache_utils import get_cached_result, store_result_in_cache
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def process_document(doc: dict):
+    """Run one document through the same nodes the graph uses after retrieval; None if a node dropped it."""
+    state = {"docs": [doc]}
+    if config.FUSED_ANALYSIS:
+        state = analyzer_node(state)
+    else:
+        state = summarizer_node(classifier_node(state))
+    docs = citation_node(state)["docs"]
+    return docs[0] if docs else None
+
+
+def stream_pipeline(query: str):
+    """
+    Run the pipeline for `query`, yielding events as results become ready.
+
+    Events are dicts with an "event" key:
+        start: {"query", "cached", "total"} once the documents are known
+        paper: {"index", "paper"} for each paper as soon as it is summarized,
+               in completion order; "index" is its place among the retrieved
+               documents. Papers whose LLM calls fail are left out
+        done:  {"cached", "result"} with the assembled final_output, which
+               is also stored in the query cache
+    """
+    cached = get_cached_result(query)
+    if cached:
+        logger.info(f"[CACHE] Query hit: {query}")
+        papers = cached["final_output"].get("papers", [])
+        yield {"event": "start", "query": query, "cached": True, "total": len(papers)}
+        for index, paper in enumerate(papers):
+            yield {"event": "paper", "index": index, "paper": paper}
+        yield {"event": "done", "cached": True, "result": cached["final_output"]}
+        return
+
+    logger.info(f"[STREAM] Running per-document pipeline for query: {query}")
+    state = dedup_node(reranker_node(retriever_node({"query": query})))
+    docs = state["docs"]
+    yield {"event": "start", "query": query, "cached": False, "total": len(docs)}
+
+    processed = [None] * len(docs)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(config.LLM_MAX_CONCURRENCY, len(docs))))
+    try:
+        futures = {
+            pool.submit(contextvars.copy_context().run, process_document, doc): index
+            for index, doc in enumerate(docs)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            processed[index] = future.result()
+            if processed[index] is not None:
+                yield {"event": "paper", "index": index, "paper": assemble_paper(processed[index])}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    state["docs"] = [doc for doc in processed if doc is not None]
+    state = assembler_node(state)
+    store_result_in_cache(query, state)
+    yield {"event": "done", "cached": False, "result": state["final_output"]}
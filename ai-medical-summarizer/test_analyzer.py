@@ -0,0 +1,36 @@
+"""
+Tests for the fused classify-and-summarize node
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import agents.analyzer as analyzer
+from data.stores import SQLiteStore
+from data.doc_cache_utils import set_doc_store, get_cached_docs, hash_doc_content
+
+
+def test_analyzer_fills_type_and_summary_with_one_call(tmp_path, monkeypatch, fake_llm):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    fake = fake_llm({"document_type": "Meta-Analysis", "summary": {"key_findings": ["finding"]}})
+    monkeypatch.setattr(analyzer, "get_json_llm", lambda: fake)
+    docs = [{"title": "t", "link": "l", "content": "paper body"}]
+
+    try:
+        state = analyzer.analyzer_node({"docs": docs})
+        doc = state["docs"][0]
+        assert fake.calls == 1
+        assert doc["type"] == "meta-analysis"
+        assert doc["summary_json"] == {"key_findings": ["finding"]}
+        record = get_cached_docs([hash_doc_content(doc)])[hash_doc_content(doc)]
+        assert {field: record[field] for field in ("type", "summary_json")} == {
+            "type": "meta-analysis",
+            "summary_json": {"key_findings": ["finding"]},
+        }
+        assert set(record["versions"]) == {"type", "summary_json"}
+
+        analyzer.analyzer_node({"docs": [{"title": "t", "link": "l", "content": "paper body"}]})
+        assert fake.calls == 1
+    finally:
+        set_doc_store(None)
@@ -0,0 +1,141 @@
+"""
+Tests for the HTTP service: request coalescing, backpressure and cache hits
+"""
+
+import os
+import time
+import asyncio
+
+import httpx
+import pytest
+from starlette.requests import ClientDisconnect
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+import api
+
+
+class FakeGraph:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, state):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"query": state["query"], "docs": [], "final_output": {"query": state["query"], "papers": []}}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    fake = FakeGraph()
+    stored = {}
+    monkeypatch.setattr(api, "get_compiled", lambda: fake)
+    monkeypatch.setattr(api, "get_cached_result", lambda query: stored.get(api.hash_query(query)))
+    monkeypatch.setattr(api, "store_result_in_cache",
+                        lambda query, result: stored.__setitem__(api.hash_query(query), result))
+    monkeypatch.setattr(api, "report_handle", lambda output: {"id": "job", "status": "pending"})
+    return fake
+
+
+async def _post_many(queries):
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.post("/summarize", json={"query": q}) for q in queries))
+
+
+def test_identical_queries_share_one_run(graph, monkeypatch):
+    monkeypatch.setattr(api, "runner", api.PipelineRunner(max_workers=2, max_queue=2))
+
+    responses = asyncio.run(_post_many(["Liver cancer treatments"] * 5 + ["liver cancer treatments "]))
+
+    assert [r.status_code for r in responses] == [200] * 6
+    assert graph.calls == 1
+
+    # Now cached: answered without touching the graph
+    [response] = asyncio.run(_post_many(["liver cancer treatments"]))
+    assert response.json()["cached"] is True
+    assert graph.calls == 1
+
+
+def test_overload_returns_429(graph, monkeypatch):
+    monkeypatch.setattr(api, "runner", api.PipelineRunner(max_workers=1, max_queue=1))
+
+    responses = asyncio.run(_post_many(["query one", "query two", "query three"]))
+
+    assert sorted(r.status_code for r in responses) == [200, 200, 429]
+    assert graph.calls == 2
+
+
+def test_streams_take_runner_slots(monkeypatch):
+    monkeypatch.setattr(api, "runner", api.PipelineRunner(max_workers=1, max_queue=0))
+
+    def slow_stream(query):
+        yield {"event": "start", "query": query}
+        time.sleep(0.2)
+        yield {"event": "done", "query": query}
+
+    monkeypatch.setattr(api, "stream_pipeline", slow_stream)
+
+    async def post_streams(queries):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/summarize/stream", json={"query": q}) for q in queries))
+
+    responses = asyncio.run(post_streams(["query one", "query two"]))
+
+    assert sorted(r.status_code for r in responses) == [200, 429]
+    assert api.runner.depth == 0
+    [response] = asyncio.run(post_streams(["query three"]))
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+
+
+def test_disconnected_streams_release_their_slot_and_close_the_run(monkeypatch):
+    monkeypatch.setattr(api, "runner", api.PipelineRunner(max_workers=1, max_queue=0))
+    closed = []
+
+    def endless_stream(query):
+        try:
+            while True:
+                yield {"event": "paper", "query": query}
+                time.sleep(0.05)
+        finally:
+            closed.append(query)
+
+    monkeypatch.setattr(api, "stream_pipeline", endless_stream)
+
+    async def open_stream(query):
+        response = await api.summarize_stream(api.SummarizeRequest(query=query))
+        assert api.runner.depth == 1
+        return response
+
+    async def gone_before_the_body():
+        async def send(message):
+            raise OSError("connection reset")
+
+        response = await open_stream("never started")
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, send)
+
+    async def gone_mid_stream():
+        sent = asyncio.Event()
+
+        async def send(message):
+            if message.get("body"):
+                sent.set()
+
+        async def receive():
+            await sent.wait()
+            return {"type": "http.disconnect"}
+
+        response = await open_stream("started")
+        await response({"type": "http"}, receive, send)
+
+    asyncio.run(gone_before_the_body())
+    assert api.runner.depth == 0
+    asyncio.run(gone_mid_stream())
+    assert api.runner.depth == 0
+    # Closing the run is what shuts its executor down
+    assert closed == ["started"]
@@ -0,0 +1,90 @@
+"""
+Tests for batch mode: cross-query document dedup, checkpoint resume and accounting
+"""
+
+import os
+import json
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+import batch
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+import data.cache_utils as cache_utils
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+from data.doc_cache_utils import set_doc_store, get_doc_store, doc_cache_key
+
+
+def fake_retriever(state):
+    # Every query shares the "common" paper plus one of its own
+    own = state["query"].split()[-1]
+    state["docs"] = [
+        {"title": title, "link": f"https://example.com/{title}", "content": f"text of {title}", "source": ""}
+        for title in ("common", own)
+    ]
+    return state
+
+
+def test_batch_dedup_resume_and_summary(tmp_path, monkeypatch, fake_llm):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(str(tmp_path / "cache.db"), table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    monkeypatch.setattr(batch, "retriever_node", fake_retriever)
+    classify = fake_llm("review", delay=0.05, prompt_tokens=100, completion_tokens=20)
+    summarize = fake_llm({"key_findings": ["x"]}, delay=0.05, prompt_tokens=100, completion_tokens=20)
+    monkeypatch.setattr(classifier, "get_llm", lambda: classify)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: summarize)
+
+    input_path = tmp_path / "queries.csv"
+    input_path.write_text("query\nquery a\nquery b\nquery c\nQuery A\n\n")
+    output_path = str(tmp_path / "results.jsonl")
+
+    try:
+        queries = batch.read_queries(str(input_path))
+        assert queries == ["query a", "query b", "query c"]
+
+        summary = batch.BatchRunner(output_path, concurrency=3).run(queries)
+
+        # "common" is processed once for all three queries: 4 distinct docs
+        assert classify.calls == 4 and summarize.calls == 4
+        assert summary["completed"] == 3 and summary["failed"] == 0
+        assert summary["llm_calls"] == 8 and summary["total_tokens"] == 8 * 120
+
+        records = [json.loads(line) for line in open(output_path)]
+        assert sorted(r["query"] for r in records) == queries
+        assert all(r["result"]["papers"][0]["type"] == "review" for r in records)
+
+        # Simulate a crash mid-write, then resume: nothing finished is re-run
+        with open(output_path, "a") as f:
+            f.write('{"query": "query d", "query_ha')
+        summary = batch.BatchRunner(output_path, concurrency=3).run(queries + ["query d"])
+        assert summary["skipped"] == 3 and summary["completed"] == 1
+        assert classify.calls == 5
+        assert json.loads(open(output_path).read().splitlines()[-1])["query"] == "query d"
+    finally:
+        set_doc_store(None)
+
+
+def test_failed_shared_summary_is_not_cached(tmp_path, monkeypatch, fake_llm):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(str(tmp_path / "cache.db"), table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    monkeypatch.setattr(batch, "retriever_node", fake_retriever)
+    monkeypatch.setattr(classifier, "get_llm", lambda: fake_llm("review", delay=0.05))
+    monkeypatch.setattr(summarizer, "get_llm", lambda: fake_llm("not json at all", delay=0.05))
+
+    try:
+        output_path = str(tmp_path / "results.jsonl")
+        summary = batch.BatchRunner(output_path, concurrency=2).run(["query a", "query b"])
+        assert summary["completed"] == 2
+
+        records = [json.loads(line) for line in open(output_path)]
+        assert all(r["result"]["papers"][0]["summary"]["raw"] == "not json at all" for r in records)
+        common = {"content": "text of common"}
+        record = get_doc_store().get(doc_cache_key(common)) or {}
+        assert "summary_json" not in record
+        assert cache_utils.get_cached_result("query a") is None
+    finally:
+        set_doc_store(None)
@@ -0,0 +1,22 @@
+"""
+Smoke test for the offline benchmark harness
+"""
+
+import json
+
+from benchmarks import run_benchmarks
+
+
+def test_quick_benchmark_run(tmp_path):
+    output = tmp_path / "bench.json"
+    run_benchmarks.main(["--quick", "--queries", "2", "--lookups", "3",
+                         "--cache-sizes", "10", "--concurrency", "2", "--output", str(output)])
+
+    report = json.loads(output.read_text())
+    names = [scenario["scenario"] for scenario in report["scenarios"]]
+    assert names[:4] == ["cold_graph", "warm_graph", "cold_pipeline", "warm_pipeline"]
+    assert "cache_size_10_disk_hit" in names and "concurrency_2" in names
+    doc_lookup = next(s for s in report["scenarios"] if s["scenario"] == "cache_size_10_doc_lookup")
+    assert doc_lookup["params"]["hit_rate"] == 1.0
+    assert all(scenario["errors"] == 0 for scenario in report["scenarios"])
+    assert all(scenario["latency_ms"]["p95"] >= scenario["latency_ms"]["p50"] for scenario in report["scenarios"])
@@ -0,0 +1,129 @@
+"""
+Tests for deadline and token budgets and the degradations they trigger
+"""
+
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import config
+import graph_config
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+import data.cache_utils as cache_utils
+import data.doc_cache_utils as doc_cache_utils
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+from utils.budget import Budget, plan_llm_work
+from utils.usage import track_usage
+
+
+def make_docs(n, length=3000):
+    return [{"title": f"Paper {i}", "link": f"https://example.org/{i}", "source": "",
+             "content": f"doc {i} " + "x" * length} for i in range(n)]
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(doc_cache_utils, "_store", SQLiteStore(db_path))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(db_path, table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    monkeypatch.setattr(config, "BUDGET_LLM_SECONDS", 1.0)
+    monkeypatch.setattr(config, "BUDGET_SHORT_WINDOW", 1000)
+    monkeypatch.setattr(config, "LLM_COMPLETION_TOKENS_ESTIMATE", 500)
+
+
+def test_plan_shortens_prompts_then_drops_documents(stores):
+    docs = make_docs(4)
+    assert plan_llm_work(None, docs, 3000, 0) == (docs, 3000)
+
+    # Full windows cost ~1250 tokens each, short ones ~750
+    budget = Budget(max_tokens=2000)
+    selected, window = plan_llm_work(budget, docs, 3000, 0)
+    assert window == 1000 and selected == docs[:2]
+    assert [d["kind"] for d in budget.degradations] == ["short_prompts", "fewer_documents"]
+
+    expired = Budget(deadline=0.01)
+    time.sleep(0.02)
+    assert plan_llm_work(expired, docs, 3000, 0)[0] == []
+    assert expired.degradations[0]["kind"] == "deadline_exceeded"
+
+
+def test_tight_budget_skips_classification_and_drops_unsummarized_docs(stores, monkeypatch, fake_llm):
+    llm = fake_llm({"key_findings": ["x"]}, prompt_tokens=400, completion_tokens=100)
+    monkeypatch.setattr(classifier, "get_llm", lambda: llm)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: llm)
+    docs = make_docs(3)
+    docs[0]["content"] = "A randomized controlled trial. " + docs[0]["content"]
+
+    budget = Budget(max_tokens=2500)
+    with track_usage(budget.meter):
+        state = summarizer.summarizer_node(classifier.classifier_node({"query": "q", "docs": docs, "budget": budget}))
+
+    kinds = [d["kind"] for d in budget.degradations]
+    assert kinds == ["skip_classification", "short_prompts", "fewer_documents"]
+    # ~1140 tokens per shortened summary: two fit, the third paper is dropped
+    assert llm.calls == 2
+    assert state["docs"][0]["type"] == "clinical trial"
+    assert [doc["title"] for doc in state["docs"]] == ["Paper 0", "Paper 1"]
+    # Nothing from the shortened prompts or the keyword labels was cached
+    assert doc_cache_utils.get_doc_store().get_many([doc_cache_utils.doc_cache_key(d) for d in docs]) == {}
+
+
+def test_guessed_labels_are_not_cached(stores, monkeypatch, fake_llm):
+    llm = fake_llm({"key_findings": ["x"]}, prompt_tokens=400, completion_tokens=100)
+    monkeypatch.setattr(classifier, "get_llm", lambda: llm)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: llm)
+    docs = make_docs(1, length=100)
+
+    # Too little time to classify and summarize, enough for a full-length summary
+    budget = Budget(deadline=1.5)
+    state = summarizer.summarizer_node(classifier.classifier_node({"query": "q", "docs": docs, "budget": budget}))
+    assert [d["kind"] for d in budget.degradations] == ["skip_classification"]
+    assert llm.calls == 1
+
+    key = doc_cache_utils.doc_cache_key(state["docs"][0])
+    record = doc_cache_utils.get_cached_doc(key)
+    assert record["summary_json"] == {"key_findings": ["x"]}
+    assert "type" not in record and "type" not in record["versions"]
+
+    classifier.classifier_node({"query": "q", "docs": make_docs(1, length=100)})
+    assert llm.calls == 2
+
+
+def test_deadline_drops_slow_summaries(stores, monkeypatch, fake_llm):
+    llm = fake_llm({"key_findings": ["x"]}, delay={"doc 1 ": 1.0}, prompt_tokens=400, completion_tokens=100)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: llm)
+    docs = make_docs(3, length=100)
+    for doc in docs:
+        doc["type"] = "review"
+
+    budget = Budget(deadline=0.3)
+    start = time.monotonic()
+    state = summarizer.summarizer_node({"query": "q", "docs": docs, "budget": budget})
+    assert time.monotonic() - start < 0.8
+    assert [doc["title"] for doc in state["docs"]] == ["Paper 0", "Paper 2"]
+    assert "deadline_exceeded" in [d["kind"] for d in budget.degradations]
+
+
+def test_failed_run_serves_stale_cache(stores, monkeypatch):
+    monkeypatch.setattr(config, "QUERY_CACHE_MAX_AGE", 60)
+    entry, _ = cache_utils.normalize_entry("liver cancer", {"docs": []}, cached_at=1)
+    cache_utils.get_query_store().put(cache_utils.hash_query("liver cancer"), entry)
+    assert cache_utils.get_cached_result("liver cancer") is None
+
+    class Broken:
+        def invoke(self, state):
+            raise ConnectionError("search is down")
+
+    monkeypatch.setattr(graph_config, "get_compiled", lambda: Broken())
+    output = graph_config.run_with_budget("liver cancer", Budget(deadline=30))
+    assert output["papers"] == []
+    assert output["degradations"][0]["kind"] == "stale_cache"
+
+    with pytest.raises(ConnectionError):
+        graph_config.run_with_budget("never cached", Budget(deadline=30))
@@ -0,0 +1,77 @@
+"""
+Tests for token-budgeted chunking and map-reduce summarization of long documents
+"""
+
+import os
+import json
+import threading
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain.schema import AIMessage
+
+import config
+import agents.summarizer as summarizer
+from agents.chunking import count_tokens, split_into_chunks
+from data.stores import SQLiteStore
+from data.doc_cache_utils import set_doc_store, set_chunk_store
+
+
+class FakeMapReduceModel:
+    def __init__(self):
+        self.sections = []
+        self.reduces = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, messages):
+        prompt = messages[-1].content
+        with self.lock:
+            if "Section:" in prompt:
+                self.sections.append(prompt.split("Section:")[1])
+                return AIMessage(content=json.dumps({"key_findings": ["chunk finding"]}))
+            self.reduces += 1
+        return AIMessage(content=json.dumps({"type": "review", "key_findings": ["merged"]}))
+
+
+def paragraphs(count, tag):
+    return "\n\n".join(f"{tag} paragraph {i}: " + "tumor therapy outcome " * 40 for i in range(count))
+
+
+def test_split_into_chunks_respects_budget():
+    text = paragraphs(6, "a") + "\n\n" + "word " * 500
+    chunks = split_into_chunks(text, 200)
+
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert "a paragraph 0" in chunks[0]
+    assert "".join(chunks).count("word") == 500
+
+
+def test_long_document_map_reduce_reuses_cached_chunks(tmp_path, monkeypatch):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    set_chunk_store(SQLiteStore(str(tmp_path / "cache.db"), table="chunks"))
+    fake = FakeMapReduceModel()
+    monkeypatch.setattr(summarizer, "get_llm", lambda: fake)
+    monkeypatch.setattr(config, "LONG_DOC_MODE", True)
+    monkeypatch.setattr(config, "CHUNK_TOKENS", 300)
+
+    try:
+        raw = paragraphs(8, "old")
+        doc = {"title": "t", "link": "l", "content": "snippet", "type": "review", "raw_content": raw}
+        summarizer.summarizer_node({"docs": [doc]})
+        first_pass = len(fake.sections)
+
+        assert first_pass == len(split_into_chunks(raw, 300)) > 1
+        assert fake.reduces == 1
+        assert doc["summary_json"] == {"type": "review", "key_findings": ["merged"]}
+
+        # Re-fetched page with one new section appended: only that section is extracted
+        updated = {"title": "t", "link": "l", "content": "snippet v2", "type": "review",
+                   "raw_content": raw + "\n\n" + "new finding " * 60}
+        summarizer.summarizer_node({"docs": [updated]})
+
+        assert len(fake.sections) == first_pass + 1
+        assert "new finding" in fake.sections[-1]
+        assert fake.reduces == 2
+    finally:
+        set_doc_store(None)
+        set_chunk_store(None)
@@ -0,0 +1,111 @@
+"""
+Tests for concurrent per-document LLM calls in the classifier and summarizer nodes, and their timeouts
+"""
+
+import os
+import time
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import config
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+from data.stores import SQLiteStore
+from data.doc_cache_utils import set_doc_store, hash_doc_content
+from utils.concurrency import bounded_map
+from utils.rate_limit import RateLimiter, RateLimitedChatModel
+
+
+@pytest.fixture
+def docs(tmp_path, monkeypatch):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    yield [
+        {"title": f"Paper {i}", "link": f"https://example.com/{i}", "content": f"document-{i} body"}
+        for i in range(4)
+    ]
+    set_doc_store(None)
+
+
+def test_classifier_latency_tracks_slowest_document(docs, monkeypatch, fake_llm):
+    latencies = {"document-0": 0.1, "document-1": 0.4, "document-2": 0.1, "document-3": 0.2}
+    fake = fake_llm("Review", delay=latencies)
+    monkeypatch.setattr(classifier, "get_llm", lambda: fake)
+
+    start = time.monotonic()
+    state = classifier.classifier_node({"docs": docs})
+    elapsed = time.monotonic() - start
+
+    # Serial execution would take the sum (0.8s); concurrent takes about the slowest (0.4s)
+    assert elapsed < 0.7
+    assert fake.calls == 4
+    assert [doc["title"] for doc in state["docs"]] == ["Paper 0", "Paper 1", "Paper 2", "Paper 3"]
+    assert all(doc["type"] == "review" for doc in state["docs"])
+
+    # Cache writes are unchanged: a second run never reaches the model
+    classifier.classifier_node({"docs": [dict(doc) for doc in docs]})
+    assert fake.calls == 4
+
+
+def test_summarizer_caches_each_distinct_document_once(docs, monkeypatch, fake_llm):
+    reply = json.dumps({"type": "review", "key_findings": ["finding"]})
+    fake = fake_llm(reply, delay={"document-": 0.2})
+    monkeypatch.setattr(summarizer, "get_llm", lambda: fake)
+    docs.append(dict(docs[0]))
+
+    start = time.monotonic()
+    state = summarizer.summarizer_node({"docs": docs})
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.6
+    assert fake.calls == 4
+    assert len(state["docs"]) == 5
+    assert state["docs"][4]["summary_json"] == {"type": "review", "key_findings": ["finding"]}
+    cached = summarizer.get_cached_docs([hash_doc_content(doc) for doc in docs])
+    assert len(cached) == 4
+
+
+def test_bounded_map_timeout_and_order():
+    assert bounded_map(lambda x: x * 2, range(10), max_workers=3) == list(range(0, 20, 2))
+
+    with pytest.raises(TimeoutError):
+        bounded_map(time.sleep, [0.01, 1.0], max_workers=2, timeout=0.2)
+
+
+def test_timed_out_documents_are_dropped_not_fatal(docs, monkeypatch, fake_llm):
+    monkeypatch.setattr(config, "LLM_TIMEOUT", 0.2)
+    classify = fake_llm("Review", delay={"document-1": 1.0})
+    monkeypatch.setattr(classifier, "get_llm", lambda: classify)
+    summarize = fake_llm(json.dumps({"key_findings": ["finding"]}), delay={"document-2": 1.0})
+    monkeypatch.setattr(summarizer, "get_llm", lambda: summarize)
+
+    state = summarizer.summarizer_node(classifier.classifier_node({"docs": docs}))
+
+    assert [doc["title"] for doc in state["docs"]] == ["Paper 0", "Paper 3"]
+    cached = summarizer.get_cached_docs([hash_doc_content(doc) for doc in docs])
+    assert "type" not in cached.get(hash_doc_content(docs[1]), {})
+    assert "summary_json" not in cached.get(hash_doc_content(docs[2]), {})
+
+
+def test_llm_calls_get_the_time_left_of_their_bounded_map_call():
+    class RecordingLLM:
+        def __init__(self):
+            self.timeouts = []
+
+        def __call__(self, messages, **kwargs):
+            self.timeouts.append(kwargs.get("timeout"))
+
+    llm = RecordingLLM()
+    model = RateLimitedChatModel(llm, RateLimiter("test", rpm=60000))
+    messages = [HumanMessage(content="hi")]
+
+    model(messages)
+    bounded_map(lambda _: model(messages), [1, 2], max_workers=2, timeout=5)
+    # A nested call ends by its outer call's deadline
+    bounded_map(lambda _: bounded_map(lambda _: model(messages), [1], timeout=30), [1], timeout=5)
+
+    assert llm.timeouts[0] is None
+    assert all(0 < timeout <= 5 for timeout in llm.timeouts[1:])
@@ -0,0 +1,57 @@
+"""
+Tests for the SQLite doc cache store and the legacy JSON migration
+"""
+
+import json
+from multiprocessing import Process
+
+from data.stores import SQLiteStore
+from data.doc_cache_utils import hash_doc_content, migrate_json_doc_cache
+
+
+def _write_range(db_path, start, stop):
+    store = SQLiteStore(db_path)
+    for i in range(start, stop):
+        store.put(f"doc-{i}", {"type": "review", "n": i})
+
+
+def test_put_get_and_batch(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.db"))
+    store.put("a", {"type": "review"})
+    store.put_many({"b": {"type": "case study"}, "c": {"type": "meta-analysis"}})
+    store.put("a", {"type": "clinical trial"})
+
+    assert store.get("a") == {"type": "clinical trial"}
+    assert store.get("missing") is None
+    assert store.get_many(["a", "c", "missing"]) == {
+        "a": {"type": "clinical trial"},
+        "c": {"type": "meta-analysis"},
+    }
+    assert len(store) == 3
+
+
+def test_concurrent_writers_keep_every_entry(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    SQLiteStore(db_path)
+    workers = [Process(target=_write_range, args=(db_path, i * 50, (i + 1) * 50)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    store = SQLiteStore(db_path)
+    assert len(store) == 200
+    assert store.get("doc-199") == {"type": "review", "n": 199}
+
+
+def test_migrate_legacy_json(tmp_path):
+    doc = {"title": "t", "link": "l", "content": "Some Content", "type": "review", "summary_json": {"key_findings": []}}
+    doc_cache = tmp_path / "doc_cache.json"
+    query_cache = tmp_path / "cached_docs.json"
+    doc_cache.write_text(json.dumps({"h1": {"type": "case study"}}))
+    query_cache.write_text(json.dumps({"q1": {"query": "q", "docs": [doc], "final_output": {}}}))
+
+    store = SQLiteStore(str(tmp_path / "cache.db"))
+    assert migrate_json_doc_cache(store, str(doc_cache), str(query_cache)) == 2
+    assert store.get("h1") == {"type": "case study"}
+    assert store.get(hash_doc_content(doc)) == {"type": "review", "summary_json": {"key_findings": []}}
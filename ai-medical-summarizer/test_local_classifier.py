@@ -0,0 +1,77 @@
+"""
+Tests for the local classifier fast path
+"""
+
+import os
+import random
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import config
+import agents.classifier as classifier
+import agents.local_classifier as local_classifier
+from agents.local_classifier import normalize_label, train, evaluate, training_data
+from data.stores import SQLiteStore
+from data.doc_cache_utils import set_doc_store, get_cached_docs, update_docs, hash_doc_content
+
+
+VOCAB = {
+    "clinical trial": "randomized placebo arm enrolled participants phase endpoint dosing",
+    "meta-analysis": "pooled studies heterogeneity forest plot effect size included trials",
+    "review": "overview literature narrative current understanding summarize advances",
+    "case study": "patient presented year old admitted history examination reported case",
+}
+
+
+def corpus(per_label=30, seed=0):
+    rng = random.Random(seed)
+    filler = "disease treatment outcome medical health clinical".split()
+    texts, labels = [], []
+    for label, words in VOCAB.items():
+        for _ in range(per_label):
+            texts.append(" ".join(rng.choices(words.split(), k=12) + rng.choices(filler, k=12)))
+            labels.append(label)
+    return texts, labels
+
+
+def test_normalize_label():
+    assert normalize_label("This document can be classified as a randomized controlled trial.") == "clinical trial"
+    assert normalize_label("Systematic review and meta analysis") == "meta-analysis"
+    assert normalize_label("case report") == "case study"
+    assert normalize_label('"medical research overview"') == "review"
+    assert normalize_label("classification: medical information - brain tumors") == "other"
+
+
+def test_evaluate_reports_agreement_and_throughput():
+    report = evaluate(*corpus(), threshold=0.5)
+    assert report["agreement_with_llm"] >= 0.9
+    assert 0 < report["coverage_at_threshold"] <= 1
+    assert report["throughput_docs_per_s"] > 0
+
+
+def test_confident_docs_skip_the_llm(tmp_path, monkeypatch, fake_llm):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(config, "LOCAL_CLASSIFIER_ENABLED", True)
+    monkeypatch.setattr(config, "LOCAL_CLASSIFIER_THRESHOLD", 0.5)
+    llm = fake_llm("This is best described as a case report.")
+    monkeypatch.setattr(classifier, "get_llm", lambda: llm)
+
+    try:
+        train(*corpus(), path=str(tmp_path / "model.joblib"))
+        docs = [
+            {"title": "a", "link": "a", "content": VOCAB["clinical trial"] + " " + VOCAB["clinical trial"]},
+            {"title": "b", "link": "b", "content": "unrelated words about nothing in particular"},
+        ]
+        classifier.classifier_node({"docs": docs})
+
+        assert docs[0]["type"] == "clinical trial"
+        assert llm.calls == 1 and docs[1]["type"] == "case study"
+        keys = [hash_doc_content(doc) for doc in docs]
+        records = get_cached_docs(keys)
+        assert [records[key]["type_source"] for key in keys] == ["local", "llm"]
+        # Retraining learns from the LLM's labels only, never from the model's own predictions
+        update_docs({key: {"content": doc["content"]} for key, doc in zip(keys, docs)})
+        assert training_data() == ([docs[1]["content"]], ["case study"])
+    finally:
+        set_doc_store(None)
+        local_classifier.set_local_classifier(None)
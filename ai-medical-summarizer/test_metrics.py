@@ -0,0 +1,59 @@
+"""
+Tests for per-node instrumentation and the Prometheus export
+"""
+
+import json
+import logging
+from typing import TypedDict, List
+
+from langgraph.graph import StateGraph, END
+
+from utils.metrics import Histogram, MetricsRegistry, instrument_node
+import utils.metrics as metrics
+from utils.usage import record_llm_call, record_cache_lookup
+
+
+class State(TypedDict):
+    query: str
+    docs: List[dict]
+
+
+def fake_summarizer(state):
+    record_cache_lookup(hits=1, misses=2)
+    record_llm_call(prompt_tokens=300, completion_tokens=50)
+    record_llm_call(prompt_tokens=200, completion_tokens=40)
+    state["docs"] = state["docs"] + [{"title": "new"}]
+    return state
+
+
+def test_instrumented_graph_records_node_metrics(monkeypatch, caplog):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    graph = StateGraph(State)
+    graph.add_node("summarizer", instrument_node("summarizer", fake_summarizer))
+    graph.set_entry_point("summarizer")
+    graph.add_edge("summarizer", END)
+
+    with caplog.at_level(logging.INFO, logger="metrics"):
+        graph.compile().invoke({"query": "q", "docs": [{"title": "a"}]})
+
+    text = registry.to_prometheus()
+    assert 'pipeline_node_calls_total{node="summarizer",status="ok"} 1' in text
+    assert 'pipeline_llm_tokens_total{kind="prompt",node="summarizer"} 500' in text
+    assert 'pipeline_cache_lookups_total{node="summarizer",result="miss"} 2' in text
+    assert 'pipeline_node_duration_seconds_count{node="summarizer"} 1' in text
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["node"] == "summarizer"
+    assert (record["docs_in"], record["docs_out"], record["llm_calls"]) == (1, 2, 2)
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.2, 0.5, 1.0))
+    for value in [0.05] * 50 + [0.15] * 45 + [0.8] * 5:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) <= 0.1
+    assert 0.1 < histogram.quantile(0.95) <= 0.2
+    assert 0.5 < histogram.quantile(0.99) <= 1.0
@@ -0,0 +1,81 @@
+"""
+Tests for the MongoDB cache backend, against mongomock
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import pytest
+
+import agents.summarizer as summarizer
+import data.doc_cache_utils as doc_cache_utils
+from data.stores import MongoStore
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_bulk_upserts_and_ttl_index():
+    database = mongomock.MongoClient().cache
+    store = MongoStore(database.queries, ttl=3600)
+    store.put_many({"a": {"query": "x"}, "b": {"query": "y", "keys.with.dots": 1}})
+    store.put("a", {"query": "z"})
+
+    assert store.get("a") == {"query": "z"}
+    assert store.get_many(["a", "b", "missing"]) == {"a": {"query": "z"}, "b": {"query": "y", "keys.with.dots": 1}}
+    assert len(store) == 2 and dict(store.items())["b"]["query"] == "y"
+    ttl_indexes = [index for index in database.queries.index_information().values() if "expireAfterSeconds" in index]
+    assert ttl_indexes and ttl_indexes[0]["expireAfterSeconds"] == 3600
+
+    store.delete("a")
+    assert store.get("a") is None
+
+
+def test_ttl_index_follows_the_configured_ttl():
+    database = mongomock.MongoClient().cache
+    MongoStore(database.queries, ttl=60)
+    MongoStore(database.queries, ttl=3600)
+    ttls = [index.get("expireAfterSeconds") for index in database.queries.index_information().values()
+            if index["key"] == [("updated_at", 1)]]
+    assert ttls == [3600]
+    MongoStore(database.queries)
+    assert not any(index["key"] == [("updated_at", 1)] for index in database.queries.index_information().values())
+
+
+def test_claims_are_exclusive_until_released_or_expired():
+    store = MongoStore(mongomock.MongoClient().cache.docs)
+
+    assert store.claim("summary_json:abc", "worker-1", lease=60)
+    assert not store.claim("summary_json:abc", "worker-2", lease=60)
+    assert store.claim("summary_json:abc", "worker-1", lease=60)
+
+    store.release("summary_json:abc", "worker-1")
+    assert store.claim("summary_json:abc", "worker-2", lease=60)
+
+    # A crashed holder's lease lapses
+    store.claims.update_one({"_id": "summary_json:abc"},
+                            {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert store.claim("summary_json:abc", "worker-3", lease=60)
+
+
+def test_only_one_worker_summarizes_a_doc(monkeypatch, fake_llm):
+    monkeypatch.setattr(doc_cache_utils, "_store", MongoStore(mongomock.MongoClient().cache.docs))
+    monkeypatch.setattr(doc_cache_utils, "CLAIM_POLL", 0.05)
+    model = fake_llm({"key_findings": ["x"]}, delay=0.3)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: model)
+    results = []
+
+    def worker():
+        doc = {"title": "t", "link": "l", "content": "shared paper", "type": "review"}
+        results.append(summarizer.summarizer_node({"docs": [doc]})["docs"][0]["summary_json"])
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert results == [{"key_findings": ["x"]}] * 2
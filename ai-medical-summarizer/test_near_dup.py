@@ -0,0 +1,79 @@
+"""
+Tests for MinHash/LSH near-duplicate detection ahead of classification and summarization
+"""
+
+import os
+import random
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import config
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+from agents.dedup import dedup_node
+from data.near_dup import MinHasher, NearDupIndex
+from data.stores import SQLiteStore
+from data.doc_cache_utils import set_doc_store, set_near_dup_index
+
+
+WORDS = "tumor therapy patients trial cohort survival biomarker dose placebo outcome insulin glucose".split()
+
+
+def article(seed, length=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 50)) for _ in range(length))
+
+
+def test_minhash_estimates_similarity():
+    hasher = MinHasher(num_perm=128)
+    base = article(1)
+    edited = base.replace(base.split()[10], "changed", 1) + " syndicated from another site"
+    same = float((hasher.signature(base) == hasher.signature(edited)).mean())
+    different = float((hasher.signature(base) == hasher.signature(article(2))).mean())
+
+    assert same > 0.85
+    assert different < 0.1
+
+
+def test_index_persists_and_finds_candidates(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.db"), table="doc_signatures")
+    index = NearDupIndex(store=store)
+    index.add("a", index.hasher.signature(article(1)))
+    # A second worker sharing the table writes its own row without losing the first
+    NearDupIndex(store=store).add("b", index.hasher.signature(article(2)))
+
+    reloaded = NearDupIndex(bands=8, store=store)
+    key, score = reloaded.query(reloaded.hasher.signature(article(1) + " extra words"), threshold=0.8)
+    assert len(reloaded) == 2 and key == "a" and score >= 0.8
+    assert reloaded.query(reloaded.hasher.signature(article(3)), threshold=0.8) == (None, 0.0)
+
+
+def test_near_duplicates_share_one_llm_call(tmp_path, monkeypatch, fake_llm):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    set_near_dup_index(NearDupIndex(store=SQLiteStore(str(tmp_path / "cache.db"), table="doc_signatures")))
+    monkeypatch.setattr(config, "NEAR_DUP_ENABLED", True)
+    classify = fake_llm("review")
+    summarize = fake_llm({"key_findings": ["x"]})
+    monkeypatch.setattr(classifier, "get_llm", lambda: classify)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: summarize)
+
+    def run(docs):
+        state = dedup_node({"docs": docs})
+        return summarizer.summarizer_node(classifier.classifier_node(state))["docs"]
+
+    try:
+        body = article(7)
+        docs = run([
+            {"title": "Original", "link": "a", "content": body},
+            {"title": "Syndicated", "link": "b", "content": "Reposted: " + body + " Share this article."},
+            {"title": "Unrelated", "link": "c", "content": article(8)},
+        ])
+        assert (classify.calls, summarize.calls) == (2, 2)
+        assert docs[1]["summary_json"] == docs[0]["summary_json"]
+
+        # A later result set with another copy is answered from the cache
+        run([{"title": "Mirror", "link": "d", "content": body + " Copyright mirror site."}])
+        assert (classify.calls, summarize.calls) == (2, 2)
+    finally:
+        set_doc_store(None)
+        set_near_dup_index(None)
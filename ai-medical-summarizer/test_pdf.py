@@ -3,6 +3,8 @@
 Test script to verify PDF generation functionality
 """
 
+from pathlib import Path
+
 from utils.pdf_generator import generate_medical_research_pdf
 import json
 
@@ -76,12 +78,12 @@ test_data = {
     ]
 }
 
-def test_pdf_generation():
+def test_pdf_generation(tmp_path):
     """Test the PDF generation with sample data"""
     print("Testing PDF generation...")
     
     # Generate PDF with custom filename
-    filename = "test_diabetes_research_report.pdf"
+    filename = str(tmp_path / "test_diabetes_research_report.pdf")
     success = generate_medical_research_pdf(test_data, filename)
     
     if success:
@@ -94,4 +96,4 @@ def test_pdf_generation():
     return True
 
 if __name__ == "__main__":
-    test_pdf_generation()
+    test_pdf_generation(Path("."))
@@ -0,0 +1,26 @@
+"""
+Tests for background PDF rendering and content-hash deduplication
+"""
+
+import os
+
+from test_pdf import test_data
+import utils.pdf_worker as pdf_worker
+
+
+def test_identical_payloads_render_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_worker.config, "REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf_worker, "_jobs", {})
+
+    job = pdf_worker.submit_pdf(test_data)
+    assert pdf_worker.submit_pdf(dict(test_data)) is job
+
+    path = job.result(timeout=60)
+    assert path is not None and os.path.getsize(path) > 0
+    assert job.status == "done"
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+    # A fresh process (no job registry) reuses the file already on disk
+    monkeypatch.setattr(pdf_worker, "_jobs", {})
+    again = pdf_worker.submit_pdf(test_data)
+    assert again.done() and again.result() == path
@@ -0,0 +1,27 @@
+"""
+Tests for lazy providers and cheap imports of the entry points
+"""
+
+import providers
+from benchmarks.import_time import profile_import
+
+
+def test_provider_built_once_on_first_use(monkeypatch):
+    monkeypatch.setattr(providers, "_factories", {})
+    monkeypatch.setattr(providers, "_instances", {})
+    built = []
+    providers.register("search", lambda: built.append(object()) or built[-1])
+
+    assert built == []
+    first, second = providers.get_search_client(), providers.get_search_client()
+    assert first is second and len(built) == 1
+
+    providers.override("search", "stand-in")
+    assert providers.get_search_client() == "stand-in"
+    providers.reset("search")
+    assert providers.get_search_client() is not first and len(built) == 2
+
+
+def test_entry_points_defer_heavy_imports():
+    for module in ("main_graph", "batch", "api"):
+        assert profile_import(module)["eager_deferred"] == [], module
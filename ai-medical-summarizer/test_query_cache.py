@@ -0,0 +1,136 @@
+"""
+Tests for the in-memory hot layer in front of the query cache
+"""
+
+import time
+
+import pytest
+
+import data.cache_utils as cache_utils
+import data.doc_cache_utils as doc_cache_utils
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+
+PAPER = {"title": "Sorafenib trial", "link": "https://example.org/a", "source": "https://example.org/a",
+         "content": "Sorafenib improved survival", "type": "clinical trial",
+         "summary_json": {"key_findings": ["survival"]}, "citation": "[Sorafenib trial](https://example.org/a)"}
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(doc_cache_utils, "_store", SQLiteStore(db_path))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(db_path, table="queries"))
+    return db_path
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (3, 1, 1, 2)
+
+
+def test_ttl_and_size_limits():
+    cache = TTLCache(max_entries=10, max_bytes=40, ttl=0.05)
+    cache.put("small", "x" * 10)
+    cache.put("big", "x" * 100)
+    assert cache.get("big") is None
+    assert cache.get("small") == "x" * 10
+
+    time.sleep(0.06)
+    assert cache.get("small") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_write_through_and_staleness(stores, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache(max_entries=8))
+
+    cache_utils.store_result_in_cache("Liver Cancer ", {"docs": [], "final_output": {"papers": []}})
+    assert cache_utils.get_cached_result("liver cancer")["final_output"]["papers"] == []
+    assert cache_utils.cache_stats()["hits"] == 1
+
+    # Served from memory even once the stored entry is gone
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(str(tmp_path / "empty.db"), table="queries"))
+    assert cache_utils.get_cached_result("liver cancer") is not None
+
+    monkeypatch.setattr(cache_utils.config, "QUERY_CACHE_MAX_AGE", 60)
+    assert cache_utils.get_cached_result("liver cancer") is not None
+    assert cache_utils.is_stale({"cached_at": time.time() - 120})
+    assert cache_utils.is_stale({})
+
+
+def test_semantic_hit_for_reworded_query(stores, monkeypatch):
+    from data.semantic_cache import HashingEmbedder, SemanticIndex
+
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(cache_utils, "_semantic_index", SemanticIndex(HashingEmbedder()))
+    monkeypatch.setattr(cache_utils.config, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(cache_utils.config, "SEMANTIC_CACHE_THRESHOLD", 0.9)
+
+    cache_utils.store_result_in_cache("latest treatments for liver cancer", {"docs": [PAPER]})
+
+    hit = cache_utils.get_cached_result("What are the latest treatments for liver cancer?")
+    assert hit["final_output"]["papers"][0]["title"] == "Sorafenib trial"
+    assert cache_utils.get_cached_result("latest treatments for lung cancer") is None
+
+
+def test_semantic_index_persists_one_row_per_query(tmp_path):
+    import numpy as np
+    from data.semantic_cache import HashingEmbedder, SemanticIndex
+
+    store = SQLiteStore(str(tmp_path / "cache.db"), table="query_vectors")
+    index = SemanticIndex(HashingEmbedder(), store=store)
+    index.add_many({"a": "liver cancer treatments", "b": "statins and heart disease"})
+    index.add("c", "asthma in children")
+    assert len(store) == 3
+
+    reloaded = SemanticIndex(HashingEmbedder(), store=store)
+    assert reloaded.keys == index.keys
+    assert reloaded.nearest("treatments for liver cancer")[0] == "a"
+
+    legacy = str(tmp_path / "query_vectors.npz")
+    np.savez(legacy, keys=np.array(["a"]), matrix=index.embedder.embed(["x"]), embedder=np.array(index.embedder.name))
+    imported = SemanticIndex(HashingEmbedder(), store=SQLiteStore(str(tmp_path / "cache.db"), table="imported"),
+                             legacy_path=legacy)
+    assert imported.keys == ["a"]
+
+
+def test_entries_reference_doc_records_once(stores, monkeypatch):
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache(max_entries=8))
+    final_output = {"query": "q", "papers": [{"title": PAPER["title"]}]}
+    for query in ("hcc treatment", "sorafenib outcomes"):
+        cache_utils.store_result_in_cache(query, {"docs": [dict(PAPER, raw_content="long page")],
+                                                  "final_output": final_output})
+
+    entry = cache_utils.get_query_store().get(cache_utils.hash_query("hcc treatment"))
+    assert set(entry) == {"query", "docs", "cached_at"}
+    assert "summary_json" not in entry["docs"][0] and "content" not in entry["docs"][0]
+    assert len(doc_cache_utils.get_doc_store()) == 1
+
+    cache_utils._hot_cache.clear()
+    paper = cache_utils.get_cached_result("sorafenib outcomes")["final_output"]["papers"][0]
+    assert paper == {"title": PAPER["title"], "link": PAPER["link"], "type": "clinical trial",
+                     "summary": PAPER["summary_json"], "citation": PAPER["citation"]}
+
+
+def test_migrate_legacy_query_cache(stores, tmp_path):
+    import json
+
+    legacy = tmp_path / "cached_docs.json"
+    legacy.write_text(json.dumps({
+        cache_utils.hash_query("hcc"): {"query": "hcc", "docs": [PAPER], "final_output": {"query": "hcc"}}
+    }))
+    store = SQLiteStore(stores, table="migrated")
+
+    assert cache_utils.migrate_legacy_query_cache(store, str(legacy)) == 1
+    entry = store.get(cache_utils.hash_query("hcc"))
+    records = doc_cache_utils.get_cached_docs([entry["docs"][0]["key"]])
+    assembled = cache_utils.assemble_entry(entry, records)
+    assert assembled["final_output"]["papers"][0]["summary"] == PAPER["summary_json"]
@@ -0,0 +1,112 @@
+"""
+Tests for the shared rate limiter: token buckets, AIMD concurrency and 429 handling
+"""
+
+import time
+import threading
+
+import pytest
+
+from utils.rate_limit import (TokenBucket, AdaptiveConcurrency, RateLimiter, RateLimitedSearchClient,
+                              is_rate_limited, retry_after)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class RateLimitError(Exception):
+    def __init__(self, headers=None):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = FakeResponse(429, headers)
+
+
+def test_detects_rate_limits_and_retry_after():
+    assert is_rate_limited(RateLimitError())
+    assert not is_rate_limited(ValueError("bad request"))
+    assert retry_after(RateLimitError({"retry-after": "2"})) == 2.0
+    assert retry_after(RateLimitError({"retry-after-ms": "250"})) == 0.25
+    assert retry_after(RateLimitError({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
+
+
+def test_token_bucket_paces_past_the_burst():
+    bucket = TokenBucket(per_minute=1200, burst=2)   # 20 per second
+    waits = [bucket.reserve(1) for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.05, abs=0.01)
+    assert waits[3] == pytest.approx(0.10, abs=0.01)
+
+
+def test_aimd_halves_on_throttle_and_grows_back():
+    limit = AdaptiveConcurrency(initial=8, maximum=10, latency_target=1.0)
+    limit.acquire()
+    limit.release(0.1, throttled=True)
+    assert limit.limit == 4
+    limit.acquire()
+    limit.release(2.0)
+    assert limit.limit == pytest.approx(3.6)
+    for _ in range(20):
+        limit.acquire()
+        limit.release(0.1)
+    assert 3.6 < limit.limit <= 10
+
+
+def test_concurrency_limit_caps_calls_in_flight():
+    limiter = RateLimiter("test", rpm=60000, max_concurrency=8, initial_concurrency=2, max_retries=0)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def call():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    threads = [threading.Thread(target=limiter.call, args=(call,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 3   # limit starts at 2 and can only grow by ~1/limit per success
+
+
+def test_429_is_retried_after_retry_after():
+    limiter = RateLimiter("test", rpm=60000, max_concurrency=8, initial_concurrency=8)
+    replies = iter([RateLimitError({"retry-after": "0.2"}), {"results": []}])
+
+    class Backend:
+        def search(self, **kwargs):
+            reply = next(replies)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+
+    start = time.monotonic()
+    assert RateLimitedSearchClient(Backend(), limiter).search(query="q") == {"results": []}
+    assert time.monotonic() - start >= 0.2
+    assert limiter.concurrency.limit < 8
+
+
+def test_other_errors_and_exhausted_retries_propagate():
+    limiter = RateLimiter("test", rpm=60000, max_retries=1)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(bad_request)
+    assert len(calls) == 1
+
+    def always_limited():
+        calls.append(1)
+        raise RateLimitError({"retry-after-ms": "10"})
+
+    with pytest.raises(RateLimitError):
+        limiter.call(always_limited)
+    assert len(calls) == 3
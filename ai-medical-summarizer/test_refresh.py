@@ -0,0 +1,129 @@
+"""
+Tests for incremental refresh of cached queries and the popularity scheduler
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+import pytest
+
+import refresh
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+import data.cache_utils as cache_utils
+import data.doc_cache_utils as doc_cache_utils
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+from data.popularity import PopularityTracker, set_popularity
+
+
+def paper(name: str, body: str = None) -> dict:
+    return {"title": f"Paper {name}", "link": f"https://example.com/{name}",
+            "content": body or f"body of {name}", "source": f"https://example.com/{name}"}
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, fake_llm):
+    db_path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(doc_cache_utils, "_store", SQLiteStore(db_path))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(db_path, table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    tracker = PopularityTracker(SQLiteStore(db_path, table="popularity"), half_life=3600, flush_every=100)
+    set_popularity(tracker)
+
+    results = {"docs": []}
+    monkeypatch.setattr(refresh, "retriever_node", lambda state: {**state, "docs": [dict(d) for d in results["docs"]]})
+    classify = fake_llm("review")
+    summarize = fake_llm({"key_findings": ["x"]})
+    monkeypatch.setattr(classifier, "get_llm", lambda: classify)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: summarize)
+    yield results, summarize, tracker
+    set_popularity(None)
+
+
+def seed(query: str, docs: list, cached_at: float = 0):
+    docs = [{**doc, "type": "review", "summary_json": {"key_findings": [doc["title"]]}} for doc in docs]
+    entry, records = cache_utils.normalize_entry(query, {"docs": docs}, cached_at=cached_at)
+    doc_cache_utils.store_docs(records)
+    cache_utils.get_query_store().put(cache_utils.hash_query(query), entry)
+
+
+def test_refresh_only_analyzes_new_and_changed_docs(pipeline):
+    results, summarize, _ = pipeline
+    seed("liver cancer", [paper("a"), paper("b"), paper("c")])
+    results["docs"] = [paper("a"), paper("b", "revised body of b"), paper("d")]
+
+    report = refresh.refresh_query("Liver Cancer")
+
+    assert (report["new"], report["changed"], report["unchanged"], report["removed"]) == (1, 1, 1, 1)
+    assert summarize.calls == 2
+    assert not any("body of a" in prompt for prompt in summarize.prompts)
+
+    cached = cache_utils.get_cached_result("liver cancer")
+    assert [p["title"] for p in cached["final_output"]["papers"]] == ["Paper a", "Paper b", "Paper d"]
+    assert cached["cached_at"] > 0
+    assert refresh.refresh_query("never cached") is None
+
+
+def test_scheduler_refreshes_popular_due_queries_within_budget(pipeline):
+    results, summarize, tracker = pipeline
+    for query in ("popular", "middling", "rare"):
+        seed(query, [paper(query)])
+    seed("fresh", [paper("fresh")], cached_at=2e10)
+    for query, hits in (("popular", 5), ("fresh", 4), ("middling", 3), ("rare", 1)):
+        for _ in range(hits):
+            tracker.record(cache_utils.hash_query(query))
+    results["docs"] = [paper("new")]
+
+    reports = refresh.RefreshScheduler(budget=2, max_new_docs=10, min_age=60).run_once()
+    assert [r["query"] for r in reports] == ["popular", "middling"]
+
+    # The document budget ends the cycle early
+    results["docs"] = [paper("newer")]
+    reports = refresh.RefreshScheduler(budget=3, max_new_docs=1, min_age=0).run_once()
+    assert len(reports) == 1
+
+
+def test_run_pipeline_runs_fully_when_the_stored_entry_is_gone(monkeypatch):
+    import main_graph
+
+    class FakeGraph:
+        def invoke(self, state):
+            return {"query": state["query"], "docs": [], "final_output": {"query": state["query"], "papers": []}}
+
+    # Hot-layer hit whose stored entry has expired: refresh_query finds nothing to patch
+    monkeypatch.setattr(main_graph, "get_cached_result", lambda query, allow_stale=False: {"query": query, "final_output": {}})
+    monkeypatch.setattr(refresh, "refresh_query", lambda query: None)
+    monkeypatch.setattr(main_graph, "get_compiled", lambda: FakeGraph())
+    stored = []
+    monkeypatch.setattr(main_graph, "store_result_in_cache", lambda query, result: stored.append(query))
+    monkeypatch.setattr(main_graph, "save_json_output", lambda output: None)
+    monkeypatch.setattr(main_graph, "generate_pdf_report", lambda output, **kwargs: None)
+
+    assert main_graph.run_pipeline("liver cancer", refresh=True) == {"query": "liver cancer", "papers": []}
+    assert stored == ["liver cancer"]
+
+
+def test_run_pipeline_refreshes_stale_entries_incrementally(pipeline, monkeypatch):
+    import config
+    import main_graph
+
+    results, summarize, _ = pipeline
+    monkeypatch.setattr(config, "QUERY_CACHE_MAX_AGE", 60)
+    seed("liver cancer", [paper("a"), paper("b")], cached_at=1)
+    assert cache_utils.get_cached_result("liver cancer") is None
+    results["docs"] = [paper("a"), paper("b"), paper("c")]
+
+    def no_graph():
+        raise AssertionError("a refresh of a cached query must not run the full graph")
+
+    monkeypatch.setattr(main_graph, "get_compiled", no_graph)
+    monkeypatch.setattr(main_graph, "save_json_output", lambda output: None)
+    monkeypatch.setattr(main_graph, "generate_pdf_report", lambda output, **kwargs: None)
+
+    output = main_graph.run_pipeline("liver cancer", refresh=True)
+    assert [p["title"] for p in output["papers"]] == ["Paper a", "Paper b", "Paper c"]
+    assert summarize.calls == 1
+    assert cache_utils.get_cached_result("liver cancer") is not None
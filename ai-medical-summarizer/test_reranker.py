@@ -0,0 +1,62 @@
+"""
+Tests for local BM25 reranking of wide-recall search results
+"""
+
+import time
+
+import config
+from agents.reranker import bm25_scores, rerank, reranker_node, recency_scores
+
+
+def doc(title, content, published_date="", type_=None):
+    d = {"title": title, "link": f"https://example.org/{title}", "content": content,
+         "published_date": published_date}
+    if type_:
+        d["type"] = type_
+    return d
+
+
+def test_bm25_prefers_documents_about_the_query():
+    texts = ["sorafenib for hepatocellular carcinoma in cirrhosis",
+             "insulin dosing in type 2 diabetes",
+             "hepatocellular carcinoma screening"]
+    scores = bm25_scores("hepatocellular carcinoma sorafenib", texts)
+    assert scores.argmax() == 0 and scores[1] == 0
+    assert bm25_scores("the of and", texts).tolist() == [0, 0, 0]
+
+
+def test_recency_and_type_break_ties(monkeypatch):
+    monkeypatch.setattr(config, "RERANK_RECENCY_WEIGHT", 0.2)
+    monkeypatch.setattr(config, "RERANK_TYPE_WEIGHT", 0.1)
+    this_year = time.gmtime().tm_year
+    docs = [doc("old", "liver cancer outcomes cohort study", "2001-05-01"),
+            doc("recent", "liver cancer outcomes", f"{this_year}-01-01"),
+            doc("meta", "liver cancer outcomes meta-analysis", "2001-05-01"),
+            doc("unrelated", "knee surgery rehabilitation", f"{this_year}-01-01")]
+    assert recency_scores(docs)[1] == 1.0 and recency_scores([doc("x", "y")])[0] == 0.0
+
+    ranked = rerank("liver cancer outcomes", docs, top_k=3)
+    assert [d["title"] for d in ranked] == ["recent", "meta", "old"]
+
+
+def test_node_is_a_no_op_unless_enabled(monkeypatch):
+    docs = [doc(f"paper {i}", f"liver cancer {'therapy ' * i}") for i in range(10)]
+    state = {"query": "liver cancer therapy", "docs": list(docs)}
+
+    monkeypatch.setattr(config, "RERANK_ENABLED", False)
+    assert reranker_node(dict(state))["docs"] == docs
+
+    monkeypatch.setattr(config, "RERANK_ENABLED", True)
+    monkeypatch.setattr(config, "RERANK_TOP_K", 3)
+    kept = reranker_node(dict(state))["docs"]
+    assert len(kept) == 3 and docs[0] not in kept
+
+
+def test_retriever_asks_for_wide_recall_when_enabled(monkeypatch):
+    from agents import retriever
+
+    monkeypatch.setattr(config, "RERANK_ENABLED", True)
+    monkeypatch.setattr(config, "RERANK_CANDIDATES", 20)
+    assert retriever.search_params()["max_results"] == 20
+    monkeypatch.setattr(config, "RERANK_ENABLED", False)
+    assert retriever.search_params() == retriever.SEARCH_PARAMS
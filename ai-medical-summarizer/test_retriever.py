@@ -0,0 +1,95 @@
+"""
+Tests for the search result cache and the retrying search client
+"""
+
+import os
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+import pytest
+import requests
+from tavily.errors import BadRequestError
+
+import agents.retriever as retriever
+from data.stores import SQLiteStore
+from data.search_cache import set_search_store, search_cache_key, get_cached_search
+from utils.search_client import RetryingSearchClient
+from utils.metrics import MetricsRegistry
+from utils.usage import track_usage
+
+
+class FlakySearch:
+    def __init__(self, failures=0, error=requests.ConnectionError):
+        self.failures = failures
+        self.error = error
+        self.calls = []
+
+    def search(self, query, **params):
+        self.calls.append(params)
+        if len(self.calls) <= self.failures:
+            raise self.error("search backend down")
+        return {"results": [{"title": "t", "url": "https://example.org", "content": "c", "raw_content": "r"}]}
+
+
+def test_retries_transient_failures_with_backoff():
+    backend = FlakySearch(failures=2)
+    sleeps = []
+    client = RetryingSearchClient(backend, max_retries=3, backoff_base=0.1, sleep=sleeps.append)
+
+    assert client.search("hepatitis", max_results=3)["results"]
+    assert len(backend.calls) == 3
+    assert all(0 <= delay <= 0.1 * 2 ** i for i, delay in enumerate(sleeps))
+    assert all("timeout" in call for call in backend.calls)
+
+
+def test_gives_up_on_client_errors_and_after_max_retries():
+    bad_request = FlakySearch(failures=5, error=BadRequestError)
+    with pytest.raises(BadRequestError):
+        RetryingSearchClient(bad_request, sleep=lambda _: None).search("q")
+    assert len(bad_request.calls) == 1
+
+    down = FlakySearch(failures=5)
+    with pytest.raises(requests.ConnectionError):
+        RetryingSearchClient(down, max_retries=2, sleep=lambda _: None).search("q")
+    assert len(down.calls) == 3
+
+
+def test_stops_retrying_at_deadline():
+    down = FlakySearch(failures=5)
+    client = RetryingSearchClient(down, max_retries=10, backoff_base=5, backoff_max=5,
+                                  deadline=0.5, sleep=lambda _: None)
+    client.backoff = lambda attempt: 1.0
+    with pytest.raises(requests.ConnectionError):
+        client.search("q")
+    assert len(down.calls) == 1
+
+
+def test_retriever_node_caches_search_results(tmp_path, monkeypatch):
+    set_search_store(SQLiteStore(str(tmp_path / "cache.db"), table="searches"))
+    backend = FlakySearch()
+    client = RetryingSearchClient(backend)
+    monkeypatch.setattr(retriever, "get_search_client", lambda: client)
+    registry = MetricsRegistry()
+    monkeypatch.setattr(retriever, "REGISTRY", registry)
+
+    try:
+        with track_usage() as meter:
+            first = retriever.retriever_node({"query": "Liver cancer  treatments"})
+            second = retriever.retriever_node({"query": "liver cancer treatments"})
+
+        assert len(backend.calls) == 1
+        metrics = registry.to_prometheus()
+        assert 'search_cache_lookups_total{result="hit"} 1' in metrics
+        assert 'search_cache_lookups_total{result="miss"} 1' in metrics
+        # Search lookups stay out of the doc cache hit rate
+        assert (meter.cache_hits, meter.cache_misses) == (0, 0)
+        assert first["docs"] == second["docs"]
+        assert first["docs"][0]["raw_content"] == "r"
+
+        key = search_cache_key("liver cancer treatments", **retriever.SEARCH_PARAMS)
+        assert get_cached_search(key, ttl=3600) is not None
+        monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+        assert get_cached_search(key, ttl=3600) is None
+    finally:
+        set_search_store(None)
@@ -0,0 +1,135 @@
+"""
+Tests for multi-source retrieval against local HTTP stand-ins for Europe PMC and PubMed
+"""
+
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from utils.sources import EuropePMCSource, PubMedSource
+from utils.search_client import FanOutSearchClient, reciprocal_rank_fusion
+
+EUROPE_PMC = {"resultList": {"result": [
+    {"id": "111", "source": "MED", "title": "Sorafenib in <i>HCC</i>", "abstractText": "Sorafenib improved survival.",
+     "firstPublicationDate": "2021-03-01", "doi": "10.1000/SORA"},
+    {"id": "222", "source": "MED", "title": "Lenvatinib review", "abstractText": "A review.", "pubYear": "2019"},
+]}}
+
+PUBMED_XML = """<?xml version="1.0"?>
+<PubmedArticleSet>
+  <PubmedArticle><MedlineCitation><PMID>333</PMID><Article>
+    <Journal><JournalIssue><PubDate><Year>2023</Year></PubDate></JournalIssue></Journal>
+    <ArticleTitle>Atezolizumab plus bevacizumab</ArticleTitle>
+    <Abstract><AbstractText Label="BACKGROUND">Background.</AbstractText><AbstractText>Results <b>improved</b>.</AbstractText></Abstract>
+  </Article></MedlineCitation>
+  <PubmedData><ArticleIdList><ArticleId IdType="pubmed">333</ArticleId></ArticleIdList></PubmedData></PubmedArticle>
+  <PubmedArticle><MedlineCitation><PMID>111</PMID><Article>
+    <Journal><JournalIssue><PubDate><Year>2021</Year></PubDate></JournalIssue></Journal>
+    <ArticleTitle>Sorafenib in HCC</ArticleTitle>
+    <Abstract><AbstractText>Sorafenib improved overall survival in a phase 3 trial.</AbstractText></Abstract>
+  </Article></MedlineCitation>
+  <PubmedData><ArticleIdList><ArticleId IdType="doi">10.1000/sora</ArticleId></ArticleIdList></PubmedData></PubmedArticle>
+</PubmedArticleSet>"""
+
+
+class StandIn(BaseHTTPRequestHandler):
+    delays = {}     # path prefix -> list of delays, one consumed per request
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        StandIn.requests.append(url.path)
+        for prefix, delays in StandIn.delays.items():
+            if url.path.startswith(prefix) and delays:
+                time.sleep(delays.pop(0))
+        if url.path == "/europepmc/search":
+            body, kind = json.dumps(EUROPE_PMC), "application/json"
+        elif url.path == "/pubmed/esearch.fcgi":
+            assert parse_qs(url.query)["db"] == ["pubmed"]
+            body, kind = json.dumps({"esearchresult": {"idlist": ["111", "333"]}}), "application/json"
+        elif url.path == "/pubmed/efetch.fcgi":
+            body, kind = PUBMED_XML, "text/xml"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.end_headers()
+        try:
+            self.wfile.write(body.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on a deliberately slow reply
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandIn.delays, StandIn.requests = {}, []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_adapters_parse_responses(server):
+    europe = EuropePMCSource(f"{server}/europepmc").search(query="hcc", max_results=2)["results"]
+    assert europe[0]["title"] == "Sorafenib in HCC"
+    assert europe[0]["url"] == "https://europepmc.org/article/MED/111"
+    assert europe[1]["published_date"] == "2019" and europe[1]["doi"] is None
+
+    pubmed = PubMedSource(f"{server}/pubmed").search(query="hcc", max_results=2)["results"]
+    assert [r["url"] for r in pubmed] == ["https://pubmed.ncbi.nlm.nih.gov/111/", "https://pubmed.ncbi.nlm.nih.gov/333/"]
+    assert pubmed[1]["content"] == "Background. Results improved."
+    assert pubmed[0]["doi"] == "10.1000/sora" and pubmed[1]["published_date"] == "2023"
+
+
+def test_rrf_merges_duplicates_by_doi_and_url():
+    fused = reciprocal_rank_fusion({
+        "a": [{"url": "https://www.example.org/x/", "content": "short"}, {"url": "https://b.org/1", "doi": "10.1/A"}],
+        "b": [{"url": "https://c.org/2", "doi": "10.1/a"}, {"url": "http://example.org/x", "content": "much longer"}],
+    }, k=60)
+    # Equal scores keep first-seen order; merged results keep the first source's URL
+    assert [r["url"] for r in fused] == ["https://www.example.org/x/", "https://b.org/1"]
+    assert fused[0]["content"] == "much longer"
+    assert fused[0]["score"] == fused[1]["score"] == pytest.approx(1 / 61 + 1 / 62, abs=1e-6)
+
+
+def test_fan_out_returns_partial_results_when_a_source_misses_its_deadline(server):
+    StandIn.delays = {"/pubmed": [2.0, 2.0]}
+    client = FanOutSearchClient({"europepmc": EuropePMCSource(f"{server}/europepmc"),
+                                 "pubmed": PubMedSource(f"{server}/pubmed")},
+                                deadline=0.5, hedge_after=10)
+    start = time.monotonic()
+    response = client.search(query="hcc", max_results=5)
+    assert time.monotonic() - start < 1.0
+    assert response["partial"] is True
+    assert response["sources"] == {"europepmc": "ok", "pubmed": "timeout"}
+    assert [r["title"] for r in response["results"]] == ["Sorafenib in HCC", "Lenvatinib review"]
+
+
+def test_hedged_request_beats_a_slow_first_attempt(server):
+    StandIn.delays = {"/europepmc": [1.5]}
+    client = FanOutSearchClient({"europepmc": EuropePMCSource(f"{server}/europepmc"),
+                                 "pubmed": PubMedSource(f"{server}/pubmed")},
+                                deadline=3, hedge_after=0.2)
+    start = time.monotonic()
+    response = client.search(query="hcc", max_results=3)
+    assert time.monotonic() - start < 1.0
+    assert response["partial"] is False
+    assert StandIn.requests.count("/europepmc/search") == 2
+    # Sorafenib is found by both sources (same DOI), so it ranks first
+    assert response["results"][0]["title"] == "Sorafenib in HCC"
+    assert len(response["results"]) == 3
+
+
+def test_fan_out_fails_only_when_every_source_fails(server):
+    client = FanOutSearchClient({"missing": EuropePMCSource(f"{server}/nowhere")}, deadline=1, hedge_after=5)
+    with pytest.raises(Exception):
+        client.search(query="hcc")
@@ -0,0 +1,66 @@
+"""
+Tests for the streaming pipeline mode
+"""
+
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+import streaming
+import utils.metrics as metrics
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+import data.cache_utils as cache_utils
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+from data.doc_cache_utils import set_doc_store
+from utils.metrics import MetricsRegistry
+
+
+def fake_retriever(state):
+    state["docs"] = [
+        {"title": f"Paper {i}", "link": f"https://example.com/{i}", "content": f"body {i}", "source": ""}
+        for i in ("slow", "fast-1", "fast-2")
+    ]
+    return state
+
+
+def test_papers_stream_before_the_slowest_finishes(tmp_path, monkeypatch, fake_llm):
+    set_doc_store(SQLiteStore(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(str(tmp_path / "cache.db"), table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    monkeypatch.setattr(streaming, "retriever_node", fake_retriever)
+    classify = fake_llm("review", delay={"body slow": 0.5})
+    summarize = fake_llm({"key_findings": ["x"]})
+    monkeypatch.setattr(classifier, "get_llm", lambda: classify)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: summarize)
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    try:
+        start = time.monotonic()
+        events = []
+        for event in streaming.stream_pipeline("test query"):
+            events.append((time.monotonic() - start, event))
+
+        kinds = [event["event"] for _, event in events]
+        assert kinds == ["start", "paper", "paper", "paper", "done"]
+        first_paper_at, first_paper = events[1]
+        assert first_paper_at < 0.4
+        assert first_paper["paper"]["title"] != "Paper slow"
+        assert events[-2][1]["paper"]["title"] == "Paper slow"
+
+        result = events[-1][1]["result"]
+        assert [p["title"] for p in result["papers"]] == ["Paper slow", "Paper fast-1", "Paper fast-2"]
+        assert cache_utils.get_cached_result("test query")["final_output"] == result
+        # Streamed runs record the same per-node metrics as the graph, once per paper for per-doc nodes
+        text = registry.to_prometheus()
+        assert 'pipeline_node_calls_total{node="summarizer",status="ok"} 3' in text
+        assert 'pipeline_node_calls_total{node="assembler",status="ok"} 1' in text
+
+        replay = list(streaming.stream_pipeline("test query"))
+        assert replay[0]["cached"] is True and len(replay) == 5
+    finally:
+        set_doc_store(None)
@@ -0,0 +1,96 @@
+"""
+Tests for summary schema validation, local JSON repair and not caching failed summaries
+"""
+
+import os
+import json
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import agents.summarizer as summarizer
+import agents.summary_schema as summary_schema
+import data.cache_utils as cache_utils
+import data.doc_cache_utils as doc_cache_utils
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+from utils.metrics import MetricsRegistry
+from utils.json_repair import loads_lenient
+
+
+GOOD = {"key_findings": ["Sorafenib improved survival"], "causes": ["hepatitis B"]}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(doc_cache_utils, "_store", SQLiteStore(db_path))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(db_path, table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    registry = MetricsRegistry()
+    monkeypatch.setattr(summary_schema, "REGISTRY", registry)
+    monkeypatch.setattr(summarizer, "REGISTRY", registry)
+    return registry
+
+
+def run_summarizer(monkeypatch, llm):
+    monkeypatch.setattr(summarizer, "get_llm", lambda: llm)
+    doc = {"title": "Paper", "link": "https://example.org/p", "content": "Sorafenib in HCC", "type": "review"}
+    return summarizer.summarizer_node({"docs": [doc]})["docs"][0]
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ('```json\n{"key_findings": ["a", "b",],}\n```', {"key_findings": ["a", "b"]}),
+    ('Here is the summary: {"key_findings": ["a"]} Let me know!', {"key_findings": ["a"]}),
+    ('{"key_findings": ["a"], "causes": ["trunc', {"key_findings": ["a"], "causes": ["trunc"]}),
+    ('{"key_findings": ["a"], "latest treatments": [{"x": {"year": 20', {"key_findings": ["a"]}),
+])
+def test_repairs_common_breakage(reply, expected):
+    value, status = loads_lenient(reply)
+    assert status == "repaired"
+    assert {k: v for k, v in value.items() if k in expected} == expected
+
+
+def test_schema_requires_findings_and_normalizes_lists():
+    assert summary_schema.validate_summary({"causes": ["x"]}) is None
+    assert summary_schema.validate_summary({"key_findings": []}) is None
+    assert summary_schema.validate_summary({"key_findings": "one finding",
+                                            "common treatment methods": {"surgery": "resection"}}) == {
+        "key_findings": ["one finding"], "common treatment methods": [{"surgery": "resection"}]}
+    # The prompt's own example must be a valid summary
+    example = json.loads(summarizer.SUMMARY_FORMAT.split("\n\n")[0])
+    assert summary_schema.validate_summary(example) is not None
+
+
+def test_repaired_reply_is_cached_without_a_second_call(registry, monkeypatch, fake_llm):
+    llm = fake_llm("```json\n" + json.dumps(GOOD)[:-1] + ",}\n```")
+    doc = run_summarizer(monkeypatch, llm)
+    assert doc["summary_json"] == GOOD and len(llm.prompts) == 1
+    assert doc_cache_utils.get_cached_docs([doc_cache_utils.doc_cache_key(doc)])
+    assert 'llm_json_parse_total{result="repaired",stage="summary"} 1' in registry.to_prometheus()
+
+
+def test_unrepairable_reply_is_re_requested(registry, monkeypatch, fake_llm):
+    llm = fake_llm("I cannot summarize this.", json.dumps(GOOD))
+    doc = run_summarizer(monkeypatch, llm)
+    assert doc["summary_json"] == GOOD and len(llm.prompts) == 2
+    assert summarizer.RETRY_INSTRUCTION in llm.prompts[1]
+    metrics = registry.to_prometheus()
+    assert 'llm_json_parse_total{result="invalid",stage="summary"} 1' in metrics
+    assert 'llm_json_retries_total{stage="summary"} 1' in metrics
+
+
+def test_failed_summary_is_shown_but_never_cached(registry, monkeypatch, fake_llm):
+    llm = fake_llm("no json", '{"causes": ["no findings"]}')
+    doc = run_summarizer(monkeypatch, llm)
+    assert doc["summary_failed"] is True and doc["summary_json"]["raw"] == '{"causes": ["no findings"]}'
+    assert doc_cache_utils.get_cached_docs([doc_cache_utils.doc_cache_key(doc)]) == {}
+
+    cache_utils.store_result_in_cache("liver cancer", {"docs": [doc], "final_output": {"papers": []}})
+    assert cache_utils.get_cached_result("liver cancer") is None
+
+    # A fallback already in an older cache is treated as a miss and recomputed
+    doc_cache_utils.store_docs({doc_cache_utils.doc_cache_key(doc): {"summary_json": {"raw": "x"}}})
+    llm = fake_llm(json.dumps(GOOD))
+    assert run_summarizer(monkeypatch, llm)["summary_json"] == GOOD
@@ -0,0 +1,148 @@
+"""
+Tests for version-tagged doc records and the selective recompute tool
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+
+import pytest
+
+import config
+import recompute
+import agents.classifier as classifier
+import agents.summarizer as summarizer
+import agents.analyzer as analyzer
+import data.cache_utils as cache_utils
+import data.doc_cache_utils as doc_cache_utils
+from agents.versions import _producer_fingerprint, current_version, version_accepted, outdated_fields, LEGACY_VERSION
+from data.stores import SQLiteStore
+from data.memory_cache import TTLCache
+from data.popularity import PopularityTracker, set_popularity
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch, fake_llm):
+    db_path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(doc_cache_utils, "_store", SQLiteStore(db_path))
+    monkeypatch.setattr(cache_utils, "_query_store", SQLiteStore(db_path, table="queries"))
+    monkeypatch.setattr(cache_utils, "_hot_cache", TTLCache())
+    monkeypatch.setattr(config, "FUSED_ANALYSIS", False)
+    monkeypatch.setattr(config, "LOCAL_CLASSIFIER_ENABLED", False)
+    tracker = PopularityTracker(SQLiteStore(db_path, table="popularity"), half_life=3600, flush_every=100)
+    set_popularity(tracker)
+
+    classify = fake_llm("review", prompt_tokens=1000)
+    summarize = fake_llm({"key_findings": ["new"]}, prompt_tokens=1000)
+    monkeypatch.setattr(classifier, "get_llm", lambda: classify)
+    monkeypatch.setattr(summarizer, "get_llm", lambda: summarize)
+    yield classify, summarize, tracker
+    set_popularity(None)
+
+
+def legacy_record(name: str, computed_at: float = None) -> dict:
+    record = {"type": "old label", "summary_json": {"key_findings": [f"old {name}"]}, "content": f"body of {name}"}
+    if computed_at is not None:
+        record["computed_at"] = computed_at
+    return record
+
+
+def test_fingerprint_follows_model_and_prompt(monkeypatch):
+    before = current_version("summarizer")
+    monkeypatch.setattr(config, "LLM_MODEL", "another-model")
+    assert current_version("summarizer") != before
+    monkeypatch.undo()
+    monkeypatch.setattr(summarizer, "SUMMARY_PROMPT", summarizer.SUMMARY_PROMPT + "Be brief.\n")
+    _producer_fingerprint.cache_clear()
+    try:
+        assert current_version("summarizer") != before
+    finally:
+        monkeypatch.undo()
+        _producer_fingerprint.cache_clear()
+    assert current_version("summarizer") == before
+
+
+def test_fused_mode_does_not_outdate_records(monkeypatch):
+    record = {"type": "review", "summary_json": {"key_findings": ["x"]},
+              "versions": {"type": current_version("classifier"), "summary_json": current_version("summarizer")}}
+    monkeypatch.setattr(config, "CACHE_ACCEPT_VERSIONS", [])
+    for fused in (False, True):
+        monkeypatch.setattr(config, "FUSED_ANALYSIS", fused)
+        assert not outdated_fields(record)
+        assert version_accepted(record, "type") and version_accepted(record, "summary_json")
+    assert not outdated_fields({"type": "review", "versions": {"type": current_version("analyzer")}})
+    # Each producer has its own prompts, so their fingerprints differ
+    assert len({current_version(p) for p in ("classifier", "summarizer", "analyzer")}) == 3
+
+
+def test_analyzer_rejects_outdated_types(stores, monkeypatch, fake_llm):
+    doc = {"title": "t", "link": "l", "content": "body of a"}
+    key = doc_cache_utils.hash_doc_content(doc)
+    record = legacy_record("a")
+    record["versions"] = {"summary_json": current_version("summarizer")}
+    doc_cache_utils.store_docs({key: record})
+    monkeypatch.setattr(config, "CACHE_ACCEPT_VERSIONS", [])
+    analyze = fake_llm({"document_type": "review", "summary": {"key_findings": ["new"]}})
+    monkeypatch.setattr(analyzer, "get_json_llm", lambda: analyze)
+
+    state = analyzer.analyzer_node({"docs": [dict(doc)]})
+
+    assert analyze.calls == 1
+    assert state["docs"][0]["type"] == "review"
+    assert doc_cache_utils.get_cached_doc(key)["versions"]["type"] == current_version("analyzer")
+
+
+def test_accept_policy(monkeypatch):
+    record = legacy_record("a")
+    assert version_accepted(record, "summary_json")
+    monkeypatch.setattr(config, "CACHE_ACCEPT_VERSIONS", [])
+    assert not version_accepted(record, "summary_json")
+    monkeypatch.setattr(config, "CACHE_ACCEPT_VERSIONS", [LEGACY_VERSION])
+    assert version_accepted(record, "summary_json")
+    assert version_accepted({"versions": {"summary_json": current_version("summarizer")}}, "summary_json")
+
+
+def test_rejected_versions_are_recomputed_and_tagged(stores, monkeypatch):
+    _, summarize, _ = stores
+    doc = {"title": "t", "link": "l", "content": "body of a"}
+    key = doc_cache_utils.hash_doc_content(doc)
+    doc_cache_utils.store_docs({key: legacy_record("a")})
+
+    state = summarizer.summarizer_node({"docs": [dict(doc, type="review")]})
+    assert not summarize.calls
+    assert state["docs"][0]["summary_json"] == {"key_findings": ["old a"]}
+
+    monkeypatch.setattr(config, "CACHE_ACCEPT_VERSIONS", [])
+    state = summarizer.summarizer_node({"docs": [dict(doc, type="review")]})
+    assert summarize.calls == 1
+    assert state["docs"][0]["summary_json"] == {"key_findings": ["new"]}
+
+    record = doc_cache_utils.get_cached_doc(key)
+    assert record["versions"] == {"summary_json": current_version("summarizer")}
+    assert record["content"] == "body of a"  # fields the summarizer does not write are kept
+    assert outdated_fields(record) == ["type"]
+
+
+def test_recompute_upgrades_most_popular_first_within_budget(stores):
+    classify, summarize, tracker = stores
+    records = {name: legacy_record(name, computed_at=i) for i, name in enumerate("abc")}
+    doc_cache_utils.store_docs(records)
+    cache_utils.get_query_store().put("q", {"query": "q", "docs": [{"key": "c"}]})
+    tracker.record("q")
+
+    assert recompute.order_records(recompute.outdated_records(), "popular") == ["c", "a", "b"]
+    assert recompute.order_records(recompute.outdated_records(), "oldest") == ["a", "b", "c"]
+    assert recompute.recompute(token_budget=1500, dry_run=True)["outdated"] == 3
+    assert not summarize.calls
+
+    report = recompute.recompute(order="popular", token_budget=1500)
+
+    assert (report["recomputed"], report["remaining"], report["tokens"]) == (1, 2, 2000)
+    upgraded = doc_cache_utils.get_cached_doc("c")
+    assert upgraded["type"] == "review"
+    assert upgraded["summary_json"] == {"key_findings": ["new"]}
+    assert upgraded["content"] == "body of c"
+    assert not outdated_fields(upgraded)
+    assert doc_cache_utils.get_cached_doc("a")["summary_json"] == {"key_findings": ["old a"]}
+    assert set(recompute.outdated_records()) == {"a", "b"}
@@ -0,0 +1,107 @@
+import time
+import threading
+
+import config
+from utils.usage import UsageMeter
+from utils.metrics import REGISTRY
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Budget:
+    """
+    Time and token allowance for one request, carried in the graph state as
+    state["budget"], plus the degradations nodes applied to stay within it.
+
+    Tokens are counted by `meter`; run the request inside
+    track_usage(budget.meter) so every LLM call reports to it.
+    """
+
+    def __init__(self, deadline: float = None, max_tokens: int = None):
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.max_tokens = max_tokens or None
+        self.meter = UsageMeter()
+        self.degradations = []
+        self._lock = threading.Lock()
+
+    def remaining_time(self):
+        """Seconds left before the deadline, or None without one."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def remaining_tokens(self):
+        """Tokens left to spend, or None without a token budget."""
+        return None if self.max_tokens is None else self.max_tokens - self.meter.total_tokens
+
+    def call_timeout(self) -> float:
+        """Per-call LLM timeout: LLM_TIMEOUT, cut short by the deadline."""
+        remaining = self.remaining_time()
+        return config.LLM_TIMEOUT if remaining is None else max(0.1, min(config.LLM_TIMEOUT, remaining))
+
+    def degrade(self, kind: str, detail: str = ""):
+        with self._lock:
+            if any(d["kind"] == kind for d in self.degradations):
+                return
+            self.degradations.append({"kind": kind, "detail": detail})
+        REGISTRY.inc("degradations_total", kind=kind)
+        logger.warning(f"[Budget] Degrading: {kind} {detail}".rstrip())
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.degradations)
+
+    def annotate(self, final_output: dict) -> dict:
+        """Copy of final_output that reports the degradations applied."""
+        return {**final_output, "degradations": list(self.degradations)}
+
+
+def failure_degradation(error: Exception) -> tuple:
+    """(kind, detail) to record for an LLM call that failed under a budget."""
+    if isinstance(error, TimeoutError):
+        return "deadline_exceeded", "some documents were not analyzed in time"
+    return "failed_documents", f"some documents failed: {error!r}"
+
+
+def estimate_call_tokens(doc: dict, window: int, prompt_chars: int) -> int:
+    # ~4 characters per token for the document window and the prompt around it
+    return (min(len(doc.get("content", "")), window) + prompt_chars) // 4 + config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+def plan_llm_work(budget, docs: list, window: int, prompt_chars: int) -> tuple:
+    """
+    Decide how much LLM work on `docs` fits in the budget.
+
+    Returns (docs to send, document window in characters). The window drops
+    to BUDGET_SHORT_WINDOW when the full one does not fit; then docs are cut,
+    in order, to what the remaining tokens and time allow. Every cut is
+    recorded on the budget.
+    """
+    if budget is None or not docs:
+        return docs, window
+
+    time_left, tokens_left = budget.remaining_time(), budget.remaining_tokens()
+    if time_left is not None and time_left <= 0:
+        budget.degrade("deadline_exceeded", f"{len(docs)} documents not analyzed")
+        return [], window
+
+    full_cost = sum(estimate_call_tokens(doc, window, prompt_chars) for doc in docs)
+    if ((time_left is not None and time_left < config.BUDGET_LLM_SECONDS)
+            or (tokens_left is not None and full_cost > tokens_left)) and window > config.BUDGET_SHORT_WINDOW:
+        window = config.BUDGET_SHORT_WINDOW
+        budget.degrade("short_prompts", f"documents cut to {window} characters")
+
+    limit = len(docs)
+    if time_left is not None:
+        waves = max(1, int(time_left // config.BUDGET_LLM_SECONDS))
+        limit = min(limit, waves * config.LLM_MAX_CONCURRENCY)
+    selected, spent = [], 0
+    for doc in docs[:limit]:
+        cost = estimate_call_tokens(doc, window, prompt_chars)
+        if tokens_left is not None and spent + cost > tokens_left:
+            break
+        selected.append(doc)
+        spent += cost
+
+    if len(selected) < len(docs):
+        budget.degrade("fewer_documents", f"{len(selected)} of {len(docs)} documents analyzed")
+    return selected, window
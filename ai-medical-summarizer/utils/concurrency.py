@@ -0,0 +1,96 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+# How often to re-check a call that is still queued behind the concurrency limit
+_QUEUED_POLL = 0.05
+
+# Monotonic time at which the bounded_map call running in this context times out
+_call_deadline = contextvars.ContextVar("call_deadline", default=None)
+
+
+def call_time_left():
+    """Seconds before the enclosing bounded_map call times out, or None when it has no timeout."""
+    deadline = _call_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _result_within(future, started_at, timeout):
+    while True:
+        start = started_at()
+        if start is None:
+            wait = min(timeout, _QUEUED_POLL)
+        else:
+            wait = max(start + timeout - time.monotonic(), 0)
+        try:
+            return future.result(timeout=wait)
+        except FuturesTimeout:
+            if start is not None:
+                raise TimeoutError(f"Call exceeded {timeout}s timeout")
+
+
+def bounded_map(fn, items, max_workers: int = None, timeout: float = None,
+                return_exceptions: bool = False) -> list:
+    """
+    Apply `fn` to every item on a bounded thread pool.
+
+    Args:
+        fn: Function to call once per item
+        items: Inputs; results come back in the same order
+        max_workers: Max calls in flight (defaults to LLM_MAX_CONCURRENCY)
+        timeout: Max seconds a single call may run once started, or None
+        return_exceptions: Put a failed or timed-out call's exception in its
+            result slot instead of raising
+
+    Returns:
+        list: Results in input order. Unless return_exceptions is set, the
+        first failed or timed-out call raises, and calls that have not
+        started yet are cancelled.
+
+    Each call runs in a copy of the caller's context, so usage meters and
+    other context variables follow the work onto the pool threads. With a
+    timeout, `call_time_left` tells the call how long it has, so clients can
+    end their requests instead of leaving them running on the pool.
+    """
+    items = list(items)
+    max_workers = max_workers or config.LLM_MAX_CONCURRENCY
+    if not items:
+        return []
+    if max_workers <= 1 and timeout is None and not return_exceptions:
+        return [fn(item) for item in items]
+
+    started = [None] * len(items)
+
+    def run(index, item):
+        started[index] = time.monotonic()
+        if timeout is not None:
+            outer = _call_deadline.get()
+            deadline = started[index] + timeout
+            _call_deadline.set(deadline if outer is None else min(outer, deadline))
+        return fn(item)
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = [
+            pool.submit(contextvars.copy_context().run, run, i, item)
+            for i, item in enumerate(items)
+        ]
+        results = []
+        for i, future in enumerate(futures):
+            try:
+                if timeout is None:
+                    results.append(future.result())
+                else:
+                    results.append(_result_within(future, lambda i=i: started[i], timeout))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,88 @@
+import re
+import json
+
+import logging
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.S)
+
+
+def _scan(text: str) -> tuple:
+    """
+    Walk one JSON value outside of string literals, dropping trailing commas.
+
+    Returns (text up to the end of the top-level value, whether it ended
+    inside a string, the closers still open, and [(cut position, closers
+    open there)] for every comma, the places a truncated value can be cut
+    back to).
+    """
+    out, stack, cuts = [], [], []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(ch)
+            if stack:
+                stack.pop()
+            if not stack:
+                # Ignore any commentary after the JSON value
+                return "".join(out), False, [], cuts
+            continue
+        if ch == ",":
+            cuts.append((len(out), list(stack)))
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        out.append(ch)
+    return "".join(out), in_string, stack, cuts
+
+
+def repair_json(text: str):
+    """
+    Parse almost-JSON LLM output: markdown fences, prose around the object,
+    trailing commas and truncated replies are handled. Returns the value, or
+    None if nothing sensible can be recovered.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    scanned, in_string, stack, cuts = _scan(text[min(starts):])
+
+    closed = scanned.rstrip()
+    if in_string:
+        closed = (closed[:-1] if closed.endswith("\\") else closed) + '"'
+    candidates = [closed + "".join(reversed(stack))]
+    # Truncated mid-entry: cut back to an earlier comma, latest first
+    candidates += [scanned[:cut] + "".join(reversed(open_)) for cut, open_ in reversed(cuts[-50:])]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def loads_lenient(text: str) -> tuple:
+    """(value, status): status is "valid", "repaired" or "invalid" (value None)."""
+    try:
+        return json.loads(text), "valid"
+    except (json.JSONDecodeError, TypeError):
+        pass
+    value = repair_json(text or "")
+    return (value, "repaired") if value is not None else (None, "invalid")
@@ -0,0 +1,158 @@
+import json
+import time
+import bisect
+import functools
+import threading
+
+from utils.usage import track_usage
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Structured sink: one JSON object per line (see logging_config.setup_logging)
+metrics_logger = logging.getLogger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by interpolating within buckets, as histogram_quantile does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(labels, extra=None) -> str:
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters and histograms with a Prometheus text export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            series.setdefault(key, Histogram()).observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def summary(self) -> dict:
+        """{name{labels}: {count, sum, p50, p95, p99}} for every histogram series."""
+        result = {}
+        with self._lock:
+            for name, series in self._histograms.items():
+                for labels, histogram in series.items():
+                    result[f"{name}{_format_labels(labels)}"] = {
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "p50": round(histogram.quantile(0.5), 6),
+                        "p95": round(histogram.quantile(0.95), 6),
+                        "p99": round(histogram.quantile(0.99), 6)
+                    }
+        return result
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, {'le': bound})} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def emit(event: str, **fields):
+    """Write one structured metrics record to the JSON log sink."""
+    metrics_logger.info(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}))
+
+
+def instrument_node(name: str, node):
+    """
+    Wrap a graph node so every call records its wall time, LLM calls and
+    tokens, doc cache hits/misses and document counts to REGISTRY and the
+    JSON log sink.
+    """
+    @functools.wraps(node)
+    def wrapper(state: dict):
+        docs_in = len(state.get("docs") or [])
+        status = "error"
+        docs_out = 0
+        start = time.perf_counter()
+        with track_usage() as meter:
+            try:
+                result = node(state)
+                docs_out = len(result.get("docs") or [])
+                status = "ok"
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                usage = meter.snapshot()
+                REGISTRY.observe("pipeline_node_duration_seconds", elapsed, node=name)
+                REGISTRY.inc("pipeline_node_calls_total", node=name, status=status)
+                REGISTRY.inc("pipeline_llm_calls_total", usage["llm_calls"], node=name)
+                REGISTRY.inc("pipeline_llm_tokens_total", usage["prompt_tokens"], node=name, kind="prompt")
+                REGISTRY.inc("pipeline_llm_tokens_total", usage["completion_tokens"], node=name, kind="completion")
+                REGISTRY.inc("pipeline_cache_lookups_total", usage["cache_hits"], node=name, result="hit")
+                REGISTRY.inc("pipeline_cache_lookups_total", usage["cache_misses"], node=name, result="miss")
+                REGISTRY.inc("pipeline_documents_total", docs_out, node=name)
+                emit("node", node=name, status=status, duration_ms=round(elapsed * 1000, 2),
+                     docs_in=docs_in, docs_out=docs_out, **usage)
+
+    return wrapper
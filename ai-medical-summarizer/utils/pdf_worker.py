@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import config
+from utils.metrics import REGISTRY, emit
+
+import logging
+logger = logging.getLogger(__name__)
+
+_pool = None
+_jobs = {}
+# Finished jobs are forgotten past this many; their files still dedupe renders
+_MAX_JOBS = 1024
+_lock = threading.Lock()
+
+
+class PDFJob:
+    """Handle for a PDF render running in the background worker pool."""
+
+    def __init__(self, job_id: str, path: str, future: Future):
+        self.id = job_id
+        self.path = path
+        self.future = future
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float = None):
+        """Wait for the render and return the PDF path, or None if it failed."""
+        try:
+            rendered = self.future.result(timeout=timeout)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating PDF {self.path}: {str(e)}")
+            return None
+        return self.path if rendered else None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "pending"
+        if self.future.exception() is not None or not self.future.result():
+            return "failed"
+        return "done"
+
+
+def content_hash(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def report_path(data: dict, job_id: str) -> str:
+    query = data.get('query', 'medical_research')
+    safe_query = "".join(c for c in query if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    safe_query = safe_query.replace(' ', '_')[:50]  # Limit length
+    return os.path.join(config.REPORT_DIR, f"medical_research_{safe_query}_{job_id[:12]}.pdf")
+
+
+def _render(data: dict, path: str) -> bool:
+    # Runs in a worker process; ReportLab is only ever imported there
+    from utils.pdf_generator import generate_medical_research_pdf
+    tmp_path = f"{path}.partial"
+    if not generate_medical_research_pdf(data, tmp_path):
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def _record_render(start: float):
+    def record(future: Future):
+        # Includes time spent queued behind other renders
+        elapsed = time.perf_counter() - start
+        status = "ok" if not future.cancelled() and future.exception() is None and future.result() else "error"
+        REGISTRY.observe("pdf_render_duration_seconds", elapsed)
+        REGISTRY.inc("pdf_renders_total", status=status)
+        emit("pdf_render", status=status, duration_ms=round(elapsed * 1000, 2))
+    return record
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=config.PDF_WORKERS)
+    return _pool
+
+
+def submit_pdf(data: dict) -> PDFJob:
+    """
+    Queue a PDF render of `data` (a final_output dict) and return its job.
+
+    Jobs are keyed by a hash of the content: a payload that is already being
+    rendered, or whose PDF already exists on disk, reuses that job or file
+    instead of rendering again.
+    """
+    job_id = content_hash(data)
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None and job.status != "failed":
+            return job
+        if len(_jobs) >= _MAX_JOBS:
+            for finished in [key for key, old in _jobs.items() if old.done()]:
+                del _jobs[finished]
+
+        path = report_path(data, job_id)
+        if os.path.exists(path):
+            future = Future()
+            future.set_result(True)
+        else:
+            os.makedirs(config.REPORT_DIR, exist_ok=True)
+            future = _get_pool().submit(_render, data, path)
+            future.add_done_callback(_record_render(time.perf_counter()))
+        job = PDFJob(job_id, path, future)
+        _jobs[job_id] = job
+        return job
+
+
+def get_job(job_id: str):
+    return _jobs.get(job_id)
+
+
+def shutdown(wait: bool = True):
+    """Stop the worker pool, by default letting queued renders finish."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=wait)
+        _pool = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,207 @@
+import time
+import random
+import threading
+
+import config
+from utils.metrics import REGISTRY
+from utils.concurrency import call_time_left
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for HTTP 429s from the OpenAI SDK, requests or Tavily's usage-limit error."""
+    if getattr(error, "status_code", None) == 429 or type(error).__name__ in ("RateLimitError", "UsageLimitExceededError"):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+def retry_after(error: Exception):
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms headers), or None."""
+    seconds = getattr(error, "retry_after_seconds", None)
+    if seconds is not None:
+        return float(seconds)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # HTTP-date form; fall back to our own backoff
+        pass
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `per_minute` tokens per minute, holding at most `burst`.
+
+    `reserve` debits immediately and returns how long the caller must wait,
+    so concurrent callers queue up in order instead of all polling.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount: float):
+        """Debit (or, if negative, refund) tokens after the fact, e.g. actual vs. estimated usage."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on calls in flight: +1 per limit's worth of fast successes,
+    halved on a rate-limit response, and trimmed when latency exceeds target.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64,
+                 backoff: float = 0.5, latency_target: float = None):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, throttled: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            elif self.latency_target and latency > self.latency_target:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    """
+    Shared gate for one external service: requests/minute and tokens/minute
+    buckets, an adaptive concurrency limit, and retries of 429 responses.
+
+    A 429 pauses every caller of the service for the server's Retry-After
+    (or a jittered backoff), so one rejection does not turn into a storm.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float = None, max_concurrency: int = 16,
+                 initial_concurrency: int = None, latency_target: float = None, max_retries: int = None):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrency(initial_concurrency or max(1, max_concurrency // 4),
+                                               maximum=max_concurrency, latency_target=latency_target)
+        self.max_retries = config.RATE_LIMIT_MAX_RETRIES if max_retries is None else max_retries
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_for_quota(self, tokens: float):
+        wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            REGISTRY.observe("rate_limit_wait_seconds", wait, service=self.name)
+            time.sleep(wait)
+
+    def call(self, fn, tokens: float = 0):
+        """Run fn() within the service's limits, retrying rate-limited attempts."""
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_quota(tokens)
+            self.concurrency.acquire()
+            start = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_rate_limited(e)
+                self.concurrency.release(time.monotonic() - start, throttled=throttled)
+                if not throttled:
+                    raise
+                REGISTRY.inc("rate_limited_total", service=self.name)
+                if attempt == self.max_retries:
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(60.0, 2.0 ** attempt))
+                logger.warning(f"[RateLimit] {self.name} returned 429; pausing {delay:.2f}s "
+                               f"(concurrency limit now {int(self.concurrency.limit)})")
+                self._pause(delay)
+                continue
+            self.concurrency.release(time.monotonic() - start)
+            return result
+
+
+def estimate_tokens(messages) -> int:
+    # ~4 characters per token for the prompt, plus the expected completion
+    return sum(len(message.content) for message in messages) // 4 + config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+class RateLimitedChatModel:
+    """Chat model wrapper that sends every call through a RateLimiter."""
+
+    def __init__(self, llm, limiter: RateLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    def __call__(self, messages, **kwargs):
+        estimate = estimate_tokens(messages)
+        response = self.limiter.call(lambda: self.llm(messages, **self._timeout(kwargs)), tokens=estimate)
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        if self.limiter.tokens is not None and usage.get("total_tokens"):
+            # Settle the estimate against what the call really used
+            self.limiter.tokens.adjust(usage["total_tokens"] - estimate)
+        return response
+
+    invoke = __call__
+
+    @staticmethod
+    def _timeout(kwargs: dict) -> dict:
+        # Ends the HTTP request when the bounded_map call it runs in gives up on it
+        time_left = call_time_left()
+        if time_left is None or "timeout" in kwargs:
+            return kwargs
+        if time_left <= 0:
+            raise TimeoutError("No time left for the LLM call")
+        return {**kwargs, "timeout": min(time_left, config.LLM_TIMEOUT)}
+
+
+class RateLimitedSearchClient:
+    """Search client wrapper that sends every search through a RateLimiter."""
+
+    def __init__(self, client, limiter: RateLimiter):
+        self.client = client
+        self.limiter = limiter
+
+    def search(self, **kwargs) -> dict:
+        return self.limiter.call(lambda: self.client.search(**kwargs))
@@ -0,0 +1,192 @@
+import time
+import random
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from utils.metrics import REGISTRY
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def make_session(pool_size: int = None) -> requests.Session:
+    """HTTP session whose keep-alive connection pool is sized for concurrent searches."""
+    pool_size = pool_size or config.SEARCH_POOL_SIZE
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Timeouts, dropped connections and 5xx responses are worth another try.
+
+    Rate limits (429) are not: the shared RateLimiter underneath already
+    retried them, honouring Retry-After, before giving up.
+    """
+    from tavily.errors import TimeoutError as TavilyTimeout
+
+    if isinstance(error, (TavilyTimeout, TimeoutError,
+                          requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+
+class RetryingSearchClient:
+    """
+    Wraps a search client with bounded retries, full-jitter exponential backoff
+    and an overall deadline per call.
+
+    Each attempt gets `timeout` seconds, capped by whatever is left of the
+    deadline; no retry is started that could not finish before it.
+    """
+
+    def __init__(self, client, max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None, timeout: float = None, deadline: float = None,
+                 sleep=time.sleep):
+        self.client = client
+        self.max_retries = config.SEARCH_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = config.SEARCH_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = config.SEARCH_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.timeout = timeout or config.SEARCH_TIMEOUT
+        self.deadline = deadline or config.SEARCH_DEADLINE
+        self.sleep = sleep
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def search(self, query: str, **params) -> dict:
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            try:
+                return self.client.search(query=query, timeout=max(min(self.timeout, remaining), 1), **params)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay >= give_up_at:
+                    logger.warning(f"[Search] Deadline reached after {attempt + 1} attempts")
+                    raise
+                attempt += 1
+                logger.warning(f"[Search] Attempt {attempt} failed ({e!r}); retrying in {delay:.2f}s")
+                self.sleep(delay)
+
+
+def canonical_url(url: str) -> str:
+    """URL key for deduplication: no scheme, 'www.', fragment or trailing slash; host lower-cased."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+def result_key(item: dict) -> str:
+    # The same paper from PubMed and Europe PMC has different URLs but one DOI
+    doi = item.get("doi")
+    return f"doi:{doi.lower()}" if doi else canonical_url(item["url"])
+
+def reciprocal_rank_fusion(rankings: dict, k: int = 60) -> list:
+    """
+    Merge {source: ranked results} into one list ordered by RRF score,
+    sum(1 / (k + rank)), with duplicates collapsed. A merged result keeps the
+    first source's fields and takes the longest content/raw_content offered.
+    """
+    scores, merged = {}, {}
+    for results in rankings.values():
+        for rank, item in enumerate(results, start=1):
+            key = result_key(item)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key not in merged:
+                merged[key] = dict(item)
+                continue
+            for field in ("content", "raw_content"):
+                if len(item.get(field) or "") > len(merged[key].get(field) or ""):
+                    merged[key][field] = item[field]
+    order = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [{**merged[key], "score": round(scores[key], 6)} for key in order]
+
+
+class FanOutSearchClient:
+    """
+    Queries several search sources at once and fuses their rankings.
+
+    Every source gets the same `deadline`. A source that has not answered
+    after `hedge_after` seconds gets one duplicate request, and whichever
+    copy answers first is used. Sources that fail or miss the deadline are
+    left out: the call returns what the others found, marked "partial".
+    It only fails when no source answers.
+    """
+
+    def __init__(self, sources: dict, deadline: float = None, hedge_after: float = None,
+                 rrf_k: int = None, max_workers: int = None):
+        self.sources = sources
+        self.deadline = deadline or config.SEARCH_SOURCE_DEADLINE
+        self.hedge_after = config.SEARCH_HEDGE_AFTER if hedge_after is None else hedge_after
+        self.rrf_k = rrf_k or config.SEARCH_RRF_K
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or 4 * len(sources),
+                                       thread_name_prefix="search-source")
+
+    def _query_source(self, name: str, query: str, params: dict) -> list:
+        start = time.monotonic()
+        results = self.sources[name].search(query=query, timeout=self.deadline, **params)["results"]
+        REGISTRY.observe("search_source_seconds", time.monotonic() - start, source=name)
+        return results
+
+    def search(self, query: str, **params) -> dict:
+        params.pop("timeout", None)
+        start = time.monotonic()
+        give_up_at, hedge_at = start + self.deadline, start + self.hedge_after
+        attempts = {self.pool.submit(self._query_source, name, query, params): name for name in self.sources}
+        rankings, errors, hedged = {}, {}, False
+
+        while len(rankings) + len(errors) < len(self.sources):
+            now = time.monotonic()
+            if now >= give_up_at:
+                break
+            wake_at = give_up_at if hedged else min(hedge_at, give_up_at)
+            done, _ = wait(list(attempts), timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = attempts.pop(future)
+                if name in rankings:
+                    continue
+                if future.exception() is None:
+                    rankings[name] = future.result()
+                    errors.pop(name, None)
+                elif name not in attempts.values():
+                    # Only a failure once no other copy of the request is still running
+                    errors[name] = future.exception()
+            if not hedged and time.monotonic() >= hedge_at:
+                hedged = True
+                for name in self.sources:
+                    if name not in rankings and name not in errors:
+                        logger.info(f"[Search] {name} slower than {self.hedge_after}s; sending a hedged request")
+                        REGISTRY.inc("search_hedges_total", source=name)
+                        attempts[self.pool.submit(self._query_source, name, query, params)] = name
+
+        status = {}
+        for name in self.sources:
+            status[name] = "ok" if name in rankings else "error" if name in errors else "timeout"
+            REGISTRY.inc("search_source_total", source=name, result=status[name])
+            if name in errors:
+                logger.warning(f"[Search] {name} failed: {errors[name]!r}")
+            elif name not in rankings:
+                logger.warning(f"[Search] {name} missed the {self.deadline}s deadline; continuing without it")
+        if not rankings:
+            if errors:
+                raise next(iter(errors.values()))
+            raise TimeoutError(f"No search source answered within {self.deadline}s")
+
+        results = reciprocal_rank_fusion(rankings, k=self.rrf_k)
+        if params.get("max_results"):
+            results = results[:params["max_results"]]
+        return {"query": query, "results": results, "sources": status,
+                "partial": len(rankings) < len(self.sources)}
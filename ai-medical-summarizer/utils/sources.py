@@ -0,0 +1,89 @@
+"""
+Literature search adapters that answer like TavilyClient.search.
+
+Each source returns {"query", "results": [{"title", "url", "content",
+"raw_content", "published_date", "doi"}]}, so FanOutSearchClient can query
+them side by side with Tavily and fuse the rankings.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+import config
+from utils.search_client import make_session
+
+import logging
+logger = logging.getLogger(__name__)
+
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _strip_tags(text: str) -> str:
+    return _TAGS.sub("", text or "").strip()
+
+
+class EuropePMCSource:
+    """Europe PMC REST search (https://europepmc.org/RestfulWebService), abstracts included."""
+
+    def __init__(self, base_url: str = None, session=None):
+        self.base_url = (base_url or config.EUROPE_PMC_URL).rstrip("/")
+        self.session = session or make_session()
+
+    def search(self, query: str, max_results: int = 5, timeout: float = None, **params) -> dict:
+        response = self.session.get(f"{self.base_url}/search", timeout=timeout or config.SEARCH_TIMEOUT, params={
+            "query": query, "format": "json", "resultType": "core", "pageSize": max_results
+        })
+        response.raise_for_status()
+        results = []
+        for item in response.json().get("resultList", {}).get("result", []):
+            abstract = _strip_tags(item.get("abstractText"))
+            results.append({
+                "title": _strip_tags(item.get("title")),
+                "url": f"https://europepmc.org/article/{item.get('source', 'MED')}/{item.get('id')}",
+                "content": abstract,
+                "raw_content": abstract,
+                "published_date": item.get("firstPublicationDate") or str(item.get("pubYear") or ""),
+                "doi": item.get("doi"),
+            })
+        return {"query": query, "results": results}
+
+
+class PubMedSource:
+    """NCBI E-utilities: esearch for relevance-ranked PMIDs, then efetch for titles and abstracts."""
+
+    def __init__(self, base_url: str = None, api_key: str = None, session=None):
+        self.base_url = (base_url or config.PUBMED_URL).rstrip("/")
+        self.api_key = api_key or config.NCBI_API_KEY
+        self.session = session or make_session()
+
+    def _get(self, endpoint: str, timeout: float, **params):
+        if self.api_key:
+            params["api_key"] = self.api_key
+        response = self.session.get(f"{self.base_url}/{endpoint}", params={"db": "pubmed", **params},
+                                    timeout=timeout or config.SEARCH_TIMEOUT)
+        response.raise_for_status()
+        return response
+
+    def search(self, query: str, max_results: int = 5, timeout: float = None, **params) -> dict:
+        ids = self._get("esearch.fcgi", timeout, term=query, retmode="json", retmax=max_results,
+                        sort="relevance").json()["esearchresult"]["idlist"]
+        if not ids:
+            return {"query": query, "results": []}
+        root = ET.fromstring(self._get("efetch.fcgi", timeout, id=",".join(ids), retmode="xml").content)
+
+        articles = {}
+        for article in root.iter("PubmedArticle"):
+            pmid = article.findtext(".//PMID")
+            abstract = " ".join("".join(part.itertext()) for part in article.iter("AbstractText"))
+            doi = article.find(".//ArticleIdList/ArticleId[@IdType='doi']")
+            title = article.find(".//ArticleTitle")
+            articles[pmid] = {
+                "title": "".join(title.itertext()).strip() if title is not None else "",
+                "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+                "content": abstract,
+                "raw_content": abstract,
+                "published_date": article.findtext(".//PubDate/Year") or article.findtext(".//PubDate/MedlineDate") or "",
+                "doi": doi.text if doi is not None else None,
+            }
+        # efetch does not promise esearch's order; keep the relevance ranking
+        return {"query": query, "results": [articles[pmid] for pmid in ids if pmid in articles]}
@@ -0,0 +1,87 @@
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import config
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Meters that LLM calls and cache lookups made in the current context report to
+_active_meters = contextvars.ContextVar("usage_meters", default=())
+
+
+class UsageMeter:
+    """Thread-safe counters for LLM calls, tokens and doc cache lookups."""
+
+    FIELDS = ("llm_calls", "prompt_tokens", "completion_tokens", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for field, value in counts.items():
+                setattr(self, field, getattr(self, field) + value)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def estimated_cost(self) -> float:
+        """Estimated spend in USD at the configured per-million-token prices."""
+        return (self.prompt_tokens * config.LLM_PRICE_PER_1M_INPUT
+                + self.completion_tokens * config.LLM_PRICE_PER_1M_OUTPUT) / 1_000_000
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = {field: getattr(self, field) for field in self.FIELDS}
+        counts["total_tokens"] = counts["prompt_tokens"] + counts["completion_tokens"]
+        return counts
+
+
+@contextmanager
+def track_usage(meter: UsageMeter = None):
+    """Count every LLM call and cache lookup made inside the block (nesting is allowed)."""
+    meter = meter or UsageMeter()
+    token = _active_meters.set(_active_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _active_meters.reset(token)
+
+
+def _record(**counts):
+    for meter in _active_meters.get():
+        meter.add(**counts)
+
+
+def record_llm_call(prompt_tokens: int = 0, completion_tokens: int = 0):
+    _record(llm_calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_cache_lookup(hits: int, misses: int):
+    _record(cache_hits=hits, cache_misses=misses)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that reports each chat completion's token usage to the active meters."""
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+
+        if not usage:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens += metadata.get("input_tokens", 0)
+                    completion_tokens += metadata.get("output_tokens", 0)
+
+        record_llm_call(prompt_tokens, completion_tokens)